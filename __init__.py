@@ -42,7 +42,6 @@ import requirements as req
 import time
 import shutil
 import sys
-import distutils.core
 import argparse
 from argparse import ArgumentParser
 
@@ -67,7 +66,9 @@ parser.add_argument(
     metavar = 4
 )
 
-options = parser.parse_args()
+# unknown arguments are ignored, so the module can also be imported by the
+# tests (pytest) which are started with their own arguments
+options = parser.parse_known_args()[0]
 
 # Get absolute path of this file
 wrkDir = os.path.abspath(".")
@@ -86,57 +87,19 @@ def update_help_folders(fh):
         # delete helping models folder
         fh.delete_models()
     else:
-        # update files in helping model folders
+        # update the changed files in the helping model folders
         fh.WriteLogMsg("Update files in helping folders ...")  
-        i = 1
-        folder_name = 'models_%s' %i
-        while os.path.exists(os.path.join(wrkDir,folder_name)):
-            for number in range(1,5):
-                try:
-                    # if update_files is activated, check if files have changed; if so, update these files in the helping folders
-                    if number == 1:
-                        sub_folder =  cfg.modelConfig.model1_folder
-                        update_files = cfg.modelConfig.update_files1
-                    elif number == 2:
-                        sub_folder =  cfg.modelConfig.model2_folder
-                        update_files = cfg.modelConfig.update_files2
-                    elif number == 3:
-                        sub_folder =  cfg.modelConfig.model3_folder
-                        update_files = cfg.modelConfig.update_files3
-                    else:
-                        sub_folder =  cfg.modelConfig.model4_folder
-                        update_files = cfg.modelConfig.update_files4
-                             
-                    if update_files != 'None':
-                        for file in update_files.split(','): 
-                            if os.path.isfile(os.path.join(wrkDir, folder_name, sub_folder, file)):
-                                if os.path.getmtime(os.path.join(wrkDir, folder_name, sub_folder, file)) \
-                                != os.path.getmtime(os.path.join(wrkDir, 'models', sub_folder, file)): 
-                                    shutil.copy(os.path.join(wrkDir, 'models', sub_folder, file), \
-                                                os.path.join(wrkDir, folder_name, sub_folder, file))
-                            elif os.path.isdir(os.path.join(wrkDir, folder_name, sub_folder, file)):
-                                if os.path.getmtime(os.path.join(wrkDir, folder_name, sub_folder, file)) \
-                                != os.path.getmtime(os.path.join(wrkDir, 'models', sub_folder, file)): 
-                                    distutils.dir_util.copy_tree(os.path.join(wrkDir, 'models', sub_folder, file), \
-                                                os.path.join(wrkDir, folder_name, sub_folder, file))
-                            # os.path.isfile(os.path.join(wrkDir, folder_name, sub_folder, file)) does not exist
-                            else:
-                                if os.path.isdir(os.path.join(wrkDir, 'models', sub_folder, file)):
-                                    shutil.copytree(os.path.join(wrkDir, 'models', sub_folder, file), \
-                                                os.path.join(wrkDir, folder_name, sub_folder, file))
-                                elif os.path.isfile(os.path.join(wrkDir, 'models', sub_folder, file)):
-                                    shutil.copy(os.path.join(wrkDir, 'models', sub_folder, file), \
-                                                os.path.join(wrkDir, folder_name, sub_folder, file))
-                                else:
-                                    fh.WriteLogMsg("Path %s can`t be updated, because the original path does not exist. Please check config.ini." %os.path.join(wrkDir, 'models', sub_folder, file)) 
-                                    raise SystemError("Path %s can`t be updated, because the original path does not exist. Please check config.ini." %os.path.join(wrkDir, 'models', sub_folder, file))
-                                    req.close_window  
-                except:
-                    #print "Unexpected error:", sys.exc_info()[0]
-                    #raise  
-                    break    
-            i += 1
-            folder_name = 'models_%s' %i
+        update_files = []
+        for number in range(1,5):
+            sub_folder = getattr(cfg.modelConfig, 'model%d_folder' % number, 'None')
+            files = getattr(cfg.modelConfig, 'update_files%d' % number, 'None')
+            if sub_folder != 'None' and files != 'None':
+                update_files.extend([(sub_folder, file.strip()) for file in files.split(',') if file.strip()])
+        if options.nthreads == "max cpu cores":
+            number_threads = os.cpu_count() or 1
+        else:
+            number_threads = int(options.nthreads)
+        fh.update_help_folders(update_files, cfg.modelConfig.link_workspaces == 'True', number_threads)
         fh.WriteLogMsg("Update files is done.")  
     
 #------------------------------------------------------------------------------  
@@ -176,6 +139,9 @@ def main():
     # create a help file
     fh.save_timestamp(fh.timestamp_file)
     
+    # create the folder of the helping folders in workspace_dir (if given)
+    fh.init_workspace()
+
     # check if helping folders should be created or if files should be updated
     update_help_folders(fh)
     
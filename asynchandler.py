@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+#
+#   Name:       asynchandler.py
+#   Purpose:    This module provides an asyncio evaluation backend which runs
+#               the external models as non-blocking subprocesses of one
+#               controller process.
+#
+#   Author:     Carola Paetzold, Michael Strauch
+#   Contact:    michael.strauch@ufz.de
+#
+#               Helmholtz Centre for Environmental Research - UFZ
+#               Department Computational Landscape Ecology - CLE
+#               Permoserstrasse 15
+#               D-04318 Leipzig, Germany
+#               http://www.ufz.de
+#
+#   Created:    Sun Oct 18 2026
+#
+#   Copyright:  (c) Carola Paetzold / Michael Strauch 2026
+#
+#   Licence:    This program is free software:
+#               you can redistribute it and/or modify it under the terms
+#               of the GNU General Public License as published by the
+#               Free Software Foundation, either version 3 of the License,
+#               or (at your option) any later version. This program is
+#               distributed in the hope that it will be useful, but
+#               WITHOUT ANY WARRANTY; without even the implied warranty
+#               of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#               See the GNU General Public License for more details.
+#               You should have received a copy of the GNU General
+#               Public License along with this program.
+#               If not, see <http://www.gnu.org/licenses/>.
+#
+#------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------
+import os
+import time
+import signal
+import asyncio
+import threading
+import queue
+
+import config as cfg
+from filehandler import WriteLogMsg
+from poolhandler import write_model_inputs
+from poolhandler import run_plugin_task
+from poolhandler import save_task_outputs
+
+#------------------------------------------------------------------------------
+#   Model run as asyncio subprocess
+#------------------------------------------------------------------------------
+def model_command(file_path):
+    """Return the command line which runs a model script.
+
+       input:
+           file_path is the script file path of a model
+    """
+
+    ext = os.path.splitext(file_path)[1]
+    if ext == ".R":
+        # the output of R is redirected by the sink() lines of the prepared script
+        return [cfg.modelConfig.file_path_R, 'CMD', 'BATCH', file_path]
+    elif ext == ".py":
+        return [cfg.modelConfig.file_path_python, file_path]
+    else:
+        raise SystemError("It is no call for this file extension implemented. %s" % file_path)
+
+def kill_process(process):
+    """Kill a model process and its child processes."""
+
+    try:
+        if hasattr(os, 'killpg'):
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except (ProcessLookupError, OSError):
+        pass
+
+async def run_in_thread(function, *args):
+    """Run a file operation in a thread of the event loop and return its result.
+
+       A thread can not be stopped, so if the task is cancelled the cancellation
+       waits until the thread is finished. The helping folder is then free when
+       the pool reports the task as cancelled.
+    """
+
+    future = asyncio.get_running_loop().run_in_executor(None, function, *args)
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        try:
+            await future
+        except Exception:
+            pass
+        raise
+
+async def run_model_task(pool, task, map_info, patchID_map_info, header_all_info):
+    """Write the inputs of one model, run it and return its fitness values.
+
+       The file operations run in threads of the event loop, the model itself
+       is an asyncio subprocess, so the controller waits on all models at once.
+
+       input:
+           pool is the AsyncPool which executes the task
+           task is a ModelTask
+           map_info, patchID_map_info and header_all_info are the variables
+           for the map creation
+    """
+
+    # log file of the model run (individual number followed by the model number)
+    number = str(task.ind_number) + str(task.model_number)
+
+    if task.plugin:
+        return await run_in_thread(run_plugin_task, task, map_info, patchID_map_info, header_all_info, number)
+
+    file_path = await run_in_thread(write_model_inputs, task, map_info, patchID_map_info, header_all_info, number)
+    if not os.path.isfile(file_path):
+        raise SystemError("Error in executing external model. File does not exist. %s" % file_path)
+    cmd = model_command(file_path)
+    folder = os.path.dirname(file_path)
+
+    begin = time.time()
+    if cmd[0] == cfg.modelConfig.file_path_python:
+        # console output of python models
+        console = open(os.path.join(folder, 'console.txt'), 'w')
+    else:
+        console = asyncio.subprocess.DEVNULL
+    try:
+        # own process group, so the model can be stopped with all its child processes
+        process = await asyncio.create_subprocess_exec(*cmd, stdout=console, start_new_session=hasattr(os, 'killpg'))
+        pool.processes.add(process)
+        try:
+            returncode = await process.wait()
+        except asyncio.CancelledError:
+            kill_process(process)
+            # the helping folder is free when the model process is gone
+            await process.wait()
+            raise
+        finally:
+            pool.processes.discard(process)
+    finally:
+        if console is not asyncio.subprocess.DEVNULL:
+            console.close()
+    if returncode != 0:
+        msg = "Error in executing external model %s. Exit code %s." % (file_path, returncode)
+        WriteLogMsg(msg, number)
+        raise SystemError(msg)
+    msg = "The model %s ran for %d seconds." %(file_path, time.time()-begin)
+    WriteLogMsg(msg, number)
+
+    # move the outputs out of the helping folder and read the fitness values
+    # while other models are still running
+    return await run_in_thread(save_task_outputs, task, folder)
+
+#------------------------------------------------------------------------------
+#   Asyncio evaluation backend
+#------------------------------------------------------------------------------
+class AsyncPool:
+    """Evaluation backend with the interface of the WorkerPool which runs all
+       model runs from one event loop in a background thread.
+
+       The number of concurrent model runs is limited by a semaphore (--threads),
+       no Python process is needed per running model.
+    """
+
+    def __init__(self, number_workers, init_args=()):
+        """Start the event loop.
+
+           input:
+               number_workers is the maximum number of concurrent model runs
+               init_args are the variables for the map creation
+        """
+
+        self.number_workers = max(1, number_workers)
+        self.init_args = tuple(init_args)
+        # finished tasks (status, task_id, result)
+        self.results = queue.Queue()
+        # number of submitted tasks without result
+        self.pending = 0
+        self.next_id = 0
+        # running model processes
+        self.processes = set()
+        # asyncio tasks of the submitted tasks, task_id -> asyncio task
+        self.tasks = {}
+        # tasks which were cancelled, their results are ignored
+        self.cancelled = set()
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run_loop)
+        self.thread.daemon = True
+        self.thread.start()
+        self.semaphore = asyncio.run_coroutine_threadsafe(self._create_semaphore(), self.loop).result()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    async def _create_semaphore(self):
+        return asyncio.Semaphore(self.number_workers)
+
+    async def _execute(self, task_id, task):
+        """Execute one task and put its result in the result queue."""
+
+        try:
+            async with self.semaphore:
+                result = await run_model_task(self, task, *self.init_args)
+            self.results.put(('done', task_id, result))
+        except Exception as e:
+            self.results.put(('error', task_id, "%s, %s" % (str(type(e)), str(e))))
+
+    def _start(self, task_id, task):
+        """Create the asyncio task of a submitted task (in the event loop)."""
+
+        self.tasks[task_id] = self.loop.create_task(self._execute(task_id, task))
+        self.tasks[task_id].add_done_callback(lambda future: self._task_done(task_id, future))
+
+    def _task_done(self, task_id, future):
+        self.tasks.pop(task_id, None)
+        if future.cancelled():
+            # the model process is killed
+            self.results.put(('cancelled', task_id, None))
+
+    def _cancel(self, task_id):
+        """Cancel the asyncio task of a task (in the event loop)."""
+
+        if task_id in self.tasks:
+            self.tasks[task_id].cancel()
+
+    def submit(self, task):
+        """Start a task in the event loop and return its task id."""
+
+        task_id = self.next_id
+        self.next_id += 1
+        self.pending += 1
+        self.loop.call_soon_threadsafe(self._start, task_id, task)
+        return task_id
+
+    def cancel(self, task_id):
+        """Stop a task, the model process is killed. get_result returns the 
+           status 'cancelled' for the task as soon as it does not run any more.
+        """
+
+        if task_id in self.cancelled:
+            return
+        self.cancelled.add(task_id)
+        self.loop.call_soon_threadsafe(self._cancel, task_id)
+
+    def get_result(self, timeout=None):
+        """Wait for the next finished task.
+
+           Return a tuple (status, task_id, result) where status is 'done', 'error'
+           or 'cancelled' and result holds the fitness values or the error message.
+           Return None if no task has finished within timeout seconds.
+        """
+
+        try:
+            if timeout is None:
+                status, task_id, result = self.results.get()
+            else:
+                status, task_id, result = self.results.get(True, max(0, timeout))
+        except queue.Empty:
+            return None
+        self.pending -= 1
+        if task_id in self.cancelled:
+            return 'cancelled', task_id, None
+        return status, task_id, result
+
+    async def _kill_processes(self):
+        for process in list(self.processes):
+            kill_process(process)
+
+    def shutdown(self):
+        """Kill the model processes which are still running and stop the event loop."""
+
+        asyncio.run_coroutine_threadsafe(self._kill_processes(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+#------------------------------------------------------------------------------
+#
+#   EOF
+#
+#------------------------------------------------------------------------------
@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+#
+#   Name:       cachehandler.py
+#   Purpose:    This module provides a persistent fitness cache, so identical
+#               individuals are not sent to the external models again, and
+#               the journal of the finished model runs of an optimization run.
+#
+#   Author:     Carola Paetzold, Michael Strauch
+#   Contact:    michael.strauch@ufz.de
+#
+#               Helmholtz Centre for Environmental Research - UFZ
+#               Department Computational Landscape Ecology - CLE
+#               Permoserstrasse 15
+#               D-04318 Leipzig, Germany
+#               http://www.ufz.de
+#
+#   Created:    Sun Oct 18 2026
+#
+#   Copyright:  (c) Carola Paetzold / Michael Strauch 2026
+#
+#   Licence:    This program is free software:
+#               you can redistribute it and/or modify it under the terms
+#               of the GNU General Public License as published by the
+#               Free Software Foundation, either version 3 of the License,
+#               or (at your option) any later version. This program is
+#               distributed in the hope that it will be useful, but
+#               WITHOUT ANY WARRANTY; without even the implied warranty
+#               of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#               See the GNU General Public License for more details.
+#               You should have received a copy of the GNU General
+#               Public License along with this program.
+#               If not, see <http://www.gnu.org/licenses/>.
+#
+#------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------
+import os
+import json
+import hashlib
+import sqlite3
+
+import config as cfg
+from filehandler import WriteLogMsg
+from filehandler import script_lines
+from filehandler import run_input_files
+from filehandler import stale_files
+from filehandler import stale_extensions
+
+wrkDir = os.path.abspath('.')
+
+#------------------------------------------------------------------------------
+#   Hash values
+#------------------------------------------------------------------------------
+def candidate_hash(candidate):
+    """Return the hash value of a candidate (genome).
+
+       input:
+           candidate is the list of genes
+    """
+
+    return hashlib.sha1(",".join(["%d" % gene for gene in candidate]).encode('ascii')).hexdigest()
+
+def update_file_hash(hash_object, file_path):
+    """Add the content of a file to the hash object."""
+
+    in_file = open(file_path, 'rb')
+    for block in iter(lambda: in_file.read(1 << 20), b''):
+        hash_object.update(block)
+    in_file.close()
+
+def compute_fingerprint(external_models, model_files, output_files):
+    """Return a fingerprint of the model scripts, the model input data, the input
+       maps and the settings which influence the fitness values.
+
+       input:
+           external_models are the folder names of the models
+           model_files are the file names of the model scripts
+           output_files are the file names of the model outputs
+    """
+
+    fingerprint = hashlib.sha1()
+    # settings
+    settings = [cfg.modelConfig.max_range, cfg.modelConfig.map, cfg.mapConfig.file_ASCII_map,
+                cfg.mapConfig.file_ID_map, cfg.mapConfig.file_HRU, cfg.mapConfig.four_neighbours]
+    settings.extend(external_models)
+    settings.extend(model_files)
+    settings.extend(output_files)
+    fingerprint.update(repr(settings).encode('utf-8'))
+
+    # input maps
+    for file in [cfg.mapConfig.file_ASCII_map, cfg.mapConfig.file_ID_map, cfg.mapConfig.file_HRU]:
+        if file != 'None' and os.path.isfile(os.path.join(wrkDir, 'input', file)):
+            update_file_hash(fingerprint, os.path.join(wrkDir, 'input', file))
+
+    # model scripts and model input data
+    for folder, script in zip(external_models, model_files):
+        model_path = os.path.join(wrkDir, 'models', folder)
+        for root, dirs, files in os.walk(model_path):
+            dirs.sort()
+            for file in sorted(files):
+                file_path = os.path.join(root, file)
+                # files which are written by each model run are not part of the model fingerprint
+                if file in run_input_files or file in stale_files or file in output_files \
+                   or os.path.splitext(file)[1] in stale_extensions:
+                    continue
+                fingerprint.update(os.path.relpath(file_path, model_path).encode('utf-8'))
+                if root == model_path and file == script:
+                    fingerprint.update(script_lines(file_path).encode('utf-8'))
+                else:
+                    update_file_hash(fingerprint, file_path)
+
+    return fingerprint.hexdigest()
+
+#------------------------------------------------------------------------------
+#   Fitness cache
+#------------------------------------------------------------------------------
+class FitnessCache:
+    """On-disk store of the model fitness values of already evaluated individuals.
+
+       The values are keyed by the hash of the candidate and the fingerprint of
+       the models and input data, so the cache can be used by later runs
+       (e.g. after start_from_previous_gen) as long as nothing has changed.
+    """
+
+    def __init__(self, file_path, fingerprint):
+        """Open or create the cache.
+
+           input:
+               file_path is the path of the SQLite database file
+               fingerprint is the fingerprint of the models and input data
+        """
+
+        self.fingerprint = fingerprint
+        self.connection = sqlite3.connect(file_path)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS fitness (fingerprint TEXT, candidate TEXT, "
+                                "fitness TEXT, PRIMARY KEY (fingerprint, candidate))")
+        self.connection.commit()
+        # statistics
+        self.hits = 0
+        self.requests = 0
+
+    def get(self, candidate):
+        """Return the list of model fitness values of a candidate or None."""
+
+        self.requests += 1
+        row = self.connection.execute("SELECT fitness FROM fitness WHERE fingerprint = ? AND candidate = ?",
+                                      (self.fingerprint, candidate_hash(candidate))).fetchone()
+        if row is None:
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, candidate, values):
+        """Save the list of model fitness values of a candidate."""
+
+        self.connection.execute("INSERT OR REPLACE INTO fitness VALUES (?, ?, ?)",
+                                (self.fingerprint, candidate_hash(candidate), json.dumps([float(v) for v in values])))
+
+    def commit(self):
+        """Write the new entries to the file."""
+
+        self.connection.commit()
+
+    def log_statistics(self, hits, requests):
+        """Write the hit rate of the current generation and of the whole run in the log file.
+
+           input:
+               hits and requests are the numbers of the current generation
+        """
+
+        if requests > 0:
+            msg = "Fitness cache: %d of %d individuals found (hit rate %.1f %%), " % (hits, requests, 100.0 * hits / requests)
+        else:
+            msg = "Fitness cache: no individuals requested, "
+        if self.requests > 0:
+            msg += "total hit rate %.1f %% (%d of %d)." % (100.0 * self.hits / self.requests, self.hits, self.requests)
+        else:
+            msg += "no requests so far."
+        WriteLogMsg(msg)
+
+    def close(self):
+        """Close the cache file."""
+
+        self.connection.commit()
+        self.connection.close()
+
+#------------------------------------------------------------------------------
+#   Evaluation journal
+#------------------------------------------------------------------------------
+class EvaluationJournal:
+    """Append-only journal of the finished model runs of an optimization run.
+
+       Every finished model run is written as one line (generation, candidate hash,
+       model folder, fitness values) as soon as its result arrives, so the journal
+       is complete up to the moment the tool was interrupted. If the run is resumed
+       (start_from_previous_gen), the model runs of the journal are not repeated.
+       After each generation a line with the states of the random number generators
+       is written (state, generation, states), so the resumed run can create the
+       same offspring as the interrupted run.
+
+       The first line holds the fingerprint of the models and input data, the 
+       journal of other models is not used. An incomplete last line (interrupted
+       while writing) is ignored. The lines are flushed at once (they survive
+       the end of the process) and written to the disk once per generation.
+    """
+
+    def __init__(self, file_path, fingerprint, resume):
+        """Open the journal.
+
+           input:
+               file_path is the path of the journal file
+               fingerprint is the fingerprint of the models and input data
+               resume is True if the model runs of an existing journal are replayed,
+               otherwise a new journal is started
+        """
+
+        # fitness values of the finished model runs, (candidate hash, model folder) -> values
+        self.records = {}
+        # states of the random number generators after each generation, generation -> states
+        self.states = {}
+        # statistics
+        self.replayed = 0
+        # True if the existing journal is continued
+        valid = False
+        if resume and os.path.isfile(file_path):
+            in_file = open(file_path, 'r')
+            content = in_file.read()
+            in_file.close()
+            lines = content.splitlines()
+            if lines and lines[0] == "fingerprint,%s" % fingerprint:
+                valid = True
+                for line in lines[1:]:
+                    try:
+                        if line.startswith("state,"):
+                            tag, generation, states = line.split(',', 2)
+                            self.states[int(generation)] = json.loads(states)
+                            continue
+                        generation, key, model_folder, values = line.split(',', 3)
+                        self.records[(key, model_folder)] = [float(v) for v in json.loads(values)]
+                    except ValueError:
+                        continue
+                WriteLogMsg("Evaluation journal: %d model runs of the interrupted run are available." % len(self.records))
+            else:
+                WriteLogMsg("Evaluation journal: the journal belongs to other models or input data and is not used.")
+        if valid:
+            # the new lines are appended to the journal (and to the states of the random
+            # number generators) of the interrupted run
+            self.out_file = open(file_path, 'a')
+            if not content.endswith("\n"):
+                # the incomplete last line stays a line of its own
+                self.out_file.write("\n")
+                self.out_file.flush()
+        else:
+            self.out_file = open(file_path, 'w')
+            self.out_file.write("fingerprint,%s\n" % fingerprint)
+            self.out_file.flush()
+
+    def get(self, candidate, model_folder):
+        """Return the fitness values of a finished model run or None."""
+
+        values = self.records.get((candidate_hash(candidate), model_folder))
+        if values is not None:
+            self.replayed += 1
+        return values
+
+    def write(self, generation, candidate, model_folder, values):
+        """Append a finished model run.
+
+           input:
+               generation is the generation number
+               candidate is the evaluated genome
+               model_folder is the folder name of the model
+               values is the list of fitness values of the model
+        """
+
+        values = [float(v) for v in values]
+        self.records[(candidate_hash(candidate), model_folder)] = values
+        self.out_file.write("%d,%s,%s,%s\n" % (generation, candidate_hash(candidate), model_folder, json.dumps(values)))
+        self.out_file.flush()
+
+    def get_state(self, generation):
+        """Return the states of the random number generators after a generation 
+           of the interrupted run or None."""
+
+        return self.states.get(generation)
+
+    def write_state(self, generation, states):
+        """Append the states of the random number generators after a generation
+           and write the journal to the disk.
+
+           input:
+               generation is the generation number
+               states is a dictionary name -> state (JSON serializable)
+        """
+
+        self.states[generation] = states
+        self.out_file.write("state,%d,%s\n" % (generation, json.dumps(states)))
+        self.out_file.flush()
+        os.fsync(self.out_file.fileno())
+
+    def log_statistics(self):
+        """Write the number of replayed model runs in the log file."""
+
+        if self.replayed > 0:
+            WriteLogMsg("Evaluation journal: %d model runs were taken from the journal." % self.replayed)
+
+    def close(self):
+        """Write the journal to the disk and close the file."""
+
+        self.out_file.flush()
+        os.fsync(self.out_file.fileno())
+        self.out_file.close()
+
+#------------------------------------------------------------------------------
+#
+#   EOF
+#
+#------------------------------------------------------------------------------
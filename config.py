@@ -38,7 +38,6 @@
 #------------------------------------------------------------------------------
 import os
 import sys
-from distutils.util import strtobool
 try:
     import ConfigParser
 except ImportError:
@@ -49,6 +48,21 @@ import requirements as req
 # get absolute path of this file
 wrkDir = os.path.abspath(".")
 
+#-------------------------------------------------------------------------------------  
+#   Convert the string values of the ini file
+#-------------------------------------------------------------------------------------
+def strtobool(value):
+    """Convert a string like 'True', 'yes' or '1' into 1 and 'False', 'no' or '0' 
+       into 0 (replacement for distutils.util.strtobool).
+    """
+
+    value = value.strip().lower()
+    if value in ('y', 'yes', 't', 'true', 'on', '1'):
+        return 1
+    elif value in ('n', 'no', 'f', 'false', 'off', '0'):
+        return 0
+    raise ValueError("invalid truth value %r" % value)
+
 #-------------------------------------------------------------------------------------  
 #   Read ini file
 #-------------------------------------------------------------------------------------
@@ -71,6 +85,36 @@ def read_ini_file():
     dict_default_model.update({'update_files2' : 'None'})
     dict_default_model.update({'update_files3' : 'None'})
     dict_default_model.update({'update_files4' : 'None'})
+    dict_default_model.update({'plugin1' : 'False'})
+    dict_default_model.update({'plugin2' : 'False'})
+    dict_default_model.update({'plugin3' : 'False'})
+    dict_default_model.update({'plugin4' : 'False'})
+    dict_default_model.update({'batch1' : 'False'})
+    dict_default_model.update({'batch2' : 'False'})
+    dict_default_model.update({'batch3' : 'False'})
+    dict_default_model.update({'batch4' : 'False'})
+    dict_default_model.update({'timeout1' : 'None'})
+    dict_default_model.update({'timeout2' : 'None'})
+    dict_default_model.update({'timeout3' : 'None'})
+    dict_default_model.update({'timeout4' : 'None'})
+    dict_default_model.update({'max_retries' : '0'})
+    dict_default_model.update({'fail_fast' : 'True'})
+    dict_default_model.update({'speculative' : 'False'})
+    dict_default_model.update({'speculative_fraction' : '0.9'})
+    dict_default_model.update({'link_workspaces' : 'False'})
+    dict_default_model.update({'workspace_dir' : 'None'})
+    dict_default_model.update({'r_sessions' : 'False'})
+    dict_default_model.update({'fitness_cache' : 'False'})
+    dict_default_model.update({'journal' : 'False'})
+    dict_default_model.update({'surrogate' : 'False'})
+    dict_default_model.update({'delta_inputs' : 'False'})
+    dict_default_model.update({'surrogate_fraction' : '0.5'})
+    dict_default_model.update({'surrogate_neighbours' : '5'})
+    dict_default_model.update({'surrogate_min_samples' : '20'})
+    dict_default_model.update({'backend' : 'processes'})
+    dict_default_model.update({'net_address' : 'localhost:6000'})
+    dict_default_model.update({'net_workers' : '1'})
+    dict_default_model.update({'net_authkey' : 'None'})
     dict_default_alg = {}
     # default optimization settings
     # custom settings under [config_optimization_algorithm] in ini file
@@ -80,6 +124,8 @@ def read_ini_file():
     dict_default_alg.update({'write_tabu_memory' : 'False'})
     dict_default_alg.update({'plot_results' : 'False'})
     dict_default_alg.update({'start_from_previous_gen' : 'False'})
+    dict_default_alg.update({'steady_state' : 'False'})
+    dict_default_alg.update({'pipelined' : 'False'})
     dict_default_alg.update({'maximize' : 'True'})
     dict_default_alg.update({'selector' : 'default_selection'})
     dict_default_alg.update({'variator' : 'default_variation'})
@@ -191,6 +237,21 @@ class ModelConfig:
            file_outputx               | file name of the output file from model x
            file_outputx               | file names from model x which should be updated 
                                       | in the helping folders at the start of the tool 
+           pluginx                    | if True then file_modelx is a Python plugin with the function
+                                      | evaluate(land_use_array, genome, context) which returns the
+                                      | fitness values and is called inside the worker processes
+           batchx                     | if True then model x evaluates all individuals of a generation
+                                      | in one run (genom_batch.csv, map_batch.npy, one output row per individual)
+           timeoutx                   | maximum run time of model x in seconds, slower model runs are
+                                      | stopped and the individual gets the worst fitness values
+           max_retries                | number of repetitions of a failed model run
+           fail_fast                  | if True then the other model runs of an individual are stopped
+                                      | as soon as one of its model runs failed
+           speculative                | if True then slow model runs get a copy on a free worker
+                                      | when speculative_fraction of the model runs are finished
+           link_workspaces            | if True then the static files of the helping folders are links
+                                      | to the files of the models folder
+           workspace_dir              | folder for the helping folders (e.g. a tmpfs), None for the working directory
            max_range                  | maximum number of possible land use options
            opt_algorithm (string)     | definition of the optimization algorithm,
                                         available choices are GA or NSGA2   
@@ -199,6 +260,26 @@ class ModelConfig:
                                       | else save the individuals as string of integers in a csv file 
            del_help_folders           | if True than delete and create the helping folders at the start of the process,
                                       | else update only the changed files in the existing helping folders 
+           r_sessions                 | if True then R models are sourced in resident R sessions (one per worker process)
+                                      | instead of starting R CMD BATCH for each model run
+           fitness_cache              | if True then the fitness values are saved in output/fitness_cache.sqlite
+                                      | and identical individuals are not evaluated again
+           journal                    | if True then every finished model run is written in output/evaluation_journal.csv,
+                                      | start_from_previous_gen takes the model runs of the interrupted run from it
+           surrogate                  | if True then a surrogate model predicts the fitness values of the offspring
+                                      | and only the most promising offspring are evaluated by the models
+           surrogate_fraction         | fraction of the offspring which is evaluated by the models
+           surrogate_neighbours       | number of evaluated individuals which are used for a prediction
+           surrogate_min_samples      | number of evaluated individuals from which on the surrogate is used
+           delta_inputs               | if True then delta.csv and reference_fitness.csv with the changed patches 
+                                      | relative to an evaluated individual are written into the model folders
+           backend                    | evaluation backend: processes (pool of worker processes) or
+                                      | asyncio (one event loop runs the models as subprocesses) or
+                                      | network (the models run on network workers, see nethandler.py)
+           net_address                | address host:port of the coordinator for the network workers
+           net_workers                | number of network workers to wait for before the evaluation starts
+           net_authkey                | shared secret of the coordinator and the network workers
+                                      | (required for backend = network)
                                       
         """
         # set current working directory
@@ -226,6 +307,40 @@ class ModelConfig:
         self.update_files2 = dict_model['update_files2']
         self.update_files3 = dict_model['update_files3']
         self.update_files4 = dict_model['update_files4']
+
+        # model x is a Python plugin which is called in the worker processes
+        self.plugin1 = dict_model['plugin1']
+        self.plugin2 = dict_model['plugin2']
+        self.plugin3 = dict_model['plugin3']
+        self.plugin4 = dict_model['plugin4']
+
+        # model x evaluates all individuals of a generation in one run
+        self.batch1 = dict_model['batch1']
+        self.batch2 = dict_model['batch2']
+        self.batch3 = dict_model['batch3']
+        self.batch4 = dict_model['batch4']
+
+        # maximum run time of model x in seconds
+        self.timeout1 = dict_model['timeout1']
+        self.timeout2 = dict_model['timeout2']
+        self.timeout3 = dict_model['timeout3']
+        self.timeout4 = dict_model['timeout4']
+
+        # number of repetitions of a failed model run
+        self.max_retries = dict_model['max_retries']
+
+        # stop the other model runs of an individual with a failed model run
+        self.fail_fast = dict_model['fail_fast']
+
+        # copies of slow model runs at the end of a generation
+        self.speculative = dict_model['speculative']
+        self.speculative_fraction = dict_model['speculative_fraction']
+
+        # link the static files of the helping folders instead of copying them
+        self.link_workspaces = dict_model['link_workspaces']
+
+        # folder for the helping folders and model outputs (e.g. a tmpfs)
+        self.workspace_dir = dict_model['workspace_dir']
         
         try:
             # folder of the second model 
@@ -269,6 +384,32 @@ class ModelConfig:
         # individual transfer to model folder as string (False) or as ascii map (True)
         self.map = dict_model['map']
 
+        # run R models in resident R sessions (True) or with R CMD BATCH (False)
+        self.r_sessions = dict_model['r_sessions']
+
+        # save and reuse the fitness values of evaluated individuals
+        self.fitness_cache = dict_model['fitness_cache']
+
+        # journal of the finished model runs for the recovery of an interrupted run
+        self.journal = dict_model['journal']
+
+        # pre-screening of the offspring with a surrogate model
+        self.surrogate = dict_model['surrogate']
+        self.surrogate_fraction = dict_model['surrogate_fraction']
+        self.surrogate_neighbours = dict_model['surrogate_neighbours']
+        self.surrogate_min_samples = dict_model['surrogate_min_samples']
+
+        # changed patches relative to an evaluated reference individual
+        self.delta_inputs = dict_model['delta_inputs']
+
+        # evaluation backend (processes, asyncio or network)
+        self.backend = dict_model['backend']
+
+        # coordinator of the network workers
+        self.net_address = dict_model['net_address']
+        self.net_workers = dict_model['net_workers']
+        self.net_authkey = dict_model['net_authkey']
+
 modelConfig = ModelConfig()
 
 #------------------------------------------------------------------------------
@@ -306,6 +447,8 @@ class EaConfig:
         self.write_tabu_memory = strtobool(dict_alg['write_tabu_memory'])
         self.plot_results = strtobool(dict_alg['plot_results'])
         self.start_from_previous_gen = strtobool(dict_alg['start_from_previous_gen'])
+        self.steady_state = strtobool(dict_alg['steady_state'])
+        self.pipelined = strtobool(dict_alg['pipelined'])
 
         
 ea = EaConfig()
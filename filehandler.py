@@ -37,15 +37,20 @@
 #------------------------------------------------------------------------------
 import os
 import time 
+import json
+import hashlib
 import pylab
 import csv
 import subprocess
 from inspyred import ec
 import shutil
+import atexit
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import sys
 
 import requirements as req
+import config as cfg
 
 wrkDir = os.path.abspath('.')
 timestamp_file = time.strftime("%d-%m-%Y_%H-%M-%S_")
@@ -58,6 +63,13 @@ if os.path.exists(os.path.join(wrkDir, "output", "help_file.txt")):
 # Array for worst fitness values if individuals are filtered of plausibility
 worst_fitness = np.array([], dtype=np.float64)
 
+# files of the model folders which are written for each model run (model inputs),
+# the only list of them for all modules
+run_input_files = ['genom.csv', 'map.asc', 'genom_batch.csv', 'map_batch.npy', 'delta.csv', 'reference_fitness.csv']
+# files of a model folder which are left over from earlier model runs
+stale_files = ['console.txt', 'help_script.txt', '.RData', '.Rhistory']
+stale_extensions = ['.Rout', '.prepared']
+
 #------------------------------------------------------------------------------
 #   Log-file handling
 #------------------------------------------------------------------------------
@@ -268,7 +280,7 @@ def save_input_data():
 #------------------------------------------------------------------------------
 #   Documentation of the model console outputs in one output file
 #------------------------------------------------------------------------------
-def summarize_console_outputs(number_individuals, number_generation,individuals, external_models, not_accepted_ind):
+def summarize_console_outputs(number_individuals, number_generation,individuals, external_models, not_accepted_ind, plugin_models=(), ind_numbers=None):
     """ Summarize the console outputs of the models after 
         each population evaluation in one output file.
         
@@ -277,44 +289,44 @@ def summarize_console_outputs(number_individuals, number_generation,individuals,
                     generation number
                     population list
                     individuals without model runs
+                    model plugins (without console outputs)
+                    individual numbers of the population (default 1 ... number of individuals)
     """
     
     fileName = timestamp_file + "model_outputs.txt"
-    i=0
+    if ind_numbers is None:
+        ind_numbers = range(1, number_individuals+1)
     fobj_docu = open(os.path.join(wrkDir, "output", fileName), "a+")  
     fobj_docu.seek(0, os.SEEK_END)
     fobj_docu.write("\n") 
     fobj_docu.write("generation %s" %number_generation + "\n\n") 
-    while i < number_individuals:
-        if i+1 not in not_accepted_ind:
+    for i, ind_number in enumerate(ind_numbers):
+        if ind_number not in not_accepted_ind:
             fobj_docu.write("population %s" %individuals[i] + "\n\n") 
-            if i == 0:
-                model_folder = 'models'
-            else:
-                model_folder = 'models_%s' %i
+            # the model outputs of the individual are saved in its results folder
+            model_folder = results_folder(ind_number)
             subfolder_files = external_models
             #subfolder_files.sort() victor
             for k in subfolder_files:
                 # check if k is a folder
-                if os.path.isdir(os.path.join(wrkDir, model_folder, k)):
+                if os.path.isdir(os.path.join(workspace_folder(), model_folder, k)):
                     for m in external_models:
                         # subfolder == possible model folder
-                        if k == m:
+                        if k == m and k not in plugin_models:
                             try:
-                                fobj_docu.write("model path %s" %os.path.join(wrkDir, model_folder, k) + "\n") 
-                                fobj_txt = open(os.path.join(wrkDir, model_folder, k, 'console.txt'), "r")
+                                fobj_docu.write("model path %s" %os.path.join(workspace_folder(), model_folder, k) + "\n") 
+                                fobj_txt = open(os.path.join(workspace_folder(), model_folder, k, 'console.txt'), "r")
                                 for line in fobj_txt: 
                                     fobj_docu.write(line + "\n") 
                                 fobj_txt.close()
                             except:
                                 pass
-        i += 1
     fobj_docu.close() 
 
 #------------------------------------------------------------------------------  
 #   Collect all the fitness values of one generations
 #------------------------------------------------------------------------------
-def collect_fitness_values(opt_algorithm, number_individuals, fitness, external_models, output_files, not_accepted_ind, file_worst_fitness):
+def collect_fitness_values(opt_algorithm, number_individuals, fitness, external_models, output_files, not_accepted_ind, file_worst_fitness, known_fitness=None, duplicate_ind=None, model_fitness=None, ind_numbers=None):
     """Read the fitness values from external models, write them into the log file
        and append them to the fitness list.
  
@@ -325,6 +337,10 @@ def collect_fitness_values(opt_algorithm, number_individuals, fitness, external_
                    output files  
                    individuals without model runs  
                    file with worst fitness values               
+                   model fitness values which are already known (e.g. from the fitness cache)
+                   individuals which are identical with an earlier individual of the population
+                   fitness values which were returned by the evaluation tasks per (individual number, model folder)
+                   individual numbers of the population (default 1 ... number of individuals)
      """
   
     # Array for worst fitness values if individuals are filtered of plausibility
@@ -334,13 +350,30 @@ def collect_fitness_values(opt_algorithm, number_individuals, fitness, external_
     
     WriteLogMsg("not_accepted_ind %r" %not_accepted_ind)
      
-    i=0
+    if known_fitness is None:
+        known_fitness = {}
+    if duplicate_ind is None:
+        duplicate_ind = {}
+    if model_fitness is None:
+        model_fitness = {}
+    if ind_numbers is None:
+        ind_numbers = range(1, number_individuals+1)
+    # model fitness values of each individual
+    model_values = {}
+
     count_worst_fitness = 0
     count_real_fitness = 0
-    while i < number_individuals:
+    for ind_number in ind_numbers:
         fitness_model = []
+        # fitness values are known without reading the model outputs
+        if ind_number in known_fitness or ind_number in duplicate_ind:
+            if ind_number in known_fitness:
+                fitness_model = list(known_fitness[ind_number])
+            else:
+                fitness_model = list(model_values[duplicate_ind[ind_number]])
+            count_real_fitness = len(fitness_model)
         # individual break plausibility rules
-        if i+1 in not_accepted_ind:
+        elif ind_number in not_accepted_ind:
             # return worst fitness values for the excluded individual
             # one worst fitness value
             count_worst_fitness = 0
@@ -353,27 +386,22 @@ def collect_fitness_values(opt_algorithm, number_individuals, fitness, external_
                     fitness_model.append(n)
                     count_worst_fitness += 1
         else:
-            if i == 0:
-                model_folder = 'models'
-            else:
-                model_folder = 'models_%s' %i
-            subfolder_files = external_models
+            # the model outputs of the individual are saved in its results folder
+            model_folder = results_folder(ind_number)
             count_real_fitness = 0
-            for k in subfolder_files:
-                # check if k is a folder
-                if os.path.isdir(os.path.join(wrkDir, model_folder, k)):
-                    j=0
-                    for m in external_models:
-                        # subfolder == possible model folder
-                        if k == m:
-                            values = read_fitness_value(os.path.join(wrkDir, model_folder, k, output_files[j]))
-                            for n in values:
-                                fitness_model.append(n)
-                                count_real_fitness += 1
-                            #WriteLogMsg("Fitness value from external model %s: %s" % (os.path.join(wrkDir, model_folder, k),fitness_model))
-    
-                        else:
-                            j += 1
+            for k, output_file in zip(external_models, output_files):
+                # the fitness values are returned by the evaluation tasks, 
+                # the output file is only read if they are missing
+                if (ind_number, k) in model_fitness:
+                    values = model_fitness[(ind_number, k)]
+                elif os.path.isdir(os.path.join(workspace_folder(), model_folder, k)):
+                    values = read_fitness_value(os.path.join(workspace_folder(), model_folder, k, output_file))
+                else:
+                    continue
+                for n in values:
+                    fitness_model.append(n)
+                    count_real_fitness += 1
+                #WriteLogMsg("Fitness value from external model %s: %s" % (os.path.join(workspace_folder(), model_folder, k),fitness_model))
                             
         if (count_real_fitness != 0 and count_worst_fitness != 0) and count_real_fitness != count_worst_fitness:
             msg = "Error: Number of worst fitness values (%s) is not equal with the number of the model fitness values (%s). Please check the worst fitness values." %(count_worst_fitness, count_real_fitness)
@@ -382,54 +410,16 @@ def collect_fitness_values(opt_algorithm, number_individuals, fitness, external_
             req.close_window
                             
         #WriteLogMsg("Fitness values: %s, %s" %(type(fitness_model),fitness_model))
+        model_values[ind_number] = fitness_model
         if opt_algorithm == "GA":
             fitness.append(fitness_model[0])                
         else:                                        
             # if NSGA 2 then multiple parameters are expected
             fitness.append(ec.emo.Pareto(fitness_model)) 
         #print("fitness-werte bei model-Ordner wechsel %s" %fitness)
-        i += 1
         
     return fitness
 
-#------------------------------------------------------------------------------  
-#   Change parameters in parameter file
-#------------------------------------------------------------------------------
-def change_parameter_values(genom, ind_number):    
-    """Update genom in csv file in the models folders chosen by optimization algorithm.
-
-       input data:
-            genom holds the individual
-            ind_number - describe in which model folder the map should be saved
-                         or if best values are saved in the output folder than 
-                         the number attributed the individual number to the map
-		
-    """
-   
-    if (ind_number == 1):
-        folder_name = 'models'
-    else:
-        folder_name = 'models_%s' %(ind_number-1)
-    
-    msg = "Update genome in models folder %s" %(ind_number)
-    WriteLogMsg(msg)
-    
-    for folder in os.listdir(os.path.join(wrkDir,folder_name)):
-        #msg = "Update genome %r in %s" %(genom,os.path.join(wrkDir,folder_name,folder,'genom.csv')) 
-        if os.path.isdir(os.path.join(wrkDir,folder_name,folder)):
-            in_file = open(os.path.join(wrkDir,folder_name,folder,'genom.csv'), "w")
-            in_file.write("genom\n")
-            for i in genom:
-                line = "%d\n" % i
-                in_file.write(line)  
-            # Close file
-            in_file.close()
-        else:
-            msg = "Error in executing external model %s. Directory does not exist." % os.path.join(wrkDir,folder_name,folder)
-            WriteLogMsg(msg,ind_number)
-            raise SystemError("Error in executing external model. Directory does not exist.")
-            req.close_window
-
 #------------------------------------------------------------------------------  
 #   Documentation of the best solutions
 #------------------------------------------------------------------------------
@@ -489,19 +479,8 @@ def WriteMap(header_all, map_info, modelfolder=False, ind_number=0, feasible=Tru
         else:
             folder_name = 'models_%s' %(ind_number-1)
  
-        for folder in os.listdir(os.path.join(wrkDir,folder_name)):
-            in_file = open(os.path.join(wrkDir,folder_name,folder,'map.asc'), 'w')
-            for element in header_all:
-                if type(element) == bytes:
-                    in_file.write(element.decode(encoding='UTF-8')) 
-                else:
-                    in_file.write(element)
-            for row in map_info:
-                for item in row:
-                    in_file.write("%s " % item)  
-                in_file.write("\n")
-            # Close file
-            in_file.close()
+        for folder in os.listdir(folder_path(folder_name)):
+            write_ascii_file(os.path.join(folder_path(folder_name),folder,'map.asc'), header_all, map_info)
     else:
         # write best maps in output folder
         if ind_number != 0 and feasible == True: 
@@ -515,18 +494,40 @@ def WriteMap(header_all, map_info, modelfolder=False, ind_number=0, feasible=Tru
             fileName = timestamp_file + "patch_ID_map.asc"
         
         #WriteLogMsg("Update map in %s" %os.path.join(wrkDir, "output", fileName))
-        in_file = open(os.path.join(wrkDir, "output", fileName), "w")
-        for element in header_all:
-            if type(element) == bytes:
-                in_file.write(element.decode(encoding='UTF-8')) 
-            else:
-                in_file.write(element)
-        for row in map_info:
-            for item in row:
-                in_file.write("%s " % item)  
-            in_file.write("\n") 
-        # Close file
-        in_file.close()
+        write_ascii_file(os.path.join(wrkDir, "output", fileName), header_all, map_info)
+
+def write_genome_file(file, genom):
+    """Write the genome of an individual (genom.csv) with one write call.
+
+       input data:
+            file is the path of the genome file
+            genom holds the individual
+    """
+
+    in_file = open(file, "w")
+    in_file.write("genom\n" + "".join(["%d\n" % i for i in genom]))
+    in_file.close()
+
+def write_ascii_file(file, header_all, map_info):
+    """Write the header and map information in an ascii file with one write call.
+
+       input data:
+            file is the path of the ascii file
+            header_all holds the original header information
+            map_info holds the map information
+    """
+
+    lines = []
+    for element in header_all:
+        if type(element) == bytes:
+            lines.append(element.decode(encoding='UTF-8'))
+        else:
+            lines.append(element)
+    for row in map_info:
+        lines.append("".join(["%s " % item for item in row]) + "\n")
+    in_file = open(file, "w")
+    in_file.write("".join(lines))
+    in_file.close()
 
 #-------------------------------------------------------------------------------------  
 #   Read fitness values from external models and append them on global fitness vector
@@ -552,7 +553,7 @@ def read_fitness_value(file):
 #-------------------------------------------------------------------------------------  
 #   Run external model
 #-------------------------------------------------------------------------------------
-def run_model(file_path, file_path_R, file_path_python, RPy2, number):
+def run_model(file_path, file_path_R, file_path_python, RPy2, number, r_sessions='False'):
     """Run the external model from file_path.
 
        input:
@@ -561,6 +562,7 @@ def run_model(file_path, file_path_R, file_path_python, RPy2, number):
            file_path_python is the path for the python file
            RPy2 information is RPy2 is available
            number is the individual number of the current population
+           r_sessions information if R models are run in a resident R session
     """
 
     # check if model script, R path and python path exist
@@ -588,22 +590,7 @@ def run_model(file_path, file_path_R, file_path_python, RPy2, number):
     
     if ext == ".R" and RPy2 == "True":
         
-        # delete lines for setting a new work space in the R file
-        infile = open(file_path,'r')
-        newopen = open(os.path.join(os.path.dirname(file_path), 'help_script.txt'), 'w')
-        for line in infile :
-            if ('setwd' not in line) or ('setwd' in line and '#' in line ):
-                    newopen.write(line)
-        newopen.close()
-        infile.close()
-        os.remove(file_path)
-        os.rename(os.path.join(os.path.dirname(file_path), 'help_script.txt'), file_path)
-        # append setwd for setting the R workspace on the right path at the beginning of the file
-        setwd_path = r'%s'%os.path.dirname(r'%s'%file_path)
-        setwd_path = setwd_path.replace('\\', '/')
-        with open(file_path, "r+") as f: s = f.read(); f.seek(0); f.write('setwd("%s")\n'%setwd_path + s)
-        f.close
-        
+        # the R script was prepared once for this workspace (see prepare_model_scripts)
         # Import for run R model via RPy2
         import rpy2.robjects as robjects
         begin=time.time() 
@@ -621,40 +608,24 @@ def run_model(file_path, file_path_R, file_path_python, RPy2, number):
           
     elif ext == ".R" and RPy2 == "False":
         
-        fileName = 'console' + '.txt'
-        logFile = os.path.join(folder, fileName)
-        logFile = logFile.replace('\\', '/') 
-        
-        # delete lines for setting a new work space in the R file
-        infile = open(file_path,'r')
-        newopen = open(os.path.join(os.path.dirname(file_path), 'help_script.txt'), 'w')
-        for line in infile :
-            if (('setwd' not in line) or ('setwd' in line and '#' in line )) and ('sink' not in line):
-                    newopen.write(line)
-        newopen.close()
-        infile.close()
-        os.remove(file_path)
-        os.rename(os.path.join(os.path.dirname(file_path), 'help_script.txt'), file_path)
-        # append setwd for setting the R workspace on the right path at the beginning of the file
-        setwd_path = r'%s'%os.path.dirname(r'%s'%file_path)
-        setwd_path = setwd_path.replace('\\', '/')
-        # without redirect the output of the R file in the logFile
-        #with open(file_path, "r+") as f: s = f.read(); f.seek(0); f.write('setwd("%s")\n'%setwd_path + s)
-        # redirect the output of the R file in the logFile
-        with open(file_path, "r+") as f: s = f.read(); f.seek(0); f.write('setwd("%s")\nsink("%s", append=FALSE)\n'%(setwd_path,logFile) + s +'\nsink()\n')
-        f.close 
-    
+        # the R script was prepared once for this workspace (see prepare_model_scripts),
+        # it sets the R workspace and redirects its output in the console.txt file
         # Execute external model
         try:
 
             # this line create an output file with all infile and output lines
             #cmd = '"%s" --vanilla <%s >%s'%(file_path_R,file_path,os.path.join(folder, fileName))
           
-            # or only the output lines will be documented
-            # via append sink() in the R file 
-            cmd = [file_path_R, 'CMD', 'BATCH', file_path]
             begin=time.time()
-            subprocess.check_call(cmd)
+            if r_sessions == "True":
+                # source the script in the resident R session of this process
+                import rhandler
+                rhandler.get_session(file_path_R).run(file_path)
+            else:
+                # or only the output lines will be documented
+                # via append sink() in the R file 
+                cmd = [file_path_R, 'CMD', 'BATCH', file_path]
+                subprocess.check_call(cmd)
             end=time.time()
             msg = "The model %s ran for %d seconds." %(file_path, end-begin)
             WriteLogMsg(msg, number)  
@@ -743,29 +714,506 @@ def save_timestamp(timestamp_file_parents):
     helpFile.writelines(msg)
     helpFile.close()
     
+#-------------------------------------------------------------------------------------  
+#   Location of the helping folders
+#-------------------------------------------------------------------------------------
+def workspace_folder():
+    """Return the folder which contains the helping folders models_i and models_results.
+
+       This is the working directory or, if workspace_dir is given (e.g. a tmpfs 
+       like /dev/shm), a folder of this tool run in workspace_dir. 
+    """
+
+    if cfg.modelConfig.workspace_dir == 'None':
+        return wrkDir
+    # several projects can use the same workspace_dir
+    name = 'CoMOLA_%s_%s' % (os.path.basename(wrkDir), hashlib.sha1(wrkDir.encode('utf-8')).hexdigest()[:8])
+    return os.path.join(os.path.abspath(cfg.modelConfig.workspace_dir), name)
+
+def folder_path(folder_name):
+    """Return the path of a models folder, the master folder 'models' is always
+       in the working directory, the helping folders are in the workspace folder.
+    """
+
+    if folder_name == 'models':
+        return os.path.join(wrkDir, folder_name)
+    return os.path.join(workspace_folder(), folder_name)
+
+def folder_size(path, files=None):
+    """Return the size of all files in a folder in bytes (links are not counted).
+
+       input:
+           path is the path of the folder
+           files - if given then count only the files with these names
+    """
+
+    size = 0
+    for root, dirs, file_names in os.walk(path):
+        for file in file_names:
+            if files is not None and file not in files:
+                continue
+            if not os.path.islink(os.path.join(root, file)):
+                size += os.path.getsize(os.path.join(root, file))
+    return size
+
+def init_workspace():
+    """Create the workspace folder in workspace_dir and delete it when the tool 
+       terminates, so no model inputs and outputs remain in the memory of the tmpfs.
+    """
+
+    if cfg.modelConfig.workspace_dir == 'None':
+        return
+    if not os.path.isdir(cfg.modelConfig.workspace_dir):
+        msg = "Error: The workspace_dir %s does not exist. Please check config.ini." % cfg.modelConfig.workspace_dir
+        WriteLogMsg(msg)
+        raise SystemError(msg)
+    if not os.path.isdir(workspace_folder()):
+        os.makedirs(workspace_folder())
+    WriteLogMsg("The helping folders are created in %s." % workspace_folder())
+    atexit.register(remove_workspace)
+
+def remove_workspace():
+    """Delete the workspace folder in workspace_dir with all helping folders."""
+
+    if os.path.isdir(workspace_folder()):
+        shutil.rmtree(workspace_folder(), ignore_errors=True)
+
+def check_workspace_space(number_slots, link=False, run_files=(), output_files=(), number_individuals=0):
+    """Check if the file system of the workspace folder has enough free space for 
+       the missing helping folders and the model outputs of one generation.
+
+       input:
+           number_slots is the maximum number of parallel model runs
+           link is True if the static files are linked instead of copied
+           run_files are the files which are written for or by each model run
+           output_files are the file names of the model outputs
+           number_individuals is the number of individuals of one generation
+    """
+
+    missing = [i for i in range(1,number_slots+1) if not os.path.exists(folder_path('models_%s' %i))]
+    if cfg.modelConfig.workspace_dir == 'None' or not missing:
+        return
+    # a helping folder holds a copy of the models folder (or of its run files),
+    # the results folder holds the outputs and console outputs of all individuals
+    if link:
+        slot_size = folder_size(folder_path('models'), run_files)
+    else:
+        slot_size = folder_size(folder_path('models'))
+    result_size = folder_size(folder_path('models'), list(output_files) + ['console.txt'])
+    required = len(missing) * slot_size + number_individuals * result_size
+    free = shutil.disk_usage(workspace_folder()).free
+    if free < 1.1 * required:
+        msg = "Error: Not enough free space in the workspace_dir %s (%d MB free, about %d MB required)." \
+              % (cfg.modelConfig.workspace_dir, free >> 20, required >> 20)
+        WriteLogMsg(msg)
+        raise SystemError(msg)
+
 #-------------------------------------------------------------------------------------  
 #   Check if enough copies of the models folder exists for the multiprocessing.
 #   If not than create the missing folders.
 #-------------------------------------------------------------------------------------
-def copy_models(number_genom):
+def copy_models(number_slots, model_scripts=(), RPy2="False", link=False, run_files=()):
     """Check if enough copies of the models folder exists for the multiprocessing 
-       to run the models for every genom parallel. If not than create the missing folders.
+       to run the models of all parallel model runs. If not than create the missing 
+       folders models_1 to models_<number_slots>. The R scripts of all helping 
+       folders are prepared for the model runs.
 
        input:
-           number_genom is the population size
+           number_slots is the maximum number of parallel model runs
+           model_scripts is a list of tuples (model folder, script file name)
+           RPy2 information is RPy2 is available
+           link is True if the static files are linked instead of copied
+           run_files are the files which are written for or by each model run
     """
        
-    for i in range(1,number_genom):
+    for i in range(1,number_slots+1):
         # check if the copy i of the models folder exist
         folder_name = 'models_%s' %i
         # if not than copy the models folder with the new name
-        if not os.path.exists(os.path.join(wrkDir,folder_name)):
+        if not os.path.exists(folder_path(folder_name)):
             msg = "Create the helping folder ..."
             WriteLogMsg(msg) 
-            shutil.copytree(os.path.join(wrkDir,'models'),os.path.join(wrkDir,folder_name))
+            create_models_folder(os.path.join(wrkDir,'models'),folder_path(folder_name), link, run_files)
             msg = "Done."
             WriteLogMsg(msg) 
+        prepare_model_scripts(folder_name, model_scripts, RPy2)
+
+def link_file(source, target):
+    """Create a hard link to the source file, a symbolic link if hard links 
+       are not possible (e.g. another file system) or else a copy.
+
+       input:
+           source is the file path in the models folder
+           target is the file path in the helping folder
+    """
+
+    try:
+        os.link(source, target)
+        return
+    except (OSError, AttributeError):
+        pass
+    try:
+        os.symlink(source, target)
+        return
+    except (OSError, NotImplementedError, AttributeError):
+        pass
+    shutil.copy2(source, target)
+
+def create_models_folder(source, target, link=False, run_files=()):
+    """Create a helping folder as copy of a models folder.
+
+       If link is True only the run files are copied, all other (static) files 
+       are links to the files of the models folder, so the models must not change 
+       them. Files which are left over from earlier model runs are not taken over.
+
+       input:
+           source is the path of the models folder (or of one model folder)
+           target is the path of the new helping folder
+           link is True if the static files are linked instead of copied
+           run_files are the files which are written for or by each model run
+    """
+
+    if not link:
+        shutil.copytree(source, target)
+        return
+
+    for root, dirs, files in os.walk(source):
+        folder = os.path.join(target, os.path.relpath(root, source))
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        for file in files:
+            if file in stale_files or os.path.splitext(file)[1] in stale_extensions:
+                continue
+            if file in run_files:
+                shutil.copy2(os.path.join(root, file), os.path.join(folder, file))
+            else:
+                link_file(os.path.join(root, file), os.path.join(folder, file))
     
+#-------------------------------------------------------------------------------------  
+#   Update the helping folders with the changed files of the models folder
+#-------------------------------------------------------------------------------------
+# manifest of a helping folder: hash values of the updated files
+manifest_file = '.update_manifest.json'
+
+def file_hash(file_path):
+    """Return the hash value of the content of a file."""
+
+    hash_object = hashlib.sha1()
+    in_file = open(file_path, 'rb')
+    for block in iter(lambda: in_file.read(1 << 20), b''):
+        hash_object.update(block)
+    in_file.close()
+    return hash_object.hexdigest()
+
+def models_manifest(update_files):
+    """Return the hash values of the files of the models folder which have to be 
+       updated in the helping folders, relative path -> hash value.
+
+       input:
+           update_files is a list of tuples (model folder, file or folder name)
+    """
+
+    manifest = {}
+    for sub_folder, name in update_files:
+        path = os.path.join(wrkDir, 'models', sub_folder, name)
+        if os.path.isfile(path):
+            manifest[os.path.join(sub_folder, name)] = file_hash(path)
+        elif os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                for file in files:
+                    file_path = os.path.join(root, file)
+                    manifest[os.path.relpath(file_path, os.path.join(wrkDir, 'models'))] = file_hash(file_path)
+        else:
+            msg = "Path %s can`t be updated, because the original path does not exist. Please check config.ini." % path
+            WriteLogMsg(msg)
+            raise SystemError(msg)
+    return manifest
+
+def forget_prepared_script(file_path):
+    """Delete the checksum of a prepared model script (see prepare_model_scripts)
+       whose file was replaced by the source script, so it is prepared again 
+       before the next model run.
+    """
+
+    file_checksum = os.path.join(os.path.dirname(file_path), '.%s.prepared' % os.path.basename(file_path))
+    if os.path.isfile(file_checksum):
+        os.remove(file_checksum)
+
+def sync_help_folder(folder_name, manifest, link=False):
+    """Copy the changed files of the models folder into one helping folder 
+       and return the list of the updated files.
+
+       The hash values of the files in the helping folder are saved in its 
+       manifest, so unchanged files are not read again at the next start.
+
+       input:
+           folder_name is the name of the helping folder (models_i)
+           manifest are the hash values of the files of the models folder
+           link is True if the static files are linked instead of copied
+    """
+
+    file_manifest = os.path.join(folder_path(folder_name), manifest_file)
+    if os.path.isfile(file_manifest):
+        in_file = open(file_manifest, 'r')
+        folder_manifest = json.load(in_file)
+        in_file.close()
+    else:
+        folder_manifest = {}
+
+    updated = []
+    for file, checksum in sorted(manifest.items()):
+        source = os.path.join(wrkDir, 'models', file)
+        target = os.path.join(folder_path(folder_name), file)
+        if folder_manifest.get(file) == checksum and os.path.isfile(target):
+            continue
+        # files without manifest entry are compared by their content
+        if file not in folder_manifest and os.path.isfile(target) and file_hash(target) == checksum:
+            folder_manifest[file] = checksum
+            forget_prepared_script(target)
+            continue
+        if os.path.lexists(target):
+            # a (hard) link must not be overwritten, it would change the file of the models folder
+            os.remove(target)
+        elif not os.path.isdir(os.path.dirname(target)):
+            os.makedirs(os.path.dirname(target))
+        if link:
+            link_file(source, target)
+        else:
+            shutil.copy2(source, target)
+        forget_prepared_script(target)
+        folder_manifest[file] = checksum
+        updated.append(file)
+
+    out_file = open(file_manifest, 'w')
+    json.dump(folder_manifest, out_file, indent=0, sort_keys=True)
+    out_file.close()
+    return updated
+
+def update_help_folders(update_files, link=False, number_threads=1):
+    """Update the files and folders from the update_filesx entries in all existing 
+       helping folders. The files of the models folder are hashed once and only 
+       changed files are copied, the helping folders are updated in parallel.
+
+       input:
+           update_files is a list of tuples (model folder, file or folder name)
+           link is True if the static files are linked instead of copied
+           number_threads is the number of helping folders which are updated at the same time
+    """
+
+    folders = []
+    i = 1
+    while os.path.exists(folder_path('models_%s' %i)):
+        folders.append('models_%s' %i)
+        i += 1
+    if not folders or not update_files:
+        return
+
+    manifest = models_manifest(update_files)
+    executor = ThreadPoolExecutor(max(1, min(number_threads, len(folders))))
+    updated = dict(zip(folders, executor.map(lambda folder_name: sync_help_folder(folder_name, manifest, link), folders)))
+    executor.shutdown()
+
+    changed = sorted(set(file for files in updated.values() for file in files))
+    if changed:
+        WriteLogMsg("Updated %d files in %d helping folders: %s" 
+                    % (len(changed), len([folder for folder in folders if updated[folder]]), ", ".join(changed)))
+    else:
+        WriteLogMsg("The helping folders are up to date.")
+
+#-------------------------------------------------------------------------------------  
+#   Model outputs of the individuals
+#-------------------------------------------------------------------------------------
+def results_folder(ind_number):
+    """Return the folder (relative to the workspace folder) with the model outputs of an individual."""
+
+    return os.path.join('models_results', 'individual_%d' % ind_number)
+
+def clear_model_results():
+    """Delete the model outputs of the previous generation."""
+
+    if os.path.exists(folder_path('models_results')):
+        shutil.rmtree(folder_path('models_results'))
+    os.makedirs(folder_path('models_results'))
+
+def remove_model_results(ind_number):
+    """Delete the model outputs of an individual after its fitness values are collected
+       (steady-state evaluation, the individual numbers are not reused)."""
+
+    shutil.rmtree(os.path.join(workspace_folder(), results_folder(ind_number)), ignore_errors=True)
+
+def staging_folder(ind_number, model_folder, attempt):
+    """Return the folder in which a model run saves the outputs of an individual
+       before they are moved into place (accept_model_outputs).
+
+       input:
+           ind_number is the individual number of the current population
+           model_folder is the folder name of the model
+           attempt is the name of the helping folder in which the model ran
+    """
+
+    return os.path.join(workspace_folder(), results_folder(ind_number), '%s.%s' % (model_folder, attempt))
+
+def save_model_outputs(model_path, ind_number, model_folder, output_file, attempt):
+    """Move the output file and the console output of a model run from the
+       helping folder into the staging folder of the individual, so the
+       helping folder is free for the next model run.
+
+       input:
+           model_path is the path of the model folder in the helping folder
+           ind_number is the individual number of the current population
+           model_folder is the folder name of the model
+           output_file is the file name of the model output
+           attempt is the name of the helping folder
+    """
+
+    folder = staging_folder(ind_number, model_folder, attempt)
+    # outputs of an earlier failed run in the same helping folder
+    shutil.rmtree(folder, ignore_errors=True)
+    os.makedirs(folder)
+    for file in (output_file, 'console.txt'):
+        if os.path.isfile(os.path.join(model_path, file)):
+            shutil.move(os.path.join(model_path, file), os.path.join(folder, file))
+    return folder
+
+def save_batch_outputs(model_path, ind_numbers, model_folder, output_file, attempt):
+    """Split the output table of a batch model run into the output files of the 
+       individuals in their results folders, the console output is copied for 
+       each individual.
+
+       The output file of a batch model run has one row per individual (in the 
+       order of genom_batch.csv) with the fitness values of the model as columns.
+
+       input:
+           model_path is the path of the model folder in the helping folder
+           ind_numbers are the individual numbers in the order of the batch
+           model_folder is the folder name of the model
+           output_file is the file name of the model output
+           attempt is the name of the helping folder
+
+       The outputs are saved in the staging folders of the individuals, 
+       return the fitness values as dictionary individual number -> list.
+    """
+
+    rows = []
+    in_file = open(os.path.join(model_path, output_file), 'r')
+    for row in csv.reader(in_file):
+        if row:
+            rows.append([float(value) for value in row])
+    in_file.close()
+    if len(rows) != len(ind_numbers):
+        msg = "Error: The batch output %s has %d rows for %d individuals." % (os.path.join(model_path, output_file), len(rows), len(ind_numbers))
+        WriteLogMsg(msg)
+        raise SystemError(msg)
+
+    for ind_number, values in zip(ind_numbers, rows):
+        folder = staging_folder(ind_number, model_folder, attempt)
+        shutil.rmtree(folder, ignore_errors=True)
+        os.makedirs(folder)
+        out_file = open(os.path.join(folder, output_file), 'w')
+        for value in values:
+            out_file.write("%r\n" % value)
+        out_file.close()
+        if os.path.isfile(os.path.join(model_path, 'console.txt')):
+            shutil.copy(os.path.join(model_path, 'console.txt'), os.path.join(folder, 'console.txt'))
+    os.remove(os.path.join(model_path, output_file))
+    return dict(zip(ind_numbers, rows))
+
+def accept_model_outputs(ind_numbers, model_folder, attempt):
+    """Move the staged outputs of a model run into the results folders of the
+       individuals. Return False if another run of the task (a speculative copy
+       in another helping folder) was saved first, the staged outputs are then deleted.
+
+       The rename of the first folder decides which run is used, so the results 
+       folders never hold a mix of the outputs of two runs.
+
+       input:
+           ind_numbers are the individual numbers of the task
+           model_folder is the folder name of the model
+           attempt is the name of the helping folder
+    """
+
+    for index, ind_number in enumerate(ind_numbers):
+        folder = os.path.join(workspace_folder(), results_folder(ind_number), model_folder)
+        try:
+            os.rename(staging_folder(ind_number, model_folder, attempt), folder)
+        except OSError:
+            if index > 0 or not os.path.isdir(folder):
+                raise
+            for number in ind_numbers:
+                shutil.rmtree(staging_folder(number, model_folder, attempt), ignore_errors=True)
+            return False
+    return True
+
+#-------------------------------------------------------------------------------------  
+#   Prepare the R scripts of a models folder once
+#-------------------------------------------------------------------------------------
+def script_lines(file_path, keep_sink=False):
+    """Return the lines of a model script without the lines which set the
+       R workspace and redirect the console output. These lines are written
+       by the tool itself and differ between the model folders.
+
+       input:
+           file_path is the script file path of a model
+           keep_sink is True if the sink lines of the script are kept
+    """
+
+    lines = []
+    script = open(file_path, 'r')
+    for line in script:
+        if (('setwd' not in line) or ('setwd' in line and '#' in line)) and (keep_sink or 'sink' not in line):
+            lines.append(line)
+    script.close()
+    return "".join(lines).rstrip() + "\n"
+
+def prepare_model_scripts(folder_name, model_scripts, RPy2):
+    """Write the R scripts of a models folder in the form which is executed by run_model:
+       set the R workspace on the folder of the script and (without RPy2) redirect the 
+       console output in console.txt. A checksum of the source script in the models 
+       folder is saved next to each script, so a script is only written again if its 
+       source has changed.
+
+       input:
+           folder_name is the name of the models folder (models or models_i)
+           model_scripts is a list of tuples (model folder, script file name)
+           RPy2 information is RPy2 is available
+    """
+
+    for model_folder, script in model_scripts:
+        if os.path.splitext(script)[1] != '.R':
+            continue
+        source_path = os.path.join(wrkDir, 'models', model_folder, script)
+        file_path = os.path.join(folder_path(folder_name), model_folder, script)
+        if not os.path.isfile(source_path) or not os.path.isfile(file_path):
+            continue
+        folder = os.path.dirname(file_path).replace('\\', '/')
+        if RPy2 == "True":
+            head = 'setwd("%s")\n' % folder
+            content = head + script_lines(source_path, True)
+        else:
+            logFile = os.path.join(folder, 'console.txt').replace('\\', '/')
+            head = 'setwd("%s")\nsink("%s", append=FALSE)\n' % (folder, logFile)
+            content = head + script_lines(source_path) + 'sink()\n'
+        checksum = hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+        # checksum of the prepared script
+        file_checksum = os.path.join(os.path.dirname(file_path), '.%s.prepared' % script)
+        if os.path.isfile(file_checksum):
+            checksum_file = open(file_checksum, 'r')
+            prepared = checksum_file.read().strip()
+            checksum_file.close()
+            if prepared == checksum:
+                continue
+
+        # replace the script in one step
+        file_help = file_path + '.help'
+        help_file = open(file_help, 'w')
+        help_file.write(content)
+        help_file.close()
+        os.replace(file_help, file_path)
+        checksum_file = open(file_checksum, 'w')
+        checksum_file.write(checksum)
+        checksum_file.close()
+
 #-------------------------------------------------------------------------------------  
 #   Delete the helping models folder
 #-------------------------------------------------------------------------------------
@@ -776,10 +1224,13 @@ def delete_models():
     WriteLogMsg(msg)    
     i = 1
     folder_name = 'models_%s' %i
-    while os.path.exists(os.path.join(wrkDir,folder_name)):
-        shutil.rmtree(os.path.join(wrkDir,folder_name))
+    while os.path.exists(folder_path(folder_name)):
+        shutil.rmtree(folder_path(folder_name))
         i += 1
         folder_name = 'models_%s' %i
+    # model outputs of the individuals
+    if os.path.exists(folder_path('models_results')):
+        shutil.rmtree(folder_path('models_results'))
     msg = "Done."
     WriteLogMsg(msg) 
 
@@ -25,6 +25,8 @@
     .. moduleauthor:: Aaron Garrett <aaron.lee.garrett@gmail.com>
 """
 from inspyred.ec import ec
+import collections.abc
+import copy
 import math
 
 
@@ -147,6 +149,124 @@ class NSGA2(ec.EvolutionaryComputation):
         previous_arc = archive
         return ec.EvolutionaryComputation.evolve(self, generator, evaluator, pop_size, seeds, maximize, bounder, is_available, custom_individual, previous_arc, num_generation, **args)
 
+
+class AsyncNSGA2(NSGA2):
+    """Evolutionary computation representing an asynchronous steady-state NSGA-II.
+    
+    This class uses the operators of ``NSGA2`` but has no generational
+    barrier. After the initial population is evaluated, up to *capacity*
+    offspring are evaluated at the same time. As soon as the evaluation of 
+    one offspring is finished, it is inserted into the population with the 
+    nondominated sorting replacement (the population size stays constant), 
+    the archive is updated and new offspring are created from the current 
+    population. So slow evaluations do not stop the evolution of the others.
+    
+    The *evaluator* is an object which evaluates the initial population when
+    it is called like a normal evaluator and which provides the following
+    methods and attributes for the steady-state phase:
+    
+    - *submit(candidate, args)* -- start the evaluation of a candidate
+    - *results(args)* -- wait until at least one evaluation is finished and
+      return a list of (candidate, fitness) tuples
+    - *cancel(args)* -- stop the evaluations which are still running
+    - *capacity* -- the number of candidates which are evaluated at the same time
+    
+    One generation corresponds to *pop_size* finished evaluations, the 
+    observers are called and the terminators are checked after each 
+    generation, so generation based terminators and observers work as before.
+    
+    """
+    def evolve(self, generator, evaluator, pop_size=100, seeds=None, maximize=True, bounder=None, is_available = None, custom_individual= [],archive = None, num_generation= 0 , **args):
+        args.setdefault('num_selected', pop_size)
+        args.setdefault('tournament_size', 2)
+        self._kwargs = args
+        self._kwargs['_ec'] = self
+        
+        if seeds is None:
+            seeds = []
+        if bounder is None:
+            bounder = ec.Bounder()
+        
+        self.termination_cause = None
+        self.generator = generator
+        self.evaluator = evaluator
+        self.bounder = bounder
+        self.maximize = maximize
+        self.population = []
+        if is_available == True:
+            self.archive = archive
+            self.num_generations = num_generation + 1
+        else:
+            self.archive = []
+            self.num_generations = 0
+        
+        # Create and evaluate the initial population.
+        initial_cs = copy.copy(seeds)
+        for _ in range(max(pop_size - len(seeds), 0)):
+            initial_cs.append(generator(random=self._random, args=self._kwargs, custom_individual=custom_individual))
+        self.logger.debug('evaluating initial population')
+        initial_fit = evaluator(candidates=initial_cs, args=self._kwargs)
+        for cs, fit in zip(initial_cs, initial_fit):
+            if fit is not None:
+                ind = ec.Individual(cs, maximize=maximize)
+                ind.fitness = fit
+                self.population.append(ind)
+            else:
+                self.logger.warning('excluding candidate {0} because fitness received as None'.format(cs))
+        self.num_evaluations = len(initial_fit)
+        self.archive = self.archiver(random=self._random, population=list(self.population), archive=list(self.archive), args=self._kwargs)
+        self._observe()
+        
+        # the selector creates the parents of one variation (e.g. one crossover)
+        select_args = dict(self._kwargs)
+        select_args['num_selected'] = 2
+        running = 0
+        finished = 0
+        terminate = self._should_terminate(list(self.population), self.num_generations, self.num_evaluations)
+        while not terminate:
+            # Create new offspring until the evaluator is busy.
+            while running < evaluator.capacity:
+                parents = self.selector(random=self._random, population=list(self.population), args=select_args)
+                offspring_cs = [copy.deepcopy(i.candidate) for i in parents]
+                if isinstance(self.variator, collections.abc.Iterable):
+                    for op in self.variator:
+                        offspring_cs = op(random=self._random, candidates=offspring_cs, args=self._kwargs)
+                else:
+                    offspring_cs = self.variator(random=self._random, candidates=offspring_cs, args=self._kwargs)
+                for cs in offspring_cs:
+                    evaluator.submit(cs, self._kwargs)
+                    running += 1
+            
+            # Insert each evaluated offspring as soon as it is finished.
+            for cs, fit in evaluator.results(self._kwargs):
+                running -= 1
+                finished += 1
+                self.num_evaluations += 1
+                if fit is None:
+                    self.logger.warning('excluding candidate {0} because fitness received as None'.format(cs))
+                else:
+                    off = ec.Individual(cs, maximize=maximize)
+                    off.fitness = fit
+                    self.population = self.replacer(random=self._random, population=self.population, parents=[], offspring=[off], args=self._kwargs)
+                    self.archive = self.archiver(random=self._random, archive=self.archive, population=[off], args=self._kwargs)
+                if finished % pop_size == 0:
+                    self.num_generations += 1
+                    self._observe()
+                    terminate = self._should_terminate(list(self.population), self.num_generations, self.num_evaluations)
+                    if terminate:
+                        break
+        
+        # the results of the offspring which are still running are not needed anymore
+        evaluator.cancel(self._kwargs)
+        return self.population
+        
+    def _observe(self):
+        if isinstance(self.observer, collections.abc.Iterable):
+            for obs in self.observer:
+                obs(population=list(self.population), num_generations=self.num_generations, num_evaluations=self.num_evaluations, args=self._kwargs)
+        else:
+            self.observer(population=list(self.population), num_generations=self.num_generations, num_evaluations=self.num_evaluations, args=self._kwargs)
+
     
 class PAES(ec.EvolutionaryComputation):
     """Evolutionary computation representing the Pareto Archived Evolution Strategy.
@@ -53,6 +53,9 @@ import config as cfg
 wrkDir = os.path.abspath('.')
 # first_ind is True for the first call of the generate_parameter function
 first_ind = True
+# number of individuals of the resumed generation which were accepted 
+# without the constraint check (start_from_previous_gen)
+previous_gen_accepted = 0
 # array for the start individual
 start_individual = []
 # array for original ASCII map
@@ -864,12 +867,14 @@ def individual_filter(new_cand):
 	global start_individual
 	# array for static land use types
 	global static_elements
+	# number of individuals of the resumed generation which were accepted
+	global previous_gen_accepted
 	
 	compare_individual = start_individual
 
-	i = 0
-	if cfg.ea.start_from_previous_gen == True and i < cfg.ea.pop_size:
-		i =i +1
+	# the population of the resumed generation was checked in the previous run
+	if cfg.ea.start_from_previous_gen == True and previous_gen_accepted < cfg.ea.pop_size:
+		previous_gen_accepted += 1
 		return_value= True
 	else:
 		# for each element of the individual, check if transition is allowed
@@ -2495,6 +2500,28 @@ def get_from_maphandler():
 	
 	return map, patchID_map, header_all
 
+#-------------------------------------------------------------------------------------	
+#	Generate land use map from individual
+#-------------------------------------------------------------------------------------
+def render_individual_map(individual, map_info=None, patchID_map_info=None):
+	"""Return the land use map of an individual as array.
+	
+		input data: 
+			individual as basic for the new map
+			map_info and patchID_map_info are the original map and the patch ID map
+			(if None then the global variables of this module are used)
+	"""
+	
+	if map_info is None or patchID_map_info is None:
+		map_info = map
+		patchID_map_info = patchID_map
+	
+	# static elements (patch ID 0) keep the land use of the original map,
+	# all other elements get the land use type of their patch from the individual
+	genes = np.asarray(individual)
+	land_use = np.where(patchID_map_info == 0, map_info, genes[np.maximum(patchID_map_info, 1) - 1])
+	return land_use.astype(patchID_map_info.dtype)
+
 #-------------------------------------------------------------------------------------	
 #	Generate ascii-map from individual
 #-------------------------------------------------------------------------------------
@@ -2513,31 +2540,14 @@ def transform_individual_ascii_map(individual, modelfolder=False, ind_number=0,
 	
 	#WriteLogMsg("Update ascii-map for %r" %individual)
 	if map_info is None or patchID_map_info is None or header_all_info is None:
-		# Array for original ASCII map
-		global map
-		# Array for the patch ID map
-		global patchID_map
 		# Array for the header information from ASCII map
-		global header_all
+		header_all_info = header_all
+		ascii_map = render_individual_map(individual)
 	else:
-		map = np.copy(map_info)
-		patchID_map = np.copy(patchID_map_info)
-		header_all = header_all_info
-	
-	# create an independent copy of the patchID_map for the new map
-	ascii_map = np.copy(patchID_map)
-	for row in range(ascii_map.shape[0]):
-		for col in range(ascii_map.shape[1]):
-			# replace static elements with original elements of the original map
-			if ascii_map[row][col] == 0:
-				ascii_map[row][col] = map[row][col]
-			# replace non static elements with the land use typ of the individual
-			else:
-				index = ascii_map[row][col]-1
-				ascii_map[row][col] = individual[index]
+		ascii_map = render_individual_map(individual, map_info, patchID_map_info)
 			  
 	# write header information and ascii_map in new ascii-file
-	WriteMap(header_all, ascii_map, modelfolder, ind_number, feasible)
+	WriteMap(header_all_info, ascii_map, modelfolder, ind_number, feasible)
   
 #------------------------------------------------------------------------------	 
 #	Test functions
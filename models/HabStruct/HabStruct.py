@@ -0,0 +1,58 @@
+##########################################################################################
+#
+#     ~ ~ ~ Simple habitat quality model based on landscape structure ~ ~ ~
+#     ~ ~ ~ this is just a toy model ~ ~ ~
+#     ~ ~ ~ vectorized NumPy port of HabStruct.R as model plugin (pluginx = True) ~ ~ ~
+#
+#     ~ ~ ~ Input data ~ ~ ~
+#    land_use_array      |land use map containing the following classes
+#                        |1,2,3,4,5 = arable land with increasing intensity from 1 to 5
+#                        |6 = forest
+#                        |7 = pasture
+#                        |8 = urban area
+#                        |-2 = no data
+#    Objective: Maximize edges (-> complex habitat structure)
+#
+##########################################################################################
+import os
+import numpy as np
+
+#################### Function for counting habitat edges ####################
+def edgecount(x):
+    """Number of neighbouring cells (vertical and horizontal) with different
+       land use, cells with no data (-2) are ignored."""
+
+    valid = x != -2
+    vertical = (x[:-1, :] != x[1:, :]) & valid[:-1, :] & valid[1:, :]
+    horizontal = (x[:, :-1] != x[:, 1:]) & valid[:, :-1] & valid[:, 1:]
+    return int(vertical.sum() + horizontal.sum())
+
+def weighted_edges(lu_map, intensity):
+    """Edges between arable land of the given intensity and forest/pasture."""
+
+    x = lu_map.copy()
+    x[(x != intensity) & (x != 6) & (x != 7)] = -2
+    x[(x == 6) | (x == 7)] = 1
+    return edgecount(x) / float(intensity)
+
+def evaluate(land_use_array, genome, context):
+    lu_map = np.asarray(land_use_array)
+
+    # count only "full" edges (=1) between arable land with intensity 1, forest and pasture
+    lu_map_1 = lu_map.copy()
+    lu_map_1[(lu_map_1 >= 2) & (lu_map_1 <= 5)] = -2
+    lu_map_1[lu_map_1 == 8] = -2
+    edges = edgecount(lu_map_1)
+
+    # edges of arable land with intensity 2 ... 5 to forest and pasture (weight 1/intensity)
+    for intensity in range(2, 6):
+        edges += weighted_edges(lu_map, intensity)
+    return [edges]
+
+#################### Self-check against the output of the R model ####################
+if __name__ == "__main__":
+    folder = os.path.dirname(os.path.abspath(__file__))
+    lu_map = np.array([line.split() for line in open(os.path.join(folder, "map.asc")).read().splitlines() if line.strip()][6:], dtype=float)
+    value = evaluate(lu_map, None, {'model_folder' : folder})[0]
+    r_value = float(open(os.path.join(folder, "HabStruct_output.csv")).readline())
+    print("HabStruct: NumPy %.10g, R %.10g, relative difference %.2e" % (value, r_value, abs(value - r_value) / max(abs(r_value), 1e-12)))
@@ -0,0 +1,36 @@
+##########################################################################################
+#
+#     ~ ~ ~ Simple SAR (Species Area relationship) Model ~ ~ ~
+#     ~ ~ ~ this is just a toy model ~ ~ ~
+#     ~ ~ ~ vectorized NumPy port of SAR.R as model plugin (pluginx = True) ~ ~ ~
+#
+#     ~ ~ ~ Input data ~ ~ ~
+#    land_use_array      |land use map containing the following classes
+#                        |1,2,3,4,5 = arable land with increasing intensity from 1 to 5
+#                        |6 = forest
+#                        |7 = pasture
+#                        |8 = urban area
+#                        |-2 = no data
+#    Objective: Maximize species richness
+#
+##########################################################################################
+import os
+import numpy as np
+
+# species-area relationship S = c*A^z
+c = 5
+z = 0.2
+
+def evaluate(land_use_array, genome, context):
+    # determine area (= number of cells) covered by forest,
+    # like in SAR.R the cells of class 7 are counted
+    forest_area = int((np.asarray(land_use_array) == 7).sum())
+    return [c * forest_area**z]
+
+#################### Self-check against the output of the R model ####################
+if __name__ == "__main__":
+    folder = os.path.dirname(os.path.abspath(__file__))
+    lu_map = np.array([line.split() for line in open(os.path.join(folder, "map.asc")).read().splitlines() if line.strip()][6:], dtype=float)
+    value = evaluate(lu_map, None, {'model_folder' : folder})[0]
+    r_value = float(open(os.path.join(folder, "SAR_output.csv")).readline())
+    print("SAR: NumPy %.10g, R %.10g, relative difference %.2e" % (value, r_value, abs(value - r_value) / max(abs(r_value), 1e-12)))
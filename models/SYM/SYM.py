@@ -0,0 +1,49 @@
+##########################################################################################
+#
+#     ~ ~ ~ Simple Yield Model (SYM) ~ ~ ~
+#     ~ ~ ~ this is just a toy model ~ ~ ~
+#     ~ ~ ~ vectorized NumPy port of SYM.R as model plugin (pluginx = True) ~ ~ ~
+#
+#     ~ ~ ~ Input data ~ ~ ~
+#    land_use_array      |land use map containing the following classes
+#                        |1,2,3,4,5 = arable land with increasing intensity from 1 to 5
+#                        |6 = forest
+#                        |7 = pasture
+#                        |8 = urban area
+#                        |-2 = no data
+#
+#    soilfertilityfrompatch.asc |map on soil fertility which can range from 0.1 to 1
+#                               |(read once per worker process from the model folder)
+#
+#    Objective: Maximize crop yield
+#
+##########################################################################################
+import os
+import numpy as np
+
+# soil fertility maps, model folder -> array
+fert_maps = {}
+
+def evaluate(land_use_array, genome, context):
+    folder = context['model_folder']
+    if folder not in fert_maps:
+        # the ascii map may have empty lines (line ends \r\r\n)
+        lines = [line.split() for line in open(os.path.join(folder, "soilfertilityfrompatch.asc")).read().splitlines() if line.strip()]
+        fert_maps[folder] = np.array(lines[6:], dtype=float)
+    fert_map = fert_maps[folder]
+    lu_map = np.asarray(land_use_array, dtype=float)
+
+    # calculate crop yield of the arable land as logarithmic function of intensity and soil fertility
+    arable = (lu_map <= 5) & (lu_map > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        yield_ = np.log(lu_map[arable] * (1 + fert_map[arable]))
+    yield_[np.isnan(yield_)] = 0
+    return [float(yield_.sum())]
+
+#################### Self-check against the output of the R model ####################
+if __name__ == "__main__":
+    folder = os.path.dirname(os.path.abspath(__file__))
+    lu_map = np.array([line.split() for line in open(os.path.join(folder, "map.asc")).read().splitlines() if line.strip()][6:], dtype=float)
+    value = evaluate(lu_map, None, {'model_folder' : folder})[0]
+    r_value = float(open(os.path.join(folder, "SYM_output.csv")).readline())
+    print("SYM: NumPy %.10g, R %.10g, relative difference %.2e" % (value, r_value, abs(value - r_value) / max(abs(r_value), 1e-12)))
@@ -0,0 +1,38 @@
+##########################################################################################
+#
+#     ~ ~ ~ Simple model to predict water yield (WYLD) ~ ~ ~
+#     ~ ~ ~ this is just a toy model ~ ~ ~
+#     ~ ~ ~ vectorized NumPy port of WYLD.R as model plugin (pluginx = True) ~ ~ ~
+#
+#     ~ ~ ~ Input data ~ ~ ~
+#    land_use_array      |land use map containing the following classes
+#                        |1,2,3,4,5 = arable land with increasing intensity from 1 to 5
+#                        |6 = forest
+#                        |7 = pasture
+#                        |8 = urban area
+#                        |-2 = no data
+#
+#    Objective: Maximize water yield
+#
+##########################################################################################
+import os
+import numpy as np
+
+# Kc coefficients of the land use classes 1 ... 7
+Kc = np.array([0.9, 0.925, 0.95, 0.975, 1, 0.96, 1.14])
+
+def evaluate(land_use_array, genome, context):
+    # count land use classes except urban
+    lu_map = np.asarray(land_use_array).astype(int)
+    lu_n = np.bincount(lu_map[(lu_map >= 1) & (lu_map <= 7)], minlength=8)[1:8]
+
+    # calculate water yield as sum of inverted Kc values
+    return [float((lu_n / Kc).sum())]
+
+#################### Self-check against the output of the R model ####################
+if __name__ == "__main__":
+    folder = os.path.dirname(os.path.abspath(__file__))
+    lu_map = np.array([line.split() for line in open(os.path.join(folder, "map.asc")).read().splitlines() if line.strip()][6:], dtype=float)
+    value = evaluate(lu_map, None, {'model_folder' : folder})[0]
+    r_value = float(open(os.path.join(folder, "WYLD_output.csv")).readline())
+    print("WYLD: NumPy %.10g, R %.10g, relative difference %.2e" % (value, r_value, abs(value - r_value) / max(abs(r_value), 1e-12)))
@@ -0,0 +1,552 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+#
+#   Name:       nethandler.py
+#   Purpose:    This module distributes the model runs over several computers.
+#               The coordinator in the optimization process sends the
+#               (genome, model) tasks over TCP to the registered network
+#               workers, each worker runs them in its own worker pool.
+#
+#               Start a worker in a copy of the CoMOLA folder (config.ini,
+#               input and models folder) on each computer:
+#
+#                   python nethandler.py --connect host:port -t 4
+#
+#   Author:     Carola Paetzold, Michael Strauch
+#   Contact:    michael.strauch@ufz.de
+#
+#               Helmholtz Centre for Environmental Research - UFZ
+#               Department Computational Landscape Ecology - CLE
+#               Permoserstrasse 15
+#               D-04318 Leipzig, Germany
+#               http://www.ufz.de
+#
+#   Created:    Sun Oct 18 2026
+#
+#   Copyright:  (c) Carola Paetzold / Michael Strauch 2026
+#
+#   Licence:    This program is free software:
+#               you can redistribute it and/or modify it under the terms
+#               of the GNU General Public License as published by the
+#               Free Software Foundation, either version 3 of the License,
+#               or (at your option) any later version. This program is
+#               distributed in the hope that it will be useful, but
+#               WITHOUT ANY WARRANTY; without even the implied warranty
+#               of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#               See the GNU General Public License for more details.
+#               You should have received a copy of the GNU General
+#               Public License along with this program.
+#               If not, see <http://www.gnu.org/licenses/>.
+#
+#------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------
+import os
+import time
+import shutil
+import socket
+import threading
+import multiprocessing
+from multiprocessing.connection import Listener
+from multiprocessing.connection import Client
+from argparse import ArgumentParser
+import queue
+
+import numpy as np
+
+import config as cfg
+import filehandler as fh
+from filehandler import WriteLogMsg
+from poolhandler import WorkerPool
+from poolhandler import SharedRaster
+from poolhandler import run_model_task
+from poolhandler import workspace_run_files
+
+wrkDir = os.path.abspath('.')
+
+# seconds between two checks of the messages of the coordinator
+# while a network worker waits for results
+poll_interval = 0.1
+
+#------------------------------------------------------------------------------
+#   Helper functions
+#------------------------------------------------------------------------------
+def parse_address(address):
+    """Return the tuple (host, port) of an address 'host:port'."""
+
+    host, port = address.rsplit(':', 1)
+    return host, int(port)
+
+def run_remote_task(task, map_info, patchID_map_info, header_all_info):
+    """Run a task in a worker process of a network worker and return the fitness
+       values and the console output of each evaluated individual,
+       individual number -> (fitness values, console output).
+
+       input:
+           task is a ModelTask
+           map_info, patchID_map_info and header_all_info are the variables
+           for the map creation
+    """
+
+    # no output of an earlier generation may be taken for this run, the
+    # outputs of the run are moved into place as a new folder
+    for ind_number in task.ind_numbers():
+        shutil.rmtree(os.path.join(fh.workspace_folder(), fh.results_folder(ind_number), task.model_folder), ignore_errors=True)
+
+    values = run_model_task(task, map_info, patchID_map_info, header_all_info)
+
+    results = {}
+    for ind_number in task.ind_numbers():
+        folder = os.path.join(fh.workspace_folder(), fh.results_folder(ind_number), task.model_folder)
+        console = None
+        if os.path.isfile(os.path.join(folder, 'console.txt')):
+            console_file = open(os.path.join(folder, 'console.txt'), 'r')
+            console = console_file.read()
+            console_file.close()
+        if isinstance(values, dict):
+            # batch task
+            results[ind_number] = (values[ind_number], console)
+        else:
+            results[ind_number] = (values, console)
+    return results
+
+def save_remote_console(task, results):
+    """Save the console outputs of a remote model run in the results folders
+       of the individuals and return the fitness values of the task (the list
+       of fitness values or for a batch task a dictionary individual number -> list).
+
+       input:
+           task is a ModelTask
+           results are the results of run_remote_task
+    """
+
+    for ind_number, (values, console) in results.items():
+        if console is None:
+            continue
+        folder = os.path.join(fh.workspace_folder(), fh.results_folder(ind_number), task.model_folder)
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        console_file = open(os.path.join(folder, 'console.txt'), 'w')
+        console_file.write(console)
+        console_file.close()
+    if task.batch is None:
+        return results[task.ind_number][0]
+    return dict([(ind_number, values) for ind_number, (values, console) in results.items()])
+
+#------------------------------------------------------------------------------
+#   Coordinator
+#------------------------------------------------------------------------------
+class NetworkNode:
+    """Connection of the coordinator to a registered network worker."""
+
+    def __init__(self, number, connection, name, slots):
+        """input:
+               number is the number of the node at the coordinator
+               connection is the connection to the worker
+               name is the name of the worker (host and process id)
+               slots is the number of parallel model runs of the worker
+        """
+
+        self.number = number
+        self.connection = connection
+        self.name = name
+        self.slots = max(1, slots)
+        # task_ids of the tasks which were sent to the worker
+        self.running = set()
+        self.lock = threading.Lock()
+
+    def send(self, message):
+        """Send a message to the worker, return False if the connection is lost."""
+
+        try:
+            with self.lock:
+                self.connection.send(message)
+            return True
+        except (OSError, EOFError, ValueError):
+            return False
+
+class NetPool:
+    """Evaluation backend with the interface of the WorkerPool which sends the
+       tasks over TCP to network workers.
+
+       The workers register themselves at the coordinator, a task is sent to the
+       worker with the most free slots as soon as one is free. The tasks of a
+       worker which loses its connection get the status 'error', so they are
+       repeated on other workers (max_retries).
+    """
+
+    def __init__(self, address, authkey, number_nodes=1, init_args=()):
+        """Listen for network workers and wait until number_nodes workers are registered.
+
+           input:
+               address is the tuple (host, port) on which the coordinator listens
+               authkey is the shared secret of coordinator and workers (bytes)
+               number_nodes is the number of workers to wait for before the evaluation starts
+               init_args are the variables for the map creation, they are sent once to each worker
+        """
+
+        self.init_args = tuple(init_args)
+        self.listener = Listener(address, authkey=authkey)
+        # registered workers, node number -> NetworkNode
+        self.nodes = {}
+        # messages of the workers and registrations (node number or node, message)
+        self.messages = queue.Queue()
+        # tasks which wait for a free slot (task_id, task)
+        self.queued = []
+        # results which are not received from a worker (cancelled or lost tasks)
+        self.lost = []
+        # node number of each task which was sent to a worker
+        self.sent = {}
+        # task of each task_id which is not finished
+        self.tasks = {}
+        # number of submitted tasks without result
+        self.pending = 0
+        self.next_id = 0
+        self.next_node = 1
+        # tasks which were cancelled, their results are ignored
+        self.cancelled = set()
+        self.closed = False
+
+        self.thread = threading.Thread(target=self._accept)
+        self.thread.daemon = True
+        self.thread.start()
+
+        WriteLogMsg("Coordinator listens on %s:%d, waiting for %d network workers ..." % (address[0], address[1], number_nodes))
+        while len(self.nodes) < number_nodes:
+            self._handle(self.messages.get())
+
+    @property
+    def number_workers(self):
+        """Number of parallel model runs of all registered workers."""
+
+        return max(1, sum([node.slots for node in self.nodes.values()]))
+
+    def _accept(self):
+        """Accept the connections of new workers (in a background thread)."""
+
+        while not self.closed:
+            try:
+                connection = self.listener.accept()
+                kind, name, slots = connection.recv()
+                if kind != 'register':
+                    connection.close()
+                    continue
+                connection.send(('init', self.init_args))
+            except (OSError, EOFError, ValueError, multiprocessing.AuthenticationError):
+                continue
+            node = NetworkNode(self.next_node, connection, name, slots)
+            self.next_node += 1
+            self.messages.put((node, ('registered',)))
+            receiver = threading.Thread(target=self._receive, args=(node,))
+            receiver.daemon = True
+            receiver.start()
+
+    def _receive(self, node):
+        """Receive the messages of a worker (in a background thread)."""
+
+        while True:
+            try:
+                message = node.connection.recv()
+            except (OSError, EOFError, ValueError):
+                self.messages.put((node.number, ('lost',)))
+                return
+            self.messages.put((node.number, message))
+
+    def _dispatch(self):
+        """Send the queued tasks to the workers with free slots."""
+
+        while self.queued:
+            free = [(node.slots - len(node.running), node.number) for node in self.nodes.values() if len(node.running) < node.slots]
+            if not free:
+                return
+            node = self.nodes[max(free)[1]]
+            task_id, task = self.queued.pop(0)
+            if node.send(('task', task_id, task)):
+                node.running.add(task_id)
+                self.sent[task_id] = node.number
+            else:
+                self.queued.insert(0, (task_id, task))
+                self._remove_node(node.number)
+
+    def _remove_node(self, number):
+        """Remove a worker which lost its connection, its tasks fail."""
+
+        node = self.nodes.pop(number, None)
+        if node is None:
+            return
+        WriteLogMsg("The connection to the network worker %s is lost." % node.name)
+        for task_id in node.running:
+            self.sent.pop(task_id, None)
+            self.lost.append(('error', task_id, "The connection to the network worker %s is lost." % node.name))
+        node.running = set()
+        try:
+            node.connection.close()
+        except OSError:
+            pass
+        if not self.nodes:
+            WriteLogMsg("No network worker is connected, the coordinator waits for new workers.")
+
+    def _handle(self, item):
+        """Handle a message of the queue and return the result of a finished task or None."""
+
+        source, message = item
+        kind = message[0]
+        if kind == 'registered':
+            self.nodes[source.number] = source
+            WriteLogMsg("Network worker %s registered with %d slots." % (source.name, source.slots))
+            self._dispatch()
+            return None
+        if source not in self.nodes:
+            return None
+        if kind == 'lost':
+            self._remove_node(source)
+            self._dispatch()
+            return None
+        kind, task_id, result = message
+        self.nodes[source].running.discard(task_id)
+        self.sent.pop(task_id, None)
+        self._dispatch()
+        return kind, task_id, result
+
+    def _result(self, kind, task_id, result):
+        """Return the result of a finished task, the status of cancelled tasks is 'cancelled'."""
+
+        self.pending -= 1
+        task = self.tasks.pop(task_id)
+        if task_id in self.cancelled:
+            return 'cancelled', task_id, None
+        if kind == 'done':
+            result = save_remote_console(task, result)
+        return kind, task_id, result
+
+    def submit(self, task):
+        """Queue a task for the next free worker slot and return its task id."""
+
+        task_id = self.next_id
+        self.next_id += 1
+        self.pending += 1
+        self.tasks[task_id] = task
+        self.queued.append((task_id, task))
+        self._dispatch()
+        return task_id
+
+    def cancel(self, task_id):
+        """Stop a task. get_result returns the status 'cancelled' for the task
+           as soon as the worker confirms that it does not run any more.
+        """
+
+        if task_id in self.cancelled or task_id not in self.tasks:
+            return
+        self.cancelled.add(task_id)
+        for index, (queued_id, task) in enumerate(self.queued):
+            if queued_id == task_id:
+                del self.queued[index]
+                self.lost.append(('cancelled', task_id, None))
+                return
+        if task_id in self.sent and not self.nodes[self.sent[task_id]].send(('cancel', task_id)):
+            self._remove_node(self.sent[task_id])
+
+    def get_result(self, timeout=None):
+        """Wait for the next finished task.
+
+           Return a tuple (status, task_id, result) where status is 'done', 'error'
+           or 'cancelled' and result holds the fitness values or the error message.
+           Return None if no task has finished within timeout seconds or if a 
+           worker registered (number_workers changed).
+        """
+
+        if timeout is not None:
+            end = time.time() + timeout
+        while True:
+            if self.lost:
+                return self._result(*self.lost.pop(0))
+            try:
+                if timeout is None:
+                    item = self.messages.get()
+                else:
+                    item = self.messages.get(True, max(0, end - time.time()))
+            except queue.Empty:
+                return None
+            answer = self._handle(item)
+            if answer is not None:
+                return self._result(*answer)
+            if item[1][0] == 'registered':
+                # the scheduler can start more tasks
+                return None
+
+    def shutdown(self):
+        """Send the termination signal to all workers and stop listening."""
+
+        self.closed = True
+        for node in self.nodes.values():
+            node.send(('shutdown',))
+            try:
+                node.connection.close()
+            except OSError:
+                pass
+        self.nodes = {}
+        self.listener.close()
+
+#------------------------------------------------------------------------------
+#   Network worker
+#------------------------------------------------------------------------------
+def model_scripts():
+    """Return the list of tuples (model folder, script file name) of the config.ini."""
+
+    scripts = []
+    for number in range(1,5):
+        try:
+            scripts.append((getattr(cfg.modelConfig, 'model%d_folder' % number), getattr(cfg.modelConfig, 'file_model%d' % number)))
+        except AttributeError:
+            break
+    return scripts
+
+def connect(address, authkey, wait=60):
+    """Connect to the coordinator, a worker may be started before the coordinator,
+       so the connection is tried again up to wait seconds.
+
+       input:
+           address is the tuple (host, port) of the coordinator
+           authkey is the shared secret of coordinator and workers (bytes)
+           wait is the maximum time to wait for the coordinator in seconds
+    """
+
+    end = time.time() + wait
+    while True:
+        try:
+            return Client(address, authkey=authkey)
+        except OSError:
+            if time.time() > end:
+                msg = "Error: The coordinator %s:%d is not reachable." % address
+                WriteLogMsg(msg)
+                raise SystemError(msg)
+            time.sleep(1)
+
+def run_worker(address, authkey, number_slots, wait=60):
+    """Register at the coordinator and run its tasks until the coordinator shuts down.
+
+       The worker runs in a copy of the CoMOLA folder, the tasks are executed
+       in the helping folders models_1 ... models_<number_slots> of this copy.
+
+       input:
+           address is the tuple (host, port) of the coordinator
+           authkey is the shared secret of coordinator and workers (bytes)
+           number_slots is the number of parallel model runs
+           wait is the maximum time to wait for the coordinator in seconds
+    """
+
+    fh.create_output_folder()
+    fh.InitLogFile()
+    fh.init_workspace()
+
+    connection = connect(address, authkey, wait)
+    connection.send(('register', '%s:%d' % (socket.gethostname(), os.getpid()), number_slots))
+    kind, init_args = connection.recv()
+    map_info, patchID_map_info, header_all_info = init_args
+    WriteLogMsg("Registered at the coordinator %s:%d with %d slots." % (address[0], address[1], number_slots))
+
+    fh.copy_models(number_slots, model_scripts(), cfg.modelConfig.RPy2_available,
+                   cfg.modelConfig.link_workspaces == 'True', workspace_run_files())
+    fh.clear_model_results()
+    if isinstance(map_info, np.ndarray):
+        map_info = SharedRaster(map_info)
+    if isinstance(patchID_map_info, np.ndarray):
+        patchID_map_info = SharedRaster(patchID_map_info)
+    pool = WorkerPool(run_remote_task, number_slots, (map_info, patchID_map_info, header_all_info))
+
+    # messages of the coordinator
+    inbox = queue.Queue()
+    def receive():
+        while True:
+            try:
+                inbox.put(connection.recv())
+            except (OSError, EOFError, ValueError):
+                inbox.put(('shutdown',))
+                return
+    receiver = threading.Thread(target=receive)
+    receiver.daemon = True
+    receiver.start()
+
+    free_slots = ['models_%d' % number for number in range(number_slots, 0, -1)]
+    # tasks which wait for a free slot (task_id, task)
+    waiting = []
+    # local task_id -> (task_id of the coordinator, slot)
+    running = {}
+    # task_id of the coordinator -> local task_id
+    local_ids = {}
+    try:
+        while True:
+            # the messages of the coordinator are handled first, 
+            # without running tasks the worker only waits for them
+            try:
+                if running:
+                    message = inbox.get_nowait()
+                else:
+                    fh.join_ind_number_log()
+                    message = inbox.get()
+            except queue.Empty:
+                message = None
+            if message is None:
+                pass
+            elif message[0] == 'shutdown':
+                break
+            elif message[0] == 'task':
+                waiting.append(message[1:])
+            elif message[0] == 'cancel':
+                task_id = message[1]
+                if task_id in local_ids:
+                    pool.cancel(local_ids[task_id])
+                elif [item for item in waiting if item[0] == task_id]:
+                    waiting = [item for item in waiting if item[0] != task_id]
+                    connection.send(('cancelled', task_id, None))
+            while waiting and free_slots:
+                task_id, task = waiting.pop(0)
+                slot = free_slots.pop()
+                local_id = pool.submit(task.copy(slot))
+                running[local_id] = (task_id, slot)
+                local_ids[task_id] = local_id
+            if message is not None or not running:
+                continue
+
+            # results of the local worker processes
+            answer = pool.get_result(poll_interval)
+            if answer is None:
+                continue
+            status, local_id, result = answer
+            if local_id not in running:
+                continue
+            task_id, slot = running.pop(local_id)
+            del local_ids[task_id]
+            free_slots.append(slot)
+            connection.send((status, task_id, result))
+    finally:
+        pool.shutdown()
+        connection.close()
+        WriteLogMsg("The coordinator closed the connection.")
+        fh.join_ind_number_log()
+
+#------------------------------------------------------------------------------
+#   Command line interface of the network worker
+#------------------------------------------------------------------------------
+if __name__ == "__main__":
+    parser = ArgumentParser(description = 'CoMOLA network worker')
+    parser.add_argument("--connect", dest = "address", default = cfg.modelConfig.net_address,
+                        help = "address host:port of the coordinator, defaults to net_address of the config.ini")
+    parser.add_argument("-t", "--threads", dest = "nthreads", type = int, default = multiprocessing.cpu_count(),
+                        help = "number of parallel model runs, defaults to the number of cpu cores")
+    parser.add_argument("--authkey", dest = "authkey", default = cfg.modelConfig.net_authkey,
+                        help = "shared secret of coordinator and workers (required), defaults to net_authkey of the config.ini")
+    parser.add_argument("--wait", dest = "wait", type = float, default = 60,
+                        help = "maximum time in seconds to wait for the coordinator, defaults to 60")
+    options = parser.parse_args()
+    if options.authkey == 'None':
+        parser.error("a shared secret of coordinator and workers is required (--authkey or net_authkey of the config.ini)")
+    run_worker(parse_address(options.address), options.authkey.encode('utf-8'), options.nthreads, options.wait)
+
+#------------------------------------------------------------------------------
+#
+#   EOF
+#
+#------------------------------------------------------------------------------
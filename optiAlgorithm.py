@@ -43,13 +43,10 @@ import ast
 import os
 import sys
 import time
+import atexit
 import multiprocessing
-try:
-    # Python 2
-    import Queue
-except ImportError:
-    # Python 2 and 3
-    import queue as Queue
+import collections.abc
+import numpy as np
 
 from inspyred import ec
 
@@ -63,6 +60,25 @@ from maphandler import individual_filter
 from maphandler import transform_individual_ascii_map
 from maphandler import get_from_maphandler
 from requirements import close_window
+from poolhandler import WorkerPool
+from poolhandler import SharedRaster
+from poolhandler import ModelTask
+from poolhandler import TaskScheduler
+from poolhandler import RuntimeEstimator
+from poolhandler import run_model_task
+from poolhandler import is_plugin
+from poolhandler import is_batch
+from poolhandler import model_timeout
+from poolhandler import workspace_run_files
+from poolhandler import batch_tasks
+from asynchandler import AsyncPool
+from nethandler import NetPool
+from nethandler import parse_address
+from cachehandler import FitnessCache
+from cachehandler import EvaluationJournal
+from cachehandler import candidate_hash
+from cachehandler import compute_fingerprint
+from surrogatehandler import Surrogate
 from __init__ import options
 
 wrkDir = os.path.abspath('.')
@@ -110,146 +126,452 @@ custom_individuals =[]
 # array for the start individual
 start_individual = []
 
-#------------------------------------------------------------------------------  
-#   Models: second level process handling for multiprocessing
-#------------------------------------------------------------------------------
-def process_handling(queue):
-    """Process handling for multiprocessing in the second level."""
-    
-    # get tasks of the holding stack and call start function to execute the model
-    while True:  
+# persistent pool of worker processes for the evaluation of the individuals
+evaluation_pool = None
 
-        try:
-            # wait in maximum 1 second if no element is found in the queue
-            # relevant for Linux 
-            argument = queue.get(True,1)
-            number = str(argument[0]) + str(argument[1])
-            model = argument[2]
-            msg = "Start model %s" %model
-            WriteLogMsg(msg,number)
-            fh.run_model(model, file_path_R, cfg.modelConfig.file_path_python, cfg.modelConfig.RPy2_available, number)
-        
-        #except:
-        # Python 2 and 3
-        except Exception as e:
-            if type(e) != Queue.Empty:
-                WriteLogMsg("Error: %s, %s" %(str(type(e)),str(e)))
-                #WriteLogMsg("Unexpected error: %s" %sys.exc_info()[0])
-                break
-            else:
-                break
+# persistent fitness cache (if activated in the config.ini)
+fitness_cache = None
+
+# journal of the finished model runs (if activated in the config.ini)
+evaluation_journal = None
+
+# surrogate model for the pre-screening of the offspring (if activated in the config.ini)
+surrogate_model = None
+
+# archiver of the algorithm, it gets the individuals of the surrogate model
+# only after their evaluation by the models (see archive_evaluated())
+surrogate_archiver = None
+
+# variators of the algorithm which are applied in evaluate() (pipelined mode)
+pipelined_variators = None
+
+# evaluated individuals as references for the delta inputs (if activated in the config.ini),
+# list of tuples (genome, dictionary model folder -> fitness values)
+reference_individuals = []
+
+# run time estimates of the models for the scheduling of the tasks
+runtime_estimator = RuntimeEstimator()
 
 #------------------------------------------------------------------------------  
-#   Execute external models
+#   Evaluation tasks of an individual
 #------------------------------------------------------------------------------
-def execute_models(ind_number):
-    """Execute external models."""
-    
-    msg = "Run external models ..."
-    WriteLogMsg(msg,ind_number)
-    
-    if (ind_number == 1):
-        folder_name = 'models'
-    else:
-        folder_name = 'models_%s' %(ind_number-1)
-
-    # Run models depending on the optimization algorithm                    
-    if opt_algorithm == "GA":
-        # Run model 1
-        fh.run_model(os.path.join(wrkDir, folder_name, model1_folder,file_model1), file_path_R, cfg.modelConfig.file_path_python, cfg.modelConfig.RPy2_available,ind_number)
-           
-    elif opt_algorithm == "NSGA2":                                        
-        # for NSGAII, in maximum 4 objectives are allowed 
-        # run the models in parallel on separate CPU-cores
+def get_model_tasks(ind_number, individual):
+    """Return one evaluation task per external model for an individual.
+
+       input:
+           ind_number is the individual number of the current population
+           individual is the genome of the individual
+    """
+
+    tasks = [ModelTask(ind_number, 1, individual, model1_folder, file_model1, is_plugin(1), model_timeout(1))]
 
-        # count models and add tasks for the multiprocessing processes to the queue
-        work_queue = multiprocessing.Queue()
-        number_models = 1
-        argument = [ind_number,number_models,os.path.join(wrkDir, folder_name, model1_folder,file_model1)]
-        work_queue.put(argument)
+    # for GA only the first model is used
+    if opt_algorithm == "NSGA2":
+        # for NSGAII, in maximum 4 objectives are allowed 
         try:  
-            argument = [ind_number,number_models+1,os.path.join(wrkDir, folder_name, model2_folder,file_model2)]
-            work_queue.put(argument)
-            number_models += 1 
-            argument = [ind_number,number_models+1,os.path.join(wrkDir, folder_name, model3_folder,file_model3)]
-            work_queue.put(argument) 
-            number_models += 1   
-            argument = [ind_number,number_models+1,os.path.join(wrkDir, folder_name, model4_folder,file_model4)]
-            work_queue.put(argument) 
-            number_models += 1
-        except:
+            tasks.append(ModelTask(ind_number, 2, individual, model2_folder, file_model2, is_plugin(2), model_timeout(2)))
+            tasks.append(ModelTask(ind_number, 3, individual, model3_folder, file_model3, is_plugin(3), model_timeout(3)))
+            tasks.append(ModelTask(ind_number, 4, individual, model4_folder, file_model4, is_plugin(4), model_timeout(4)))
+        except NameError:
             pass        
-
-        # define maximum number of processes to run in parallel
-        if options.nthreads == "max cpu cores":
-            nthreads = multiprocessing.cpu_count()
-        else:
-            nthreads = int(options.nthreads)
-
-        # holds the multiprocessing processes
-        jobs = []
-        i = 0
-
-        # create the multiprocessing processes
-        while i < min(number_models, nthreads):
-            p = multiprocessing.Process(target=process_handling,args=(work_queue,))
-            jobs.append(p)
-            p.start()
-            i += 1
-
-        for j in jobs:
-            # wait until all multiprocessing processes are finished
-            j.join()
-    else:
+    elif opt_algorithm != "GA":
         msg = "The selected optimization algorithm is not implemented."
         WriteLogMsg(msg,ind_number)
-            
-    msg = "Done."
-    WriteLogMsg(msg,ind_number)
 
-#------------------------------------------------------------------------------  
-#   Individuals: first level process handling for multiprocessing
+    # the models get the changes relative to the most similar evaluated individual
+    if cfg.modelConfig.delta_inputs == 'True':
+        reference = find_reference(individual)
+        if reference is not None:
+            for task in tasks:
+                if task.model_folder in reference[1]:
+                    task.reference = (reference[0], reference[1][task.model_folder])
+
+    return tasks
+
+def find_reference(individual):
+    """Return the evaluated individual (genome, model fitness values) with the fewest
+       different genes for the delta inputs or None.
+    """
+
+    if not reference_individuals:
+        return None
+    genomes = np.array([genome for genome, values in reference_individuals])
+    differences = (genomes != np.asarray(individual)).sum(axis=1)
+    return reference_individuals[int(np.argmin(differences))]
+
+def remember_references(evaluated, model_fitness):
+    """Keep the model fitness values of evaluated individuals as references for the delta inputs.
+
+       input:
+           evaluated is a list of tuples (individual number, genome) of the individuals 
+           which are evaluated by all models
+           model_fitness holds the fitness values which were returned by the evaluation 
+           tasks per (individual number, model folder)
+    """
+
+    if cfg.modelConfig.delta_inputs != 'True':
+        return
+    external_models, model_files, output_files = get_model_files()
+    for ind_number, individual in evaluated:
+        values = {}
+        for folder, output in zip(external_models, output_files):
+            file = os.path.join(fh.workspace_folder(), fh.results_folder(ind_number), folder, output)
+            if (ind_number, folder) in model_fitness:
+                values[folder] = list(model_fitness[(ind_number, folder)])
+            elif os.path.isfile(file):
+                values[folder] = fh.read_fitness_value(file)
+        reference_individuals.append((list(individual), values))
+    # the references of the last two generations
+    del reference_individuals[:-2*cfg.ea.pop_size]
+
 #------------------------------------------------------------------------------
-def genome_process_handling(queue_arg):
-    """Process handling for multiprocessing in the first level."""
-    
-    queue = queue_arg[0]
-    map_info = queue_arg[1]
-    patchID_map_info = queue_arg[2]
-    header_all_info = queue_arg[3]
-    
-    while True:  
+#   Start and stop the persistent evaluation pool
+#------------------------------------------------------------------------------
+def get_nthreads():
+    """Return the maximum number of processes to run in parallel."""
+
+    if options.nthreads == "max cpu cores":
+        return multiprocessing.cpu_count()
+    else:
+        return int(options.nthreads)
+
+def start_evaluation_pool():
+    """Start the worker processes which evaluate the individuals of all generations."""
+
+    global evaluation_pool
+
+    if evaluation_pool is not None:
+        return evaluation_pool
+
+    # the workers wait for tasks until they are shut down, this also has to happen
+    # if the optimization is terminated by an error
+    atexit.register(stop_evaluation_pool)
+
+    # model runs which exceed their timeout get the worst fitness values
+    if [number for number in range(1,5) if model_timeout(number) is not None] and cfg.mapConfig.file_worst_fitness == 'None':
+        msg = "Error: Model timeouts require worst fitness values (file_worst_fitness)."
+        WriteLogMsg(msg)
+        raise SystemError(msg)
+
+    # every worker runs one model of one individual at a time,
+    # so the number of workers is the maximum number of parallel model runs
+    nthreads = get_nthreads()
+
+    map_info, patchID_map_info, header_all_info = get_from_maphandler()
+    if cfg.modelConfig.backend == 'asyncio':
+        # one event loop controls all model runs as subprocesses
+        evaluation_pool = AsyncPool(nthreads, (map_info, patchID_map_info, header_all_info))
+        WriteLogMsg("Asyncio evaluation backend started with %d concurrent model runs." % evaluation_pool.number_workers)
+        if cfg.modelConfig.r_sessions == 'True' or cfg.modelConfig.RPy2_available == 'True':
+            WriteLogMsg("The asyncio backend runs R models with R CMD BATCH, r_sessions and RPy2_available are not used.")
+        return evaluation_pool
+
+    if cfg.modelConfig.backend == 'network':
+        # the messages are pickled, so only workers which know the secret may connect
+        if cfg.modelConfig.net_authkey == 'None':
+            msg = "Error: The network backend requires a shared secret of the coordinator and the network workers (net_authkey)."
+            WriteLogMsg(msg)
+            raise SystemError(msg)
+        # the model runs are sent to the network workers (python nethandler.py)
+        evaluation_pool = NetPool(parse_address(cfg.modelConfig.net_address), cfg.modelConfig.net_authkey.encode('utf-8'), 
+                                  int(cfg.modelConfig.net_workers), (map_info, patchID_map_info, header_all_info))
+        WriteLogMsg("Network evaluation backend started with %d parallel model runs." % evaluation_pool.number_workers)
+        return evaluation_pool
+
+    # transfer the variables for map creation once to the workers,
+    # the rasters are placed in shared memory and not copied
+    if isinstance(map_info, np.ndarray):
+        map_info = SharedRaster(map_info)
+    if isinstance(patchID_map_info, np.ndarray):
+        patchID_map_info = SharedRaster(patchID_map_info)
+    evaluation_pool = WorkerPool(run_model_task, nthreads, (map_info, patchID_map_info, header_all_info))
+    WriteLogMsg("Evaluation pool started with %d worker processes." % evaluation_pool.number_workers)
+    return evaluation_pool
+
+def get_model_files():
+    """Return the folder names, the script file names and the output file names of the external models."""
+
+    external_models = []
+    model_files = []
+    output_files = []
+    for number in range(1,5):
         try:
-            # get the individual of the holding stack and start the evaluation
-            # wait in maximum 1 second if no element is found in the queue
-            # relevant for Linux
-            argument = queue.get(True,1)
-            ind_number = argument[0]
-            individual = argument[1]
-            msg = "Evaluation of individual %d" %(ind_number)   
-            WriteLogMsg(msg,ind_number) 
-            # change individual in genom.csv file
-            fh.change_parameter_values(individual,ind_number)
-            if (file_HRU == 'None' and cfg.modelConfig.map == 'True') or (file_HRU != 'None' and cfg.modelConfig.map == 'True' and cfg.mapConfig.file_ID_map != 'None'):
-                # save or change individual as map in map.asc file
-                transform_individual_ascii_map(individual,True,ind_number, map_info, patchID_map_info, header_all_info)
-            # start external model         
-            execute_models(ind_number)
-        #except:
-        # Python 3 and 2
-        except Exception as e:
-            if type(e) != Queue.Empty:
-                WriteLogMsg("Error: %s, %s" %(str(type(e)),str(e)))
-                #WriteLogMsg("Unexpected error: %s" %sys.exc_info()[0])
-                break
+            folder = getattr(cfg.modelConfig, 'model%d_folder' % number)
+            script = getattr(cfg.modelConfig, 'file_model%d' % number)
+            output = getattr(cfg.modelConfig, 'file_output%d' % number)
+        except AttributeError:
+            break
+        external_models.append(folder)
+        model_files.append(script)
+        output_files.append(output)
+    return external_models, model_files, output_files
+
+def get_fitness_cache():
+    """Return the persistent fitness cache or None if it is not activated in the config.ini."""
+
+    global fitness_cache
+
+    if fitness_cache is None and cfg.modelConfig.fitness_cache == 'True':
+        external_models, model_files, output_files = get_model_files()
+        fingerprint = compute_fingerprint(external_models, model_files, output_files)
+        fitness_cache = FitnessCache(os.path.join(wrkDir, 'output', 'fitness_cache.sqlite'), fingerprint)
+        WriteLogMsg("Fitness cache opened (fingerprint of models and input data: %s)." % fingerprint)
+    return fitness_cache
+
+def close_fitness_cache():
+    """Close the persistent fitness cache."""
+
+    global fitness_cache
+
+    if fitness_cache is not None:
+        fitness_cache.close()
+        fitness_cache = None
+
+def get_journal():
+    """Return the evaluation journal or None if it is not activated in the config.ini."""
+
+    global evaluation_journal
+
+    if evaluation_journal is None and cfg.modelConfig.journal == 'True':
+        external_models, model_files, output_files = get_model_files()
+        fingerprint = compute_fingerprint(external_models, model_files, output_files)
+        evaluation_journal = EvaluationJournal(os.path.join(wrkDir, 'output', 'evaluation_journal.csv'), fingerprint,
+                                               cfg.ea.start_from_previous_gen == True)
+    return evaluation_journal
+
+def close_journal():
+    """Close the evaluation journal."""
+
+    global evaluation_journal
+
+    if evaluation_journal is not None:
+        evaluation_journal.log_statistics()
+        evaluation_journal.close()
+        evaluation_journal = None
+
+def replay_model_runs(candidate):
+    """Return the fitness values of the model runs of a candidate which are in the 
+       evaluation journal, dictionary model folder -> values.
+    """
+
+    journal = get_journal()
+    if journal is None:
+        return {}
+    replayed = {}
+    external_models, model_files, output_files = get_model_files()
+    for folder in external_models:
+        values = journal.get(candidate, folder)
+        if values is not None:
+            replayed[folder] = values
+    return replayed
+
+def journal_model_run(generation, task, status, result):
+    """Write a finished model run in the evaluation journal.
+
+       input:
+           generation is the current generation number
+           task, status and result are the results of the TaskScheduler
+    """
+
+    journal = get_journal()
+    if journal is None or status != 'done' or result is None:
+        return
+    if isinstance(result, dict):
+        # fitness values of a batch task, individual number -> values
+        for ind_number, individual in task.batch:
+            journal.write(generation, individual, task.model_folder, result[ind_number])
+    else:
+        journal.write(generation, task.individual, task.model_folder, result)
+
+def journal_random_state(generator):
+    """Save the states of the random number generators after the evaluation of a 
+       generation in the evaluation journal. If the journal holds the states of the
+       interrupted run for this generation, they are restored instead, so the resumed
+       run creates the same offspring and finds their model runs in the journal.
+
+       input:
+           generator is the random number generator of the optimization algorithm
+    """
+
+    journal = get_journal()
+    if journal is None:
+        return
+    states = journal.get_state(nmbr_generation)
+    if states is None:
+        journal.write_state(nmbr_generation, {'ec' : generator.getstate(), 'random' : random.getstate()})
+    else:
+        # JSON has no tuples
+        generator.setstate((states['ec'][0], tuple(states['ec'][1]), states['ec'][2]))
+        random.setstate((states['random'][0], tuple(states['random'][1]), states['random'][2]))
+        WriteLogMsg("Evaluation journal: random number generators restored to their state after generation %d." % nmbr_generation)
+
+def get_surrogate():
+    """Return the surrogate model or None if it is not activated in the config.ini."""
+
+    global surrogate_model
+
+    if surrogate_model is None and cfg.modelConfig.surrogate == 'True':
+        surrogate_model = Surrogate(int(max_range), cfg.ea.maximize == 'True', float(cfg.modelConfig.surrogate_fraction),
+                                    int(cfg.modelConfig.surrogate_neighbours), int(cfg.modelConfig.surrogate_min_samples))
+        WriteLogMsg("Surrogate model activated, %s of the offspring are evaluated by the models." % cfg.modelConfig.surrogate_fraction)
+    return surrogate_model
+
+def predicted_label(candidate):
+    """Return a mark for the log file if the fitness values of the candidate were predicted by the surrogate."""
+
+    if surrogate_model is not None and surrogate_model.is_predicted(candidate):
+        return "(predicted) "
+    return ""
+
+def archive_evaluated(random, population, archive, args):
+    """Archiver of the surrogate mode: the individuals of the population with 
+       predicted fitness values are evaluated by the models before the archiver
+       of the algorithm is applied. So the archive, the population of the next
+       generation and all outputs (individuals file, best solutions, Pareto 
+       archive, best maps) only hold fitness values of the models.
+    """
+
+    predicted = [individual for individual in population if surrogate_model.is_predicted(individual.candidate)]
+    if predicted:
+        fitness = evaluate([individual.candidate for individual in predicted], args, True)
+        for individual, values in zip(predicted, fitness):
+            individual.fitness = values
+        args['_ec'].num_evaluations += len(predicted)
+        external_models, model_files, output_files = get_model_files()
+        number_models = 1 if opt_algorithm == "GA" else len(external_models)
+        surrogate_model.forget_predictions([individual.candidate for individual in predicted], number_models)
+    return surrogate_archiver(random=random, population=population, archive=archive, args=args)
+
+def evaluate_before_archive(ea):
+    """Let the individuals with predicted fitness values (surrogate model) be 
+       evaluated by the models before they enter the archive.
+    """
+
+    global surrogate_archiver
+
+    if cfg.modelConfig.surrogate == 'True':
+        surrogate_archiver = ea.archiver
+        ea.archiver = archive_evaluated
+
+def stop_evaluation_pool():
+    """Shut down the worker processes of the evaluation pool."""
+
+    global evaluation_pool
+
+    if evaluation_pool is not None:
+        evaluation_pool.shutdown()
+        evaluation_pool = None
+        WriteLogMsg("Evaluation pool stopped.")
+
+#------------------------------------------------------------------------------  
+#   Pipelined variation
+#------------------------------------------------------------------------------
+class PendingOffspring(list):
+    """Parents of the offspring of a generation in the pipelined mode, 
+       evaluate() varies them pair by pair (see offspring_stream()).
+    """
+
+def defer_variation(random, candidates, args):
+    """Variator of the pipelined mode, the parents are passed to evaluate() 
+       which applies the variators of the algorithm.
+    """
+
+    return PendingOffspring(candidates)
+
+def pipeline_variation(ea):
+    """Move the variators of the algorithm into evaluate(), so the model runs of
+       each offspring start as soon as it is varied (and repaired) and the 
+       variation of the next offspring overlaps with them.
+    """
+
+    global pipelined_variators
+
+    if cfg.modelConfig.surrogate == 'True':
+        WriteLogMsg("Pipelined variation is not used, the surrogate model screens all offspring of a generation at once.")
+        return
+    variators = ea.variator
+    if not isinstance(variators, collections.abc.Iterable):
+        variators = [variators]
+    # only crossovers of one pair of parents and mutations of one candidate (the 
+    # @crossover and @mutator variators of inspyred) can vary the offspring one by one
+    for op in variators:
+        if not hasattr(op, 'single_crossover') and not hasattr(op, 'single_mutation'):
+            WriteLogMsg("Pipelined variation is not used, the variator %s varies the whole generation at once." 
+                        % getattr(op, '__name__', op))
+            return
+    pipelined_variators = list(variators)
+    ea.variator = defer_variation
+    WriteLogMsg("Pipelined variation: the model runs of each offspring start as soon as it is varied.")
+
+def offspring_stream(candidates, args):
+    """Yield the candidates of evaluate() one after the other.
+
+       In the pipelined mode (candidates is a PendingOffspring) the crossovers
+       and mutations of the variators are applied to one pair of parents after
+       the other and the offspring replace the parents in candidates, the list 
+       which the algorithm gets back. Like in the variation of the whole 
+       generation, the crossover drops the last parent of an odd number and 
+       gets the number of the pair (index).
+    """
+
+    if not isinstance(candidates, PendingOffspring):
+        for candidate in candidates:
+            yield candidate
+        return
+
+    parents = list(candidates)
+    del candidates[:]
+    seconds = 0.0
+    for index in range(0, len(parents), 2):
+        begin = time.time()
+        offspring = parents[index:index+2]
+        for op in pipelined_variators:
+            if hasattr(op, 'single_crossover'):
+                cross = op.single_crossover
+                children = []
+                for mom, dad in zip(offspring[::2], offspring[1::2]):
+                    cross.index = index // 2
+                    children.extend(cross(args['_ec']._random, mom, dad, args))
+                offspring = children
             else:
-                break
+                offspring = [op.single_mutation(args['_ec']._random, candidate, args) for candidate in offspring]
+        candidates.extend(offspring)
+        seconds += time.time() - begin
+        for candidate in offspring:
+            yield candidate
+    WriteLogMsg("Variation of %d offspring: %.1f seconds (overlapped with the model runs)." % (len(candidates), seconds))
+
+def replay_individual(ind_number, candidate, known_fitness, replayed):
+    """Take the finished model runs of an individual from the evaluation journal,
+       return True if all its model runs are finished.
+
+       input:
+           known_fitness is the dictionary individual number -> fitness values 
+           of evaluate(), it gets the values if all model runs are finished 
+           replayed is the dictionary (individual number, model folder) -> values
+           of evaluate(), it gets the values of the other finished model runs
+    """
+
+    external_models, model_files, output_files = get_model_files()
+    values = replay_model_runs(candidate)
+    if len(values) == len(external_models):
+        known_fitness[ind_number] = [value for folder in external_models for value in values[folder]]
+        return True
+    for folder in values:
+        replayed[(ind_number, folder)] = values[folder]
+    return False
 
 #------------------------------------------------------------------------------  
 #   Evaluate individuals
 #------------------------------------------------------------------------------
-def evaluate(candidates, args):
-    """Evaluate individuals."""   
+def evaluate(candidates, args, predicted=False):
+    """Evaluate individuals.
+
+       input:
+           predicted is True if the candidates are individuals of the current
+           generation with fitness values of the surrogate model which are
+           evaluated by the models before they enter the archive
+    """   
 
     individuals = candidates
 
@@ -258,21 +580,69 @@ def evaluate(candidates, args):
 
     # increment the generation number
     global nmbr_generation
-    nmbr_generation += 1
+    if not predicted:
+        nmbr_generation += 1
 
-    if len(individuals[0]) < 101:
+    if predicted:
+        WriteLogMsg("Individuals of generation %d with predicted fitness values, evaluated by the models before the archive: " 
+                    % nmbr_generation)
+    elif len(individuals[0]) < 101:
         msg = "Population for generation %d: " % nmbr_generation
         WriteLogMsg(msg)
     
     i = 1    
-    genome_queue = multiprocessing.Queue()
+    # evaluation tasks for the workers of the evaluation pool
+    tasks = []
+    # individuals which are sent to the models, individual number -> candidate
+    model_ind = {}
+
+    # model fitness values which are known from the fitness cache, individual number -> values
+    known_fitness = {}
+    # individuals which are identical with an individual of the same generation,
+    # individual number -> number of the evaluated individual
+    duplicate_ind = {}
+    # individual numbers of the evaluated candidates, candidate hash -> individual number
+    evaluated_ind = {}
+    cache = get_fitness_cache()
+    cache_hits = 0
+    cache_requests = 0
 
     # list with infeasible individuals if constrained_tournament_selection is selected
     if 'constrained_tournament_selection' in cfg.ea.selector:
         infeasible_ind = []
 
+    external_models, model_files, output_files = get_model_files()
+
+    # the worker processes are started once and stay alive for all generations
+    pool = start_evaluation_pool()
+
+    # check/create one helping models folder per worker slot
+    if cfg.modelConfig.backend != 'network':
+        # the network workers have their own helping folders
+        fh.check_workspace_space(pool.number_workers, cfg.modelConfig.link_workspaces == 'True', workspace_run_files(),
+                                 output_files, len(individuals))
+        fh.copy_models(pool.number_workers, list(zip(external_models, model_files)), cfg.modelConfig.RPy2_available,
+                       cfg.modelConfig.link_workspaces == 'True', workspace_run_files())
+    # the model outputs of each individual are moved into models_results
+    fh.clear_model_results()
+
+    # scheduler of all (individual, model) tasks of the generation
+    scheduler = TaskScheduler(pool, int(cfg.modelConfig.max_retries), cfg.modelConfig.speculative == 'True',
+                              float(cfg.modelConfig.speculative_fraction), runtime_estimator, 
+                              cfg.modelConfig.fail_fast == 'True')
+
+    # in the pipelined mode the offspring are varied in offspring_stream() and
+    # the model runs of each individual are started at once
+    pipelined = isinstance(individuals, PendingOffspring)
+    # model runs of an interrupted run which are in the evaluation journal,
+    # (individual number, model folder) -> values
+    replayed = {}
+    replayed_ind = []
+    # individuals whose model runs are started during the variation
+    started_ind = []
+
     # log the new population set
-    for param in individuals:        
+    for param in offspring_stream(individuals, args):
         if len(param) < 101:
             msg = "%d, %r" % (i, param)
             WriteLogMsg(msg)        
@@ -285,9 +655,22 @@ def evaluate(candidates, args):
         # check if individuals are feasible and constrained_tournament_selection is not selected
         # or constrained_tournament_selection is selected -> run models for all individuals
         elif (('constrained_tournament_selection' not in cfg.ea.selector) and individual_filter(param) == True) or ('constrained_tournament_selection' in cfg.ea.selector):
-            # add tasks for the multiprocessing processes to the queue
-            argument = [i,param]
-            genome_queue.put(argument)
+            if cache is not None:
+                key = candidate_hash(param)
+                values = cache.get(param)
+                cache_requests += 1
+                if values is not None:
+                    # fitness values of a previous evaluation
+                    known_fitness[i] = values
+                    cache_hits += 1
+                elif key in evaluated_ind:
+                    # same candidate as an individual of this generation
+                    duplicate_ind[i] = evaluated_ind[key]
+                else:
+                    evaluated_ind[key] = i
+                    model_ind[i] = param
+            else:
+                model_ind[i] = param
 
             # mark infeasible individuals for constrained_tournament_selection
             if 'constrained_tournament_selection' in cfg.ea.selector and individual_filter(param) == False:
@@ -295,88 +678,112 @@ def evaluate(candidates, args):
 
         else:
             not_accepted_ind.append(i) 
-        i += 1
 
-    # transfer also the variables for map creation to the subprocesses
-    map_info, patchID_map_info, header_all_info = get_from_maphandler() 
-    queue_arg=[genome_queue, map_info, patchID_map_info, header_all_info]
+        if pipelined and i in model_ind:
+            if replay_individual(i, param, known_fitness, replayed):
+                replayed_ind.append(i)
+                del model_ind[i]
+            else:
+                # the batch models wait for all individuals of the generation
+                ind_tasks = [task for task in get_model_tasks(i, param) if (i, task.model_folder) not in replayed]
+                tasks.extend([task for task in ind_tasks if is_batch(task.model_number)])
+                scheduler.add([task for task in ind_tasks if not is_batch(task.model_number)])
+                scheduler.poll()
+                started_ind.append(i)
+        i += 1
 
-    # check/create helping models folder for multiprocessing
-    fh.copy_models(i-1)
+    for ind_number in sorted(model_ind):
+        if ind_number not in started_ind and replay_individual(ind_number, model_ind[ind_number], known_fitness, replayed):
+            # all model runs of the individual are finished
+            replayed_ind.append(ind_number)
+            del model_ind[ind_number]
+    if replayed_ind or replayed:
+        WriteLogMsg("Taken from the evaluation journal: individuals %r (all model runs) and %d model runs of other individuals." 
+                    % (replayed_ind, len(replayed)))
+
+    # the surrogate predicts the fitness values of the less promising individuals
+    surrogate = get_surrogate()
+    predicted_ind = {}
+    if surrogate is not None and not predicted:
+        number_models = 1 if opt_algorithm == "GA" else len(external_models)
+        predicted_ind = surrogate.screen(model_ind, number_models)
+        if predicted_ind:
+            WriteLogMsg("Individuals with fitness values predicted by the surrogate: %r" % sorted(predicted_ind))
+            known_fitness.update(predicted_ind)
+    # add one task per model for the evaluation pool
+    for ind_number in sorted(model_ind):
+        if ind_number not in predicted_ind and ind_number not in started_ind:
+            tasks.extend([task for task in get_model_tasks(ind_number, model_ind[ind_number]) 
+                          if (ind_number, task.model_folder) not in replayed])
 
     # a list with results for each individual
     fitness = []
 
-    # count models
-    number_models = 1
-    try: 
-        file_model2
-        number_models += 1
-        file_model3
-        number_models += 1
-        file_model4
-        number_models += 1
-    except:
-        pass
-
-    # define maximum number of processes to run in parallel
-    if options.nthreads == "max cpu cores":
-        nthreads = multiprocessing.cpu_count()
-    else:
-        nthreads = int(options.nthreads)
-
-    # hold the multiprocessing processes
-    jobs = []
-    k = 0
-
-    # every multiprocess for an individual generates later maximum number_models multiprocesses
-    # if you have 2 cores and 4 models than you should generate only one multiprocess 
-    # in the first level because you need the 2 cores for the multiprocessing of the models
-    processes = 1
-    while (max(nthreads, number_models) >= (processes * number_models)) and processes < i:
-        processes += 1
-
-    # create the multiprocessing processes
-    while k < (processes-1):
-        p = multiprocessing.Process(target=genome_process_handling,args=(queue_arg,))
-        jobs.append(p)
-        p.start() 
-        k += 1
-
-    for j in jobs:
-        # wait until all multiprocessing processes are finished
-        j.join()
+    # run all (individual, model) tasks and wait until they are finished,
+    # the batch models evaluate all individuals of the generation in one run
+    scheduler.add(batch_tasks(tasks))
+    # individuals with a failed model run
+    failed_ind = []
+    # individuals with a model run which exceeded its timeout or failed (or was stopped because 
+    # of a failed model run of the individual), they get the worst fitness values
+    worst_ind = []
+    # fitness values which are parsed by the workers and returned by the tasks
+    # (or taken from the evaluation journal), (individual number, model folder) -> values
+    model_fitness = dict(replayed)
+    # every finished model run is written in the evaluation journal at once
+    for task, status, result in scheduler.run(lambda task, status, result: journal_model_run(nmbr_generation, task, status, result)):
+        if status in ('error', 'timeout', 'cancelled'):
+            if status == 'error':
+                WriteLogMsg("Error (%r): %s" % (task, result))
+            failed_ind.extend(task.ind_numbers())
+            # failed model runs get the worst fitness values if they are given
+            if status == 'timeout' or cfg.mapConfig.file_worst_fitness != 'None':
+                for ind_number in task.ind_numbers():
+                    if ind_number not in worst_ind:
+                        worst_ind.append(ind_number)
+        elif isinstance(result, dict):
+            # fitness values of a batch task, individual number -> values
+            for ind_number, values in result.items():
+                model_fitness[(ind_number, task.model_folder)] = values
+        elif result is not None:
+            model_fitness[(task.ind_number, task.model_folder)] = result
+    if worst_ind:
+        WriteLogMsg("Individuals with worst fitness values because of failed model runs or timeouts: %r" % worst_ind)
 
     # Collect the fitness values of all individuals from one generation and return a list of them
-    output_files = []
-    external_models = []
-
-    try:
-        output_files.append(cfg.modelConfig.file_output1)
-        output_files.append(cfg.modelConfig.file_output2)
-        output_files.append(cfg.modelConfig.file_output3)
-        output_files.append(cfg.modelConfig.file_output4)
-
-    except AttributeError:
-        pass
-
-    try:
-        external_models.append(cfg.modelConfig.model1_folder)
-        external_models.append(cfg.modelConfig.model2_folder)
-        external_models.append(cfg.modelConfig.model3_folder)
-        external_models.append(cfg.modelConfig.model4_folder)
-
-    except AttributeError:
-        pass
-
     # add the logging informations from the child processes in the optimization_log file
     fh.join_ind_number_log()
 
     # add the model outputs of one generation to the special output file     
-    fh.summarize_console_outputs(i-1,nmbr_generation,individuals, external_models, not_accepted_ind)
+    plugin_models = [folder for number, folder in enumerate(external_models) if is_plugin(number+1)]
+    fh.summarize_console_outputs(i-1,nmbr_generation,individuals, external_models, not_accepted_ind + worst_ind + list(known_fitness) + list(duplicate_ind), plugin_models)
     
     # collect the fitness values of all individuals and models
-    fitness = fh.collect_fitness_values(opt_algorithm, i-1, fitness, external_models, output_files, not_accepted_ind, cfg.mapConfig.file_worst_fitness)
+    fitness = fh.collect_fitness_values(opt_algorithm, i-1, fitness, external_models, output_files, not_accepted_ind + worst_ind, cfg.mapConfig.file_worst_fitness, known_fitness, duplicate_ind, model_fitness)
+
+    # save the fitness values of the new evaluations in the fitness cache
+    if cache is not None:
+        for ind_number in evaluated_ind.values():
+            if ind_number not in failed_ind and ind_number not in predicted_ind:
+                values = fitness[ind_number-1]
+                cache.put(individuals[ind_number-1], list(values) if isinstance(values, ec.emo.Pareto) else [values])
+        cache.commit()
+        cache.log_statistics(cache_hits, cache_requests)
+        if duplicate_ind:
+            WriteLogMsg("%d individuals are identical with other individuals of this generation and were not evaluated again." % len(duplicate_ind))
+
+    # the individuals of this generation are the references of the delta inputs of the next one
+    remember_references([(n, model_ind[n]) for n in sorted(model_ind) if n not in predicted_ind and n not in failed_ind], 
+                        model_fitness)
+
+    # the surrogate learns from the fitness values of the models (and the fitness cache)
+    if surrogate is not None:
+        evaluated = []
+        for ind_number in list(model_ind) + list(known_fitness):
+            if ind_number not in failed_ind and ind_number not in predicted_ind:
+                values = fitness[ind_number-1]
+                evaluated.append((ind_number, individuals[ind_number-1], list(values) if isinstance(values, ec.emo.Pareto) else [values]))
+        surrogate.log_statistics(surrogate.update(evaluated))
 
     # for constrained_tournament_selection: print numbers of infeasible individuals  
     if 'constrained_tournament_selection' in cfg.ea.selector:
@@ -385,8 +792,169 @@ def evaluate(candidates, args):
     msg = "Fitness values are: %r \n" % fitness
     WriteLogMsg(msg)
 
+    if not predicted:
+        journal_random_state(args['_ec']._random)
+
     return fitness
 
+#------------------------------------------------------------------------------
+#   Steady-state evaluation of single individuals
+#------------------------------------------------------------------------------
+class SteadyStateEvaluator:
+    """Evaluator of the asynchronous steady-state NSGA-II (ec.emo.AsyncNSGA2).
+
+       The initial population is evaluated like a generation by evaluate(), 
+       afterwards the model tasks of each new individual are added to one 
+       TaskScheduler which runs during the whole optimization, so the workers
+       never wait for the slowest model run of a generation. An individual is 
+       returned to the algorithm as soon as all its model runs are finished.
+    """
+
+    def __init__(self, pool):
+        """input:
+               pool is the evaluation pool (WorkerPool, AsyncPool or NetPool)
+        """
+
+        self.scheduler = TaskScheduler(pool, int(cfg.modelConfig.max_retries), cfg.modelConfig.speculative == 'True',
+                                       float(cfg.modelConfig.speculative_fraction), runtime_estimator,
+                                       cfg.modelConfig.fail_fast == 'True')
+        # number of individuals which are evaluated at the same time,
+        # every worker has at least one model run to do
+        self.capacity = pool.number_workers
+        # number of the last individual (the numbers are not reused, the 
+        # initial population has the numbers 1 ... pop_size)
+        self.ind_number = 0
+        # candidates which are not yet returned, individual number -> candidate
+        self.candidates = {}
+        # number of unfinished model tasks per individual
+        self.open_tasks = {}
+        # finished individuals, list of individual numbers
+        self.finished = []
+        # the same collections as in evaluate(), for all running individuals
+        self.not_accepted_ind = []
+        self.failed_ind = []
+        self.worst_ind = []
+        self.known_fitness = {}
+        self.model_fitness = {}
+
+    def __call__(self, candidates, args):
+        """Evaluate the initial population."""
+
+        fitness = evaluate(candidates, args)
+        self.ind_number = len(candidates)
+        return fitness
+
+    def submit(self, candidate, args):
+        """Start the model runs of a new individual."""
+
+        self.ind_number += 1
+        ind_number = self.ind_number
+        self.candidates[ind_number] = candidate
+        if len(candidate) < 101:
+            WriteLogMsg("Steady-state evaluation of individual %d: %r" % (ind_number, candidate))
+
+        if all(item == 0 for item in candidate):
+            self.not_accepted_ind.append(ind_number)
+            self.finished.append(ind_number)
+        elif ('constrained_tournament_selection' in cfg.ea.selector) or individual_filter(candidate) == True:
+            cache = get_fitness_cache()
+            values = None
+            if cache is not None:
+                values = cache.get(candidate)
+            replayed = {}
+            if values is None:
+                # model runs of an interrupted run
+                replayed = replay_model_runs(candidate)
+                external_models, model_files, output_files = get_model_files()
+                if len(replayed) == len(external_models):
+                    values = [value for folder in external_models for value in replayed[folder]]
+            if values is not None:
+                self.known_fitness[ind_number] = values
+                self.finished.append(ind_number)
+            else:
+                for folder in replayed:
+                    self.model_fitness[(ind_number, folder)] = replayed[folder]
+                tasks = batch_tasks([task for task in get_model_tasks(ind_number, candidate) if task.model_folder not in replayed])
+                self.open_tasks[ind_number] = len(tasks)
+                self.scheduler.add(tasks)
+        else:
+            self.not_accepted_ind.append(ind_number)
+            self.finished.append(ind_number)
+
+    def results(self, args):
+        """Wait until at least one individual is evaluated and return a list 
+           of tuples (candidate, fitness).
+        """
+
+        while not self.finished and self.open_tasks:
+            for task, status, result in self.scheduler.wait():
+                journal_model_run(args['_ec'].num_generations, task, status, result)
+                if status in ('error', 'timeout', 'cancelled'):
+                    if status == 'error':
+                        WriteLogMsg("Error (%r): %s" % (task, result))
+                    self.failed_ind.append(task.ind_number)
+                    if task.ind_number not in self.worst_ind and \
+                       (status == 'timeout' or cfg.mapConfig.file_worst_fitness != 'None'):
+                        self.worst_ind.append(task.ind_number)
+                        WriteLogMsg("Individual %d gets the worst fitness values because of a failed model run." % task.ind_number)
+                elif isinstance(result, dict):
+                    for ind_number, values in result.items():
+                        self.model_fitness[(ind_number, task.model_folder)] = values
+                elif result is not None:
+                    self.model_fitness[(task.ind_number, task.model_folder)] = result
+                self.open_tasks[task.ind_number] -= 1
+                if self.open_tasks[task.ind_number] == 0:
+                    del self.open_tasks[task.ind_number]
+                    self.finished.append(task.ind_number)
+
+        ind_numbers = self.finished
+        self.finished = []
+        if not ind_numbers:
+            return []
+        individuals = [self.candidates.pop(ind_number) for ind_number in ind_numbers]
+        external_models, model_files, output_files = get_model_files()
+
+        fh.join_ind_number_log()
+        plugin_models = [folder for number, folder in enumerate(external_models) if is_plugin(number+1)]
+        no_outputs = self.not_accepted_ind + self.worst_ind + list(self.known_fitness)
+        fh.summarize_console_outputs(len(individuals), args['_ec'].num_generations, individuals, external_models, 
+                                     no_outputs, plugin_models, ind_numbers)
+        fitness = fh.collect_fitness_values(opt_algorithm, len(individuals), [], external_models, output_files, 
+                                            self.not_accepted_ind + self.worst_ind, cfg.mapConfig.file_worst_fitness, 
+                                            self.known_fitness, None, self.model_fitness, ind_numbers)
+
+        remember_references([(n, individual) for n, individual in zip(ind_numbers, individuals) 
+                             if n not in self.failed_ind and n not in self.not_accepted_ind and n not in self.known_fitness],
+                            self.model_fitness)
+        cache = get_fitness_cache()
+        for ind_number, individual, values in zip(ind_numbers, individuals, fitness):
+            if cache is not None and ind_number not in self.failed_ind and ind_number not in self.not_accepted_ind \
+               and ind_number not in self.known_fitness:
+                cache.put(individual, list(values) if isinstance(values, ec.emo.Pareto) else [values])
+            WriteLogMsg("Fitness values of individual %d: %r" % (ind_number, values))
+            # the outputs of the individual are not needed anymore
+            fh.remove_model_results(ind_number)
+            for key in [key for key in self.model_fitness if key[0] == ind_number]:
+                del self.model_fitness[key]
+            self.known_fitness.pop(ind_number, None)
+        if cache is not None:
+            cache.commit()
+        self.not_accepted_ind = [n for n in self.not_accepted_ind if n not in ind_numbers]
+        self.failed_ind = [n for n in self.failed_ind if n not in ind_numbers]
+        self.worst_ind = [n for n in self.worst_ind if n not in ind_numbers]
+
+        return list(zip(individuals, fitness))
+
+    def cancel(self, args):
+        """Stop the model runs of the individuals which are still evaluated."""
+
+        if self.open_tasks:
+            WriteLogMsg("Steady-state evaluation finished, %d running individuals are not needed anymore." % len(self.open_tasks))
+        self.scheduler.stop()
+        self.open_tasks = {}
+        self.finished = []
+        self.candidates = {}
+
 #------------------------------------------------------------------------------
 #   Genetic Algorithm function
 #------------------------------------------------------------------------------
@@ -439,6 +1007,9 @@ def GA():
         exec ("%s%s" % ('ea.variator = ', fh.preparing_attribute('variator',cfg.ea.variator)))         
         msg = 'Variator of the optimization algorithm changed to: %s' % cfg.ea.variator
         WriteLogMsg(msg)       
+    # the variators are applied in evaluate() to start the model runs of each offspring at once
+    if cfg.ea.pipelined == True:
+        pipeline_variation(ea)
     # GA is predefined with num_selected = pop_size
     if cfg.ea.num_selected != cfg.ea.pop_size:
         msg = 'Num_selected of the optimization algorithm changed to: %s' % cfg.ea.num_selected
@@ -448,10 +1019,15 @@ def GA():
     if cfg.ea.archiver != 'best_archiver':
         msg = 'Archiver of the optimization algorithm changed to: %s' % cfg.ea.archiver
         WriteLogMsg(msg)
+    # the archive only gets fitness values of the models
+    evaluate_before_archive(ea)
     exec ("%s%s" % ('ea.observer = ', fh.preparing_attribute('observer',cfg.ea.observer)))         
     # specify when the optimization should terminate
     exec ("%s%s" % ('ea.terminator = ', fh.preparing_attribute('terminator',cfg.ea.terminator)))
 
+    # start the worker processes for the evaluation of all generations
+    start_evaluation_pool()
+
     # run optimization, when finished final_pop holds the results
     final_pop = ea.evolve(generator = generate_parameter, 
                     # evaluate is the function to start external models
@@ -490,6 +1066,13 @@ def GA():
                     # individuals file
                     individuals_file = individ_file)                     
 
+    # shut down the worker processes
+    stop_evaluation_pool()
+    close_fitness_cache()
+    close_journal()
+    if surrogate_model is not None:
+        surrogate_model.log_statistics()
+
     # read out the best individuals
     final_arc = ea.archive
 
@@ -517,13 +1100,13 @@ def GA():
                 if file_HRU == 'None' or (file_HRU != 'None' and cfg.mapConfig.file_ID_map != 'None'):
                     transform_individual_ascii_map(f.candidate,False,f_count,None,None,None,False)
             else:
-                WriteLogMsg("%s" % f)
+                WriteLogMsg("%s%s" % (predicted_label(f.candidate), f))
                 # save the map as ascii file in output folder
                 if file_HRU == 'None' or (file_HRU != 'None' and cfg.mapConfig.file_ID_map != 'None'):
                     transform_individual_ascii_map(f.candidate,False,f_count)
                 final_arc_feasible.append(f)
         else:
-            WriteLogMsg("%s" % f)
+            WriteLogMsg("%s%s" % (predicted_label(f.candidate), f))
             # save the map as ascii file in output folder
             if file_HRU == 'None' or (file_HRU != 'None' and cfg.mapConfig.file_ID_map != 'None'):
                 transform_individual_ascii_map(f.candidate,False,f_count)
@@ -567,11 +1150,18 @@ def NSGA2():
     archive_is_available = False
     previous_archive = []
 
+    # asynchronous steady-state NSGA-II without waiting for the whole generation
+    if cfg.ea.steady_state == True:
+        algorithm = ec.emo.AsyncNSGA2
+        WriteLogMsg("Steady-state NSGA-II: every evaluated individual replaces the population at once.")
+    else:
+        algorithm = ec.emo.NSGA2
+
 
     if cfg.ea.start_from_previous_gen == True:
         generation_files = glob.glob("output/*_individuals_file.csv")  # Adjust path if necessary
         if generation_files:
-            ea = ec.emo.NSGA2(rand)
+            ea = algorithm(rand)
             from inspyred.ec import Individual
             from inspyred.ec.emo import Pareto
             # Load the previously saved Pareto archive if it exists
@@ -621,7 +1211,8 @@ def NSGA2():
                         extracted_row = row[6:]  # Index 6 corresponds to column 7
                         # Convert values to integers and remove brackets if present
                         #cleaned_row = [int(value.strip("[]")) for value in extracted_row]
-                        cleaned_row = [int(value.strip("[] ").strip()) for value in extracted_row]
+                        # (repaired genes may be written as numpy integers, e.g. np.int64(4))
+                        cleaned_row = [int(value.strip("[] ").split("(")[-1].rstrip(")")) for value in extracted_row]
                         # Append the cleaned row to the nested list
                         nested_list.append(cleaned_row)
                         custom_individuals.append(cleaned_row)
@@ -645,7 +1236,7 @@ def NSGA2():
                                       cfg.mapConfig.four_neighbours, return_only_nonstatic=False)
         print(f"Starting  with the individuals: {start_individual}")
 
-        ea = ec.emo.NSGA2(rand)
+        ea = algorithm(rand)
 
     if len(start_individual) == 0:
         msg = "Error: The generated start individual has no elements."
@@ -678,11 +1269,17 @@ def NSGA2():
         exec ("%s%s" % ('ea.archiver = ', fh.preparing_attribute('archiver',cfg.ea.archiver)))
         msg = 'Archiver of the optimization algorithm changed to: %s' % cfg.ea.archiver
         WriteLogMsg(msg)
+    # the archive only gets fitness values of the models
+    evaluate_before_archive(ea)
     exec ("%s%s" % ('ea.migrator = ', fh.preparing_attribute('migrator',cfg.ea.migrator)))
     # file observer prints after each generation the best, worst, mean etc. values into the statistic and individual file
     exec ("%s%s" % ('ea.observer = ', fh.preparing_attribute('observer',cfg.ea.observer)))      
     # specify how the new candidates should be varied
     exec ("%s%s" % ('ea.variator = ', fh.preparing_attribute('variator',cfg.ea.variator)))          
+    # the variators are applied in evaluate() to start the model runs of each offspring at once,
+    # the steady-state NSGA-II starts every offspring at once anyway
+    if cfg.ea.pipelined == True and cfg.ea.steady_state != True:
+        pipeline_variation(ea)
     # specify when the optimization should terminate
     exec ("%s%s" % ('ea.terminator = ', fh.preparing_attribute('terminator',cfg.ea.terminator)))   
     # NSGA2 is predefined with num_selected = pop_size
@@ -704,12 +1301,19 @@ def NSGA2():
     else:
         print(f"✅ Archive loaded successfully with {len(ea.archive)} individuals.")
     
+    # start the worker processes for the evaluation of all generations
+    pool = start_evaluation_pool()
+    if cfg.ea.steady_state == True:
+        evaluator = SteadyStateEvaluator(pool)
+    else:
+        evaluator = evaluate
+
     #remaining_generations = cfg.ea.max_generations - nmbr_generation
     # run optimization, when finished final_pop holds the results
     final_pop = ea.evolve(generator = generate_parameter, 
                     # evaluate is the function to start external models
                     # return results for the optimization algorithm
-                    evaluator = evaluate, 
+                    evaluator = evaluator, 
                     # define population size
                     pop_size = cfg.ea.pop_size, 
                     # maximize or Minimize the problem (default True)                  
@@ -746,6 +1350,13 @@ def NSGA2():
                     archive = previous_archive, 
                     custom_individual= custom_individuals, num_generation = nmbr_generation)                     
 
+    # shut down the worker processes
+    stop_evaluation_pool()
+    close_fitness_cache()
+    close_journal()
+    if surrogate_model is not None:
+        surrogate_model.log_statistics()
+
     final_arc = ea.archive
 
     # for constrained_tournament_selection: 
@@ -771,14 +1382,14 @@ def NSGA2():
                 if file_HRU == 'None' or (file_HRU != 'None' and cfg.mapConfig.file_ID_map != 'None'):
                     transform_individual_ascii_map(f.candidate,False,f_count,None,None,None,False)
             else:
-                WriteLogMsg("%s" % f)
+                WriteLogMsg("%s%s" % (predicted_label(f.candidate), f))
                 # save the map as ascii file in output folder
                 if file_HRU == 'None' or (file_HRU != 'None' and cfg.mapConfig.file_ID_map != 'None'):
                     transform_individual_ascii_map(f.candidate,False,f_count)
                 final_arc_feasible.append(f)
 
         else:
-            msg = "%s" % f
+            msg = "%s%s" % (predicted_label(f.candidate), f)
             #msg = "%f" % f
             WriteLogMsg(msg)
             # save the map as ascii file in output folder
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+#
+#   Name:       pluginhandler.py
+#   Purpose:    This module loads Python model plugins and evaluates the
+#               individuals with them inside the worker processes.
+#
+#   Author:     Carola Paetzold, Michael Strauch
+#   Contact:    michael.strauch@ufz.de
+#
+#               Helmholtz Centre for Environmental Research - UFZ
+#               Department Computational Landscape Ecology - CLE
+#               Permoserstrasse 15
+#               D-04318 Leipzig, Germany
+#               http://www.ufz.de
+#
+#   Created:    Sun Oct 18 2026
+#
+#   Copyright:  (c) Carola Paetzold / Michael Strauch 2026
+#
+#   Licence:    This program is free software:
+#               you can redistribute it and/or modify it under the terms
+#               of the GNU General Public License as published by the
+#               Free Software Foundation, either version 3 of the License,
+#               or (at your option) any later version. This program is
+#               distributed in the hope that it will be useful, but
+#               WITHOUT ANY WARRANTY; without even the implied warranty
+#               of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#               See the GNU General Public License for more details.
+#               You should have received a copy of the GNU General
+#               Public License along with this program.
+#               If not, see <http://www.gnu.org/licenses/>.
+#
+#------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------
+import os
+import importlib.util
+
+wrkDir = os.path.abspath('.')
+
+# loaded plugin modules of this process, file path -> module
+plugins = {}
+
+#------------------------------------------------------------------------------
+#   Python model plugins
+#------------------------------------------------------------------------------
+def load_plugin(file_path):
+    """Import a model plugin once per process and return the module.
+
+       A plugin is a Python file which provides the function
+       evaluate(land_use_array, genome, context) and returns a list of 
+       fitness values (one or more values like the output file of a model).
+
+       input:
+           file_path is the file path of the plugin
+    """
+
+    if file_path not in plugins:
+        if not os.path.isfile(file_path):
+            raise SystemError("Error in loading the model plugin. File does not exist. %s" % file_path)
+        name = "comola_plugin_%d" % len(plugins)
+        spec = importlib.util.spec_from_file_location(name, file_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        if not hasattr(module, 'evaluate'):
+            raise SystemError("The model plugin %s has no function evaluate(land_use_array, genome, context)." % file_path)
+        plugins[file_path] = module
+    return plugins[file_path]
+
+def run_plugin(file_path, land_use_array, genome, context):
+    """Evaluate an individual with a model plugin and return the list of fitness values.
+
+       input:
+           file_path is the file path of the plugin
+           land_use_array is the land use map of the individual (None if no map is available)
+           genome is the individual
+           context is a dictionary with further information for the plugin
+    """
+
+    module = load_plugin(file_path)
+    values = module.evaluate(land_use_array, genome, context)
+    try:
+        if isinstance(values, (int, float)):
+            values = [values]
+        return [float(value) for value in values]
+    except (TypeError, ValueError):
+        raise SystemError("The model plugin %s returned no list of fitness values: %r" % (file_path, values))
+
+#------------------------------------------------------------------------------
+#
+#   EOF
+#
+#------------------------------------------------------------------------------
@@ -0,0 +1,1139 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+#
+#   Name:       poolhandler.py
+#   Purpose:    This module provides a persistent pool of worker processes
+#               which evaluates the individuals of all generations.
+#
+#   Author:     Carola Paetzold, Michael Strauch
+#   Contact:    michael.strauch@ufz.de
+#
+#               Helmholtz Centre for Environmental Research - UFZ
+#               Department Computational Landscape Ecology - CLE
+#               Permoserstrasse 15
+#               D-04318 Leipzig, Germany
+#               http://www.ufz.de
+#
+#   Created:    Sun Oct 18 2026
+#
+#   Copyright:  (c) Carola Paetzold / Michael Strauch 2026
+#
+#   Licence:    This program is free software:
+#               you can redistribute it and/or modify it under the terms
+#               of the GNU General Public License as published by the
+#               Free Software Foundation, either version 3 of the License,
+#               or (at your option) any later version. This program is
+#               distributed in the hope that it will be useful, but
+#               WITHOUT ANY WARRANTY; without even the implied warranty
+#               of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#               See the GNU General Public License for more details.
+#               You should have received a copy of the GNU General
+#               Public License along with this program.
+#               If not, see <http://www.gnu.org/licenses/>.
+#
+#------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------
+import os
+import sys
+import time
+import shutil
+import threading
+import signal
+import multiprocessing
+import multiprocessing.connection
+from multiprocessing import shared_memory
+import numpy as np
+
+import config as cfg
+import filehandler as fh
+import rhandler
+from filehandler import WriteLogMsg
+from maphandler import render_individual_map
+from pluginhandler import run_plugin
+
+wrkDir = os.path.abspath('.')
+
+# number of cells per patch ID for the delta inputs (computed once per process)
+patch_cells_counts = None
+
+# seconds between two checks if the worker processes are still alive
+# while the pool waits for results
+alive_check_interval = 5
+
+# weight of the latest run time in the exponentially weighted mean run time of a model
+runtime_smoothing = 0.3
+
+#------------------------------------------------------------------------------
+#   Static rasters in shared memory
+#------------------------------------------------------------------------------
+class SharedRaster:
+    """Numpy array which is placed once in shared memory and used by all
+       worker processes without copying.
+
+       Forked workers use the mapping of the main process directly, for other
+       start methods only the name of the shared memory block is pickled and
+       the worker attaches it. The array of the workers is read-only.
+    """
+
+    def __init__(self, array):
+        """Copy the array into a new shared memory block.
+
+           input:
+               array is the numpy array (e.g. the original land use map)
+        """
+
+        self.shape = array.shape
+        self.dtype = array.dtype
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+        self.owner = True
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self.shm.buf)
+        self.array[...] = array
+        self.array.flags.writeable = False
+
+    def __getstate__(self):
+        return {'name' : self.shm.name, 'shape' : self.shape, 'dtype' : self.dtype}
+
+    def __setstate__(self, state):
+        self.shape = state['shape']
+        self.dtype = state['dtype']
+        if sys.version_info >= (3, 13):
+            # the block is removed by the main process
+            self.shm = shared_memory.SharedMemory(name=state['name'], track=False)
+        else:
+            self.shm = shared_memory.SharedMemory(name=state['name'])
+        self.owner = False
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self.shm.buf)
+        self.array.flags.writeable = False
+
+    def release(self):
+        """Close the shared memory block and remove it if this process created it."""
+
+        self.array = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+            self.owner = False
+
+def shared_array(value):
+    """Return the numpy array of a SharedRaster or the value itself."""
+
+    if isinstance(value, SharedRaster):
+        return value.array
+    return value
+
+#------------------------------------------------------------------------------
+#   Worker process: main loop
+#------------------------------------------------------------------------------
+def worker_loop(worker_number, connection, handler, init_args):
+    """Main loop of a persistent worker process.
+
+       The worker blocks on its connection until a task arrives, executes it
+       with handler(task, *init_args) and sends the result back. A None task
+       is the signal to terminate. The worker also terminates if the main process
+       was killed (e.g. a crashed run which is resumed later).
+
+       input:
+           worker_number is the number of the worker within the pool
+           connection is the end of the pipe between the pool and this worker
+           handler is the function which executes one task
+           init_args are arguments which are passed to the handler for each task
+    """
+
+    # own process group, so the pool can stop a task together with the model
+    # processes which the worker has started
+    if hasattr(os, 'setpgid'):
+        os.setpgid(0, 0)
+
+    parent = os.getppid()
+    while True:
+        try:
+            if not connection.poll(alive_check_interval):
+                # the worker becomes an orphan if the main process is gone
+                if os.getppid() != parent:
+                    break
+                continue
+            task_id, task = connection.recv()
+        except EOFError:
+            break
+        if task_id is None:
+            break
+        try:
+            result = handler(task, *init_args)
+            connection.send(('done', task_id, result))
+        except Exception as e:
+            connection.send(('error', task_id, "%s, %s" % (str(type(e)), str(e))))
+
+    # the resident R session of the worker (r_sessions = True) ends with the worker
+    rhandler.stop_session()
+
+#------------------------------------------------------------------------------
+#   Persistent worker pool
+#------------------------------------------------------------------------------
+class WorkerPool:
+    """Pool of worker processes which is started once and takes the
+       evaluation tasks of every generation until it is shut down.
+
+       The worker processes are not daemonic, so a task may start further
+       processes (e.g. the external models).
+
+       Every worker has its own pipe and gets its tasks from the pool one
+       by one, so a worker can be killed at any time (e.g. to stop a task) 
+       without blocking a queue which is shared with the other workers.
+    """
+
+    def __init__(self, handler, number_workers, init_args=()):
+        """Start the worker processes.
+
+           input:
+               handler is the function which executes one task in a worker
+               number_workers is the number of worker processes
+               init_args are arguments which are passed to the handler for each
+               task, they are transferred only once at the start of a worker
+        """
+
+        self.handler = handler
+        self.number_workers = max(1, number_workers)
+        self.init_args = tuple(init_args)
+        # worker processes and their pipes, the index is the worker number
+        self.workers = []
+        self.connections = []
+        # task_id of the task which is running in a worker (None if idle)
+        self.running = []
+        # submitted tasks which wait for an idle worker, list of (task_id, task)
+        self.waiting = []
+        # number of submitted tasks without result
+        self.pending = 0
+        # results of cancelled tasks and error results of tasks which were lost with a dead worker
+        self.lost = []
+        self.next_id = 0
+
+        for number in range(self.number_workers):
+            p, connection = self._start_worker(number)
+            self.workers.append(p)
+            self.connections.append(connection)
+            self.running.append(None)
+
+    def _start_worker(self, number):
+        """Start the worker process with the given number, return the process and its pipe."""
+
+        connection, worker_connection = multiprocessing.Pipe()
+        p = multiprocessing.Process(target=worker_loop, args=(number, worker_connection, self.handler, self.init_args))
+        p.start()
+        worker_connection.close()
+        return p, connection
+
+    def _restart_worker(self, number):
+        """Replace a dead or killed worker process by a new one."""
+
+        self.connections[number].close()
+        self.running[number] = None
+        self.workers[number], self.connections[number] = self._start_worker(number)
+
+    def submit(self, task):
+        """Add a task to the pool and return its task id."""
+
+        task_id = self.next_id
+        self.next_id += 1
+        self.pending += 1
+        self.waiting.append((task_id, task))
+        self._dispatch()
+        return task_id
+
+    def _dispatch(self):
+        """Send the waiting tasks to the idle workers."""
+
+        for number in range(len(self.workers)):
+            if not self.waiting:
+                break
+            if self.running[number] is None:
+                task_id, task = self.waiting.pop(0)
+                self.running[number] = task_id
+                try:
+                    self.connections[number].send((task_id, task))
+                except (OSError, ValueError):
+                    # the worker is dead, the task is lost with it
+                    pass
+
+    def _check_workers(self):
+        """Restart dead worker processes and keep error results for their tasks."""
+
+        for number, p in enumerate(self.workers):
+            if not p.is_alive():
+                msg = "Worker process %d terminated unexpectedly (exit code %s), it is restarted." % (number, p.exitcode)
+                WriteLogMsg(msg)
+                if self.running[number] is not None:
+                    self.lost.append(('error', self.running[number], "Worker process terminated unexpectedly."))
+                self._restart_worker(number)
+
+    def _kill_worker(self, number):
+        """Kill a worker process together with the processes it has started and restart it."""
+
+        p = self.workers[number]
+        if hasattr(os, 'killpg'):
+            try:
+                os.killpg(p.pid, signal.SIGKILL)
+            except OSError:
+                pass
+        else:
+            p.terminate()
+        p.join()
+        self._restart_worker(number)
+
+    def cancel(self, task_id):
+        """Stop a task. A running task is stopped by killing its worker process,
+           a task which has not started yet is removed. get_result returns the 
+           status 'cancelled' for the task.
+        """
+
+        for index, (waiting_id, task) in enumerate(self.waiting):
+            if waiting_id == task_id:
+                del self.waiting[index]
+                self.lost.append(('cancelled', task_id, None))
+                return
+        if task_id in self.running:
+            # the result of the task may already be in the pipe, it is dropped with the pipe
+            self._kill_worker(self.running.index(task_id))
+            self.lost.append(('cancelled', task_id, None))
+
+    def _result(self, kind, task_id, result):
+        """Return the result of a finished (or cancelled) task."""
+
+        self.pending -= 1
+        return kind, task_id, result
+
+    def get_result(self, timeout=None):
+        """Wait for the next finished task.
+
+           Return a tuple (status, task_id, result) where status is 'done', 'error' 
+           or 'cancelled' and result holds the return value of the handler or the 
+           error message. Return None if no task has finished within timeout seconds.
+        """
+
+        if timeout is not None:
+            end = time.time() + timeout
+        while True:
+            if self.lost:
+                return self._result(*self.lost.pop(0))
+            self._dispatch()
+            wait = alive_check_interval
+            if timeout is not None:
+                # a timeout of 0 checks the workers once without waiting
+                wait = max(0, min(wait, end - time.time()))
+            busy = [self.connections[number] for number in range(len(self.workers)) if self.running[number] is not None]
+            ready = multiprocessing.connection.wait(busy, wait)
+            if not ready:
+                self._check_workers()
+                if timeout is not None and time.time() >= end:
+                    return None
+                continue
+            number = self.connections.index(ready[0])
+            try:
+                kind, task_id, result = self.connections[number].recv()
+            except (EOFError, OSError):
+                # the worker died, its task is reported by _check_workers
+                self.workers[number].join(1)
+                self._check_workers()
+                continue
+            self.running[number] = None
+            self._dispatch()
+            return self._result(kind, task_id, result)
+
+    def shutdown(self):
+        """Send the termination signal to all workers and wait for them."""
+
+        for connection in self.connections:
+            try:
+                connection.send((None, None))
+            except (OSError, ValueError):
+                pass
+        for p in self.workers:
+            p.join()
+        for connection in self.connections:
+            connection.close()
+        self.workers = []
+        self.connections = []
+        self.running = []
+        # the workers do not use the shared rasters any more
+        for arg in self.init_args:
+            if isinstance(arg, SharedRaster):
+                arg.release()
+
+#------------------------------------------------------------------------------
+#   Evaluation task: one individual with one external model
+#------------------------------------------------------------------------------
+class ModelTask:
+    """Evaluation of one individual with one external model.
+
+       Every (individual, model) pair is an independent task, so the scheduler
+       can start the next task as soon as any model run is finished.
+    """
+
+    def __init__(self, ind_number, model_number, individual, model_folder, model_file, plugin=False, timeout=None, batch=None,
+                 reference=None):
+        """Describe the task.
+
+           input:
+               ind_number is the individual number of the current population
+               model_number is the number of the model (1 <= model_number <= 4)
+               individual is the genome of the individual
+               model_folder is the folder name of the model
+               model_file is the file name of the model script
+               plugin is True if the model is a Python plugin which runs in the worker
+               timeout is the maximum run time of the model in seconds (None for no limit)
+               batch is a list of tuples (individual number, genome) if the model evaluates
+               several individuals in one run (batchx = True), ind_number and individual 
+               are those of the first individual then
+               reference is a tuple (genome, fitness values of the model) of an evaluated 
+               individual for the delta inputs (delta_inputs = True) or None
+        """
+
+        self.ind_number = ind_number
+        self.model_number = model_number
+        self.individual = individual
+        self.model_folder = model_folder
+        self.model_file = model_file
+        self.plugin = plugin
+        self.timeout = timeout
+        self.batch = batch
+        self.reference = reference
+        # helping models folder (worker slot) in which the task runs
+        self.workspace = None
+        # number of failed runs of the task
+        self.attempts = 0
+
+    def copy(self, workspace):
+        """Return a copy of the task which runs in the given helping models folder."""
+
+        task = ModelTask(self.ind_number, self.model_number, self.individual, self.model_folder,
+                         self.model_file, self.plugin, self.timeout, self.batch, self.reference)
+        task.workspace = workspace
+        return task
+
+    def ind_numbers(self):
+        """Return the numbers of the individuals which are evaluated by the task."""
+
+        if self.batch is None:
+            return [self.ind_number]
+        return [ind_number for ind_number, individual in self.batch]
+
+    def __repr__(self):
+        if self.batch is None:
+            name = "individual %d, model %s" % (self.ind_number, self.model_folder)
+        else:
+            name = "batch of %d individuals (%d ... %d), model %s" % (len(self.batch), self.batch[0][0], 
+                                                                      self.batch[-1][0], self.model_folder)
+        if self.workspace is not None:
+            return "%s (in %s)" % (name, self.workspace)
+        return name
+
+def map_is_required():
+    """Return True if the individuals are transferred as ascii maps into the model folders."""
+
+    file_HRU = cfg.mapConfig.file_HRU
+    return (file_HRU == 'None' and cfg.modelConfig.map == 'True') or \
+           (file_HRU != 'None' and cfg.modelConfig.map == 'True' and cfg.mapConfig.file_ID_map != 'None')
+
+def is_plugin(model_number):
+    """Return True if the model is a Python plugin (pluginx = True in the config.ini)."""
+
+    return getattr(cfg.modelConfig, 'plugin%d' % model_number, 'False') == 'True'
+
+def is_batch(model_number):
+    """Return True if the model evaluates all individuals of a generation in one run 
+       (batchx = True in the config.ini).
+    """
+
+    return getattr(cfg.modelConfig, 'batch%d' % model_number, 'False') == 'True'
+
+def batch_tasks(tasks):
+    """Replace the tasks of the batch models by one task per model which contains
+       all individuals of the tasks, the order of the other tasks is kept.
+
+       input:
+           tasks is the list of ModelTasks of a generation
+    """
+
+    batches = {}
+    result = []
+    for task in tasks:
+        if task.plugin or not is_batch(task.model_number):
+            result.append(task)
+        elif task.model_number in batches:
+            batches[task.model_number].batch.append((task.ind_number, task.individual))
+        else:
+            batches[task.model_number] = ModelTask(task.ind_number, task.model_number, task.individual, task.model_folder, 
+                                                   task.model_file, False, task.timeout, [(task.ind_number, task.individual)])
+            result.append(batches[task.model_number])
+    return result
+
+def model_timeout(model_number):
+    """Return the maximum run time of a model in seconds (timeoutx in the config.ini) or None."""
+
+    timeout = getattr(cfg.modelConfig, 'timeout%d' % model_number, 'None')
+    if timeout == 'None':
+        return None
+    return float(timeout)
+
+def run_plugin_task(task, map_info, patchID_map_info, header_all_info, number):
+    """Evaluate one individual with a Python model plugin and return the fitness values.
+
+       The plugin gets the land use map as array, no files are written.
+
+       input:
+           task is a ModelTask
+           map_info, patchID_map_info and header_all_info are the variables
+           for the map creation
+           number is the log file number of the model run
+    """
+
+    msg = "Evaluation of individual %d with model plugin %s" %(task.ind_number, task.model_folder)
+    WriteLogMsg(msg, number)
+    land_use_array = None
+    if isinstance(patchID_map_info, np.ndarray) and isinstance(map_info, np.ndarray):
+        land_use_array = render_individual_map(task.individual, map_info, patchID_map_info)
+    context = {'ind_number' : task.ind_number,
+               'model_number' : task.model_number,
+               'model_folder' : os.path.join(wrkDir, 'models', task.model_folder),
+               'patch_map' : patchID_map_info,
+               'header' : header_all_info}
+    begin = time.time()
+    values = run_plugin(os.path.join(wrkDir, 'models', task.model_folder, task.model_file), land_use_array, task.individual, context)
+    msg = "The model plugin %s ran for %.3f seconds." %(task.model_file, time.time()-begin)
+    WriteLogMsg(msg, number)
+    return values
+
+def workspace_run_files():
+    """Return the files of the model folders which are written for or by each model run
+       (inputs, outputs and the prepared model scripts).
+    """
+
+    run_files = list(fh.run_input_files)
+    for number in range(1,5):
+        for name in ('file_model%d', 'file_output%d'):
+            if hasattr(cfg.modelConfig, name % number):
+                run_files.append(getattr(cfg.modelConfig, name % number))
+    return run_files
+
+def model_output_file(task):
+    """Return the file name of the model output of a task."""
+
+    return getattr(cfg.modelConfig, 'file_output%d' % task.model_number)
+
+def write_model_inputs(task, map_info, patchID_map_info, header_all_info, number):
+    """Write the genome and the map of an individual into the model folder
+       and return the file path of the model script.
+
+       input:
+           task is a ModelTask
+           map_info, patchID_map_info and header_all_info are the variables
+           for the map creation
+           number is the log file number of the model run
+    """
+
+    folder_name = task.workspace
+    msg = "Evaluation of %r" % task
+    WriteLogMsg(msg, number)
+    # no output of an earlier model run may be taken for this run
+    file_output = os.path.join(fh.folder_path(folder_name), task.model_folder, model_output_file(task))
+    if os.path.isfile(file_output):
+        os.remove(file_output)
+    if task.batch is not None:
+        write_batch_inputs(task, map_info, patchID_map_info)
+        return os.path.join(fh.folder_path(folder_name), task.model_folder, task.model_file)
+    # genom.csv and map.asc are written once per individual and linked into the model folder
+    model_path = os.path.join(fh.folder_path(folder_name), task.model_folder)
+    for file_name, source in write_individual_inputs(task, map_info, patchID_map_info, header_all_info):
+        link_input_file(source, os.path.join(model_path, file_name))
+    if cfg.modelConfig.delta_inputs == 'True':
+        write_delta_inputs(task, patchID_map_info)
+    return os.path.join(model_path, task.model_file)
+
+def write_individual_inputs(task, map_info, patchID_map_info, header_all_info):
+    """Write the genome and the map of an individual once into its results folder and
+       return a list of tuples (file name, file path), the other model runs of the 
+       individual use the same files.
+
+       The map is written before the genome, so an existing genome file with the 
+       genome of the task marks valid inputs. Files of an earlier individual with
+       the same number are replaced (e.g. on a network worker).
+
+       input:
+           task is a ModelTask
+           map_info, patchID_map_info and header_all_info are the variables
+           for the map creation
+    """
+
+    folder = os.path.join(fh.workspace_folder(), fh.results_folder(task.ind_number))
+    genome_file = os.path.join(folder, 'genom.csv')
+    inputs = [('genom.csv', genome_file)]
+    if map_is_required():
+        inputs.append(('map.asc', os.path.join(folder, 'map.asc')))
+
+    genome = "".join(["%d\n" % gene for gene in task.individual])
+    if os.path.isfile(genome_file):
+        in_file = open(genome_file, 'r')
+        valid = in_file.read() == "genom\n" + genome
+        in_file.close()
+        if valid and all(os.path.isfile(file) for file_name, file in inputs):
+            return inputs
+
+    if not os.path.isdir(folder):
+        try:
+            os.makedirs(folder)
+        except OSError:
+            # created by another model run of the individual
+            pass
+    # other model runs of the individual may write the files at the same time, 
+    # every writer uses an own temporary file which replaces the input file
+    suffix = ".%d_%d" % (os.getpid(), threading.get_ident())
+    if map_is_required():
+        map_file = inputs[1][1]
+        ascii_map = render_individual_map(task.individual, map_info, patchID_map_info)
+        fh.write_ascii_file(map_file + suffix, header_all_info, ascii_map)
+        os.replace(map_file + suffix, map_file)
+    fh.write_genome_file(genome_file + suffix, task.individual)
+    os.replace(genome_file + suffix, genome_file)
+    return inputs
+
+def link_input_file(source, target):
+    """Replace the input file target by a hard link to source (a copy if the 
+       file system does not support hard links).
+
+       The old file is removed first, so the input files of other individuals
+       which are linked to it are not changed.
+    """
+
+    if os.path.lexists(target):
+        os.remove(target)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+def write_batch_inputs(task, map_info, patchID_map_info):
+    """Write the genomes and maps of all individuals of a batch task into the model folder.
+
+       genom_batch.csv has one column per individual (the header holds the individual 
+       numbers) and one row per gene, map_batch.npy holds the land use maps of all 
+       individuals as 3-D array (individual, row, column) in the same order.
+
+       input:
+           task is a ModelTask with batch
+           map_info and patchID_map_info are the variables for the map creation
+    """
+
+    folder = os.path.join(fh.folder_path(task.workspace), task.model_folder)
+    out_file = open(os.path.join(folder, 'genom_batch.csv'), 'w')
+    out_file.write(",".join(["individual_%d" % ind_number for ind_number in task.ind_numbers()]) + "\n")
+    for genes in zip(*[individual for ind_number, individual in task.batch]):
+        out_file.write(",".join(["%d" % gene for gene in genes]) + "\n")
+    out_file.close()
+    if map_is_required():
+        maps = np.stack([render_individual_map(individual, map_info, patchID_map_info) for ind_number, individual in task.batch])
+        np.save(os.path.join(folder, 'map_batch.npy'), maps)
+
+def patch_cells(patchID_map_info):
+    """Return the number of cells per patch ID (index = patch ID), the counts
+       are computed once per process.
+    """
+
+    global patch_cells_counts
+
+    if patch_cells_counts is None:
+        if isinstance(patchID_map_info, np.ndarray):
+            patch_ids = patchID_map_info[patchID_map_info > 0].astype(int)
+            patch_cells_counts = np.bincount(patch_ids)
+        else:
+            patch_cells_counts = np.zeros(0, dtype=int)
+    return patch_cells_counts
+
+def write_delta_inputs(task, patchID_map_info):
+    """Write the changes of an individual relative to an evaluated reference individual.
+
+       delta.csv has one row per changed patch with the patch ID, its number of cells
+       and the old (reference) and new land use, reference_fitness.csv holds the fitness 
+       values of the model for the reference individual in the format of the model output.
+       A model with additive objectives only has to process the changed patches. Without
+       a reference individual both files are removed and the model evaluates the whole map.
+
+       input:
+           task is a ModelTask
+           patchID_map_info is the patch ID map
+    """
+
+    folder = os.path.join(fh.folder_path(task.workspace), task.model_folder)
+    delta_file = os.path.join(folder, 'delta.csv')
+    reference_file = os.path.join(folder, 'reference_fitness.csv')
+    if task.reference is None:
+        for file in (delta_file, reference_file):
+            if os.path.isfile(file):
+                os.remove(file)
+        return
+
+    reference, values = task.reference
+    old = np.asarray(reference)
+    new = np.asarray(task.individual)
+    cells = patch_cells(patchID_map_info)
+    out_file = open(delta_file, 'w')
+    out_file.write("patch_id,cells,old,new\n")
+    for index in np.nonzero(old != new)[0]:
+        patch_id = index + 1
+        number_cells = cells[patch_id] if patch_id < len(cells) else 0
+        out_file.write("%d,%d,%d,%d\n" % (patch_id, number_cells, old[index], new[index]))
+    out_file.close()
+    out_file = open(reference_file, 'w')
+    for value in values:
+        out_file.write("%r\n" % float(value))
+    out_file.close()
+
+def save_task_outputs(task, model_path):
+    """Move the outputs of a model run into the results folders of the evaluated individuals
+       (unless another run of the task was saved first) and return the fitness values of 
+       the task (the list of fitness values or for a batch task a dictionary individual 
+       number -> list), so the main process does not read the output files again.
+
+       input:
+           task is a ModelTask
+           model_path is the path of the model folder in the helping folder
+    """
+
+    output_file = model_output_file(task)
+    if not os.path.isfile(os.path.join(model_path, output_file)):
+        msg = "Error: The model %s did not write its output file %s." % (task.model_file, output_file)
+        WriteLogMsg(msg, str(task.ind_number) + str(task.model_number))
+        raise SystemError(msg)
+    if task.batch is None:
+        folder = fh.save_model_outputs(model_path, task.ind_number, task.model_folder, output_file, task.workspace)
+        values = fh.read_fitness_value(os.path.join(folder, output_file))
+    else:
+        values = fh.save_batch_outputs(model_path, task.ind_numbers(), task.model_folder, output_file, task.workspace)
+    # a speculative copy of the task may have saved its outputs first
+    if not fh.accept_model_outputs(task.ind_numbers(), task.model_folder, task.workspace):
+        msg = "The outputs of %r are not used, another run of the task was finished first." % task
+        WriteLogMsg(msg, str(task.ind_number) + str(task.model_number))
+        raise SystemError(msg)
+    return values
+
+def run_model_task(task, map_info, patchID_map_info, header_all_info):
+    """Write the inputs of one model and run it (executed in a worker process).
+
+       Return the fitness values of the task, the outputs of external models
+       are moved into the results folder of the individual as well.
+
+       input:
+           task is a ModelTask
+           map_info, patchID_map_info and header_all_info are the variables
+           for the map creation
+    """
+
+    # log file of the model run (individual number followed by the model number)
+    number = str(task.ind_number) + str(task.model_number)
+
+    # static rasters from the shared memory
+    map_info = shared_array(map_info)
+    patchID_map_info = shared_array(patchID_map_info)
+
+    if task.plugin:
+        return run_plugin_task(task, map_info, patchID_map_info, header_all_info, number)
+
+    file_path = write_model_inputs(task, map_info, patchID_map_info, header_all_info, number)
+    # start external model
+    fh.run_model(file_path, cfg.modelConfig.file_path_R, cfg.modelConfig.file_path_python, 
+                 cfg.modelConfig.RPy2_available, number, cfg.modelConfig.r_sessions)
+    return save_task_outputs(task, os.path.dirname(file_path))
+
+#------------------------------------------------------------------------------
+#   Run time estimates of the models
+#------------------------------------------------------------------------------
+class RuntimeEstimator:
+    """Exponentially weighted mean run time per model, it is kept for all
+       generations and used to start the most expensive tasks first.
+    """
+
+    def __init__(self, smoothing=runtime_smoothing):
+        """input:
+               smoothing is the weight of the latest run time
+        """
+
+        self.smoothing = smoothing
+        # mean run time in seconds, model folder -> seconds
+        self.mean = {}
+
+    def update(self, model_folder, seconds):
+        """Add the run time of a finished task."""
+
+        if model_folder in self.mean:
+            self.mean[model_folder] += self.smoothing * (seconds - self.mean[model_folder])
+        else:
+            self.mean[model_folder] = seconds
+
+    def estimate(self, task):
+        """Return the estimated run time of a task or None if the model has not run yet."""
+
+        return self.mean.get(task.model_folder)
+
+    def makespan(self, tasks, number_workers):
+        """Return the predicted time to run all tasks in the given order (longest first)
+           on number_workers workers or None if a run time is unknown.
+        """
+
+        workers = [0.0] * max(1, number_workers)
+        for task in tasks:
+            seconds = self.estimate(task)
+            if seconds is None:
+                return None
+            # the next task starts on the worker which is free first
+            index = workers.index(min(workers))
+            workers[index] += seconds
+        return max(workers)
+
+#------------------------------------------------------------------------------
+#   Scheduler for the evaluation tasks
+#------------------------------------------------------------------------------
+class TaskScheduler:
+    """Global scheduler for the evaluation tasks of a generation.
+
+       The scheduler holds the tasks which are ready to run and keeps exactly as
+       many tasks running as the pool has workers, so a finished model run is
+       immediately replaced by the next task. Every running task gets one of the
+       helping models folders models_1 ... models_n (n = number of workers) which
+       is free, so the number of helping folders does not depend on the 
+       population size.
+
+       The tasks with the longest estimated run time are started first, so the
+       generation does not wait for an expensive model run at its end.
+
+       Tasks which run longer than their timeout are stopped, failed tasks are
+       repeated up to max_retries times. If fail_fast is True, the other tasks
+       of an individual are stopped as soon as one of its tasks failed, so the
+       workers are free for useful model runs. If speculative execution is activated,
+       the slowest tasks get a copy on a free worker as soon as most of the tasks 
+       are finished, the first finished copy wins.
+
+       The number of helping folders follows the number of workers of the pool,
+       which changes when network workers register or leave.
+
+       Tasks can be added while other tasks are running (poll()), e.g. for the
+       pipelined evaluation which starts the model runs of each offspring as
+       soon as it is varied.
+    """
+
+    def __init__(self, pool, max_retries=0, speculative=False, speculative_fraction=0.9, estimator=None, fail_fast=False):
+        """input:
+               pool is the WorkerPool (or AsyncPool) which executes the tasks
+               max_retries is the number of repetitions of a failed task
+               speculative is True if copies of slow tasks are started
+               speculative_fraction is the fraction of finished tasks from which on
+               copies of slow tasks are started
+               estimator is the RuntimeEstimator of the run (a new one if None)
+               fail_fast is True if the other tasks of an individual are stopped
+               when one of its tasks failed
+        """
+
+        self.pool = pool
+        if estimator is None:
+            estimator = RuntimeEstimator()
+        self.estimator = estimator
+        self.max_retries = max_retries
+        self.speculative = speculative
+        self.speculative_fraction = speculative_fraction
+        self.fail_fast = fail_fast
+        # tasks which are waiting for a free worker
+        self.ready = []
+        # running tasks, task_id -> task
+        self.running = {}
+        # start time of the running tasks, task_id -> time
+        self.started = {}
+        # original task of each running task
+        self.original = {}
+        # task_ids of the running copies of an original task, id(original task) -> list
+        self.copies = {}
+        # free helping models folders and the folders of cancelled tasks 
+        # which are not yet confirmed by the pool, task_id -> folder
+        self.free_slots = ['models_%d' % number for number in range(self.pool.number_workers, 0, -1)]
+        self.cancelling = {}
+        self.number_tasks = 0
+        self.finished = 0
+        # tasks which were finished before run() (poll()), list of tuples (task, status, result)
+        self.results = []
+        # time of the first added task
+        self.begin = None
+
+    def add(self, tasks):
+        """Add tasks to the list of ready tasks, the longest tasks come first."""
+
+        if tasks and self.begin is None:
+            self.begin = time.time()
+        self.ready.extend(tasks)
+        self.number_tasks += len(tasks)
+        self._sort_ready()
+
+    def _sort_ready(self):
+        """Sort the ready tasks by their estimated run time (longest first),
+           tasks of models without run time come first to get an estimate.
+        """
+
+        def key(task):
+            seconds = self.estimator.estimate(task)
+            if seconds is None:
+                return float('inf')
+            return seconds
+        self.ready.sort(key=key, reverse=True)
+
+    def _submit(self, original):
+        """Start a task (or a copy of a running task) in a free helping folder."""
+
+        task = original.copy(self.free_slots.pop())
+        task_id = self.pool.submit(task)
+        self.running[task_id] = task
+        self.started[task_id] = time.time()
+        self.original[task_id] = original
+        self.copies.setdefault(id(original), []).append(task_id)
+        return task_id
+
+    def _resize_slots(self):
+        """Adapt the number of helping folders to the number of workers of the pool,
+           the workers of the network backend register and leave during the run.
+           Busy folders of missing workers are dropped when their tasks are finished.
+        """
+
+        number_slots = self.pool.number_workers
+        busy = [task.workspace for task in self.running.values()] + list(self.cancelling.values())
+        if len(self.free_slots) + len(busy) < number_slots:
+            taken = set(self.free_slots + busy)
+            missing = number_slots - len(self.free_slots) - len(busy)
+            number = 1
+            while missing > 0:
+                if 'models_%d' % number not in taken:
+                    # free_slots is used from its end
+                    self.free_slots.insert(0, 'models_%d' % number)
+                    missing -= 1
+                number += 1
+        while self.free_slots and len(self.free_slots) + len(busy) > number_slots:
+            self.free_slots.pop(0)
+
+    def _fill_slots(self):
+        """Start ready tasks until all workers are busy."""
+
+        self._resize_slots()
+        while self.ready and self.free_slots:
+            self._submit(self.ready.pop(0))
+        if self.speculative and not self.ready and self.finished >= self.speculative_fraction * self.number_tasks:
+            self._start_copies()
+
+    def _start_copies(self):
+        """Start copies of the slowest running tasks on the free workers."""
+
+        now = time.time()
+        candidates = []
+        for task_id, task in self.running.items():
+            original = self.original[task_id]
+            if len(self.copies[id(original)]) > 1 or original.plugin:
+                continue
+            seconds = self.estimator.estimate(task)
+            # only stragglers which run longer than the mean run time of their model
+            if seconds is not None and now - self.started[task_id] > seconds:
+                candidates.append((self.started[task_id], task_id))
+        candidates.sort()
+        for start, task_id in candidates:
+            if not self.free_slots:
+                break
+            original = self.original[task_id]
+            copy_id = self._submit(original)
+            WriteLogMsg("Speculative copy of the slow task (%r) started in %s." % (original, self.running[copy_id].workspace))
+
+    def _remove(self, task_id):
+        """Remove a task from the running tasks and return its original task."""
+
+        task = self.running.pop(task_id)
+        start = self.started.pop(task_id)
+        original = self.original.pop(task_id)
+        self.copies[id(original)].remove(task_id)
+        return task, start, original
+
+    def _cancel(self, task_id):
+        """Stop a running task, its helping folder is free when the pool confirms it."""
+
+        task, start, original = self._remove(task_id)
+        self.cancelling[task_id] = task.workspace
+        self.pool.cancel(task_id)
+        return task, start, original
+
+    def _finish(self, original, status, result, results):
+        """Save the result of an original task and stop its other copies."""
+
+        for task_id in list(self.copies.get(id(original), [])):
+            self._cancel(task_id)
+        self.copies.pop(id(original), None)
+        self.finished += 1
+        results.append((original, status, result))
+
+    def _fail(self, original, status, result, results):
+        """Save the result of a failed original task and stop the other tasks 
+           of its individuals (fail_fast), the individuals get no fitness values anyway.
+        """
+
+        self._finish(original, status, result, results)
+        if not self.fail_fast:
+            return
+        ind_numbers = set(original.ind_numbers())
+        siblings = []
+        for task in self.ready + [self.original[task_id] for task_id in self.running]:
+            # a batch task is only stopped if all its individuals failed
+            if task not in siblings and set(task.ind_numbers()) <= ind_numbers:
+                siblings.append(task)
+        for task in siblings:
+            if task in self.ready:
+                self.ready.remove(task)
+            self._finish(task, 'cancelled', "Stopped because the task (%r) failed." % original, results)
+        if siblings:
+            WriteLogMsg("Fail-fast (%r): %d other task(s) of the individual stopped." % (original, len(siblings)))
+
+    def _check_timeouts(self, results):
+        """Stop the tasks which run longer than their timeout."""
+
+        now = time.time()
+        for task_id, task in list(self.running.items()):
+            if task_id in self.running and task.timeout is not None and now - self.started[task_id] > task.timeout:
+                task, start, original = self._cancel(task_id)
+                WriteLogMsg("Timeout (%r): the model run was stopped after %d seconds." % (task, now - start))
+                # a copy of the task may still finish in time
+                if not self.copies[id(original)]:
+                    self._fail(original, 'timeout', "Model run stopped after %d seconds." % (now - start), results)
+
+    def _wait_time(self):
+        """Return the time until the next timeout or None."""
+
+        deadlines = [self.started[task_id] + task.timeout for task_id, task in self.running.items() if task.timeout is not None]
+        if not deadlines:
+            return None
+        return max(0.1, min(deadlines) - time.time())
+
+    def _step(self, results, timeout=None):
+        """Wait for the next answer of the pool (or the next timeout) and handle it,
+           finished tasks are appended to results. Return False if no answer came.
+
+           input:
+               timeout is the maximum waiting time in seconds (until the next
+               timeout of a task if None)
+        """
+
+        if timeout is None:
+            timeout = self._wait_time()
+        answer = self.pool.get_result(timeout)
+        if answer is None:
+            self._check_timeouts(results)
+            self._fill_slots()
+            return False
+        status, task_id, result = answer
+        if task_id in self.cancelling:
+            if status == 'cancelled':
+                self.free_slots.append(self.cancelling.pop(task_id))
+                self._fill_slots()
+            return True
+        if task_id not in self.running:
+            return True
+        task, start, original = self._remove(task_id)
+        self.free_slots.append(task.workspace)
+        if status == 'done':
+            self.estimator.update(task.model_folder, time.time() - start)
+            self._finish(original, status, result, results)
+        elif self.copies[id(original)]:
+            # another copy of the task is still running
+            WriteLogMsg("Error (%r): %s" % (task, result))
+        elif original.attempts < self.max_retries:
+            original.attempts += 1
+            WriteLogMsg("Error (%r): %s, the task is repeated (%d. retry)." % (task, result, original.attempts))
+            self.ready.insert(0, original)
+        else:
+            self._fail(original, status, result, results)
+        self._check_timeouts(results)
+        self._fill_slots()
+        return True
+
+    def poll(self):
+        """Start ready tasks and handle the answers of the pool without waiting,
+           for an evaluation which adds tasks while the first tasks are running
+           (the finished tasks are returned by the next run()).
+        """
+
+        self._fill_slots()
+        while (self.running or self.cancelling) and self._step(self.results, 0):
+            pass
+
+    def run(self, callback=None):
+        """Execute all tasks and return a list with a tuple (task, status, result) per task,
+           status is 'done', 'error', 'timeout' or 'cancelled' (fail_fast).
+
+           input:
+               callback is called with (task, status, result) as soon as a task is 
+               finished (e.g. for the evaluation journal) or None
+        """
+
+        # tasks which were finished before run() (poll())
+        results = self.results
+        self.results = []
+        if callback is not None:
+            for task, status, result in results:
+                callback(task, status, result)
+        begin = self.begin
+        if begin is None:
+            begin = time.time()
+        # tasks which were started before run() (pipelined evaluation)
+        started_before = self.number_tasks > len(self.ready)
+        predicted = self.estimator.makespan(self.ready, self.pool.number_workers)
+        number_tasks = self.number_tasks
+        self._fill_slots()
+        # wait also for the cancelled tasks, their helping folders are used in the next generation
+        while self.running or self.cancelling:
+            number_results = len(results)
+            self._step(results)
+            if callback is not None:
+                for task, status, result in results[number_results:]:
+                    callback(task, status, result)
+
+        if number_tasks > 0:
+            if started_before:
+                msg = "Makespan of %d model runs on %d workers: %.1f seconds (started during the variation)." \
+                      % (number_tasks, self.pool.number_workers, time.time() - begin)
+            elif predicted is None:
+                msg = "Makespan of %d model runs on %d workers: %.1f seconds (no prediction, run times are not known yet)." \
+                      % (number_tasks, self.pool.number_workers, time.time() - begin)
+            else:
+                msg = "Makespan of %d model runs on %d workers: predicted %.1f seconds, actual %.1f seconds." \
+                      % (number_tasks, self.pool.number_workers, predicted, time.time() - begin)
+            WriteLogMsg(msg)
+        return results
+
+    def wait(self):
+        """Wait until at least one task is finished and return the finished tasks like run(),
+           for a continuous evaluation which adds new tasks between the calls
+           (an empty list if no task is left).
+        """
+
+        results = []
+        self._fill_slots()
+        while not results and (self.running or self.cancelling):
+            self._step(results)
+        return results
+
+    def stop(self):
+        """Stop all running tasks, drop the ready tasks and wait until the pool
+           confirms the cancelled tasks.
+        """
+
+        self.ready = []
+        for task_id in list(self.running):
+            self._cancel(task_id)
+        self.copies = {}
+        while self.cancelling:
+            self._step([])
+
+#------------------------------------------------------------------------------
+#
+#   EOF
+#
+#------------------------------------------------------------------------------
@@ -37,7 +37,7 @@
 #------------------------------------------------------------------------------
 import os
 import sys
-import importlib
+import importlib.util
 import config as cfg
 
 #------------------------------------------------------------------------------  
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+#
+#   Name:       rhandler.py
+#   Purpose:    This module provides resident R sessions which source the
+#               R model scripts on request, so R does not have to be started
+#               for every model run.
+#
+#   Author:     Carola Paetzold, Michael Strauch
+#   Contact:    michael.strauch@ufz.de
+#
+#               Helmholtz Centre for Environmental Research - UFZ
+#               Department Computational Landscape Ecology - CLE
+#               Permoserstrasse 15
+#               D-04318 Leipzig, Germany
+#               http://www.ufz.de
+#
+#   Created:    Sun Oct 18 2026
+#
+#   Copyright:  (c) Carola Paetzold / Michael Strauch 2026
+#
+#   Licence:    This program is free software:
+#               you can redistribute it and/or modify it under the terms
+#               of the GNU General Public License as published by the
+#               Free Software Foundation, either version 3 of the License,
+#               or (at your option) any later version. This program is
+#               distributed in the hope that it will be useful, but
+#               WITHOUT ANY WARRANTY; without even the implied warranty
+#               of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#               See the GNU General Public License for more details.
+#               You should have received a copy of the GNU General
+#               Public License along with this program.
+#               If not, see <http://www.gnu.org/licenses/>.
+#
+#------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------
+import os
+import subprocess
+
+from filehandler import WriteLogMsg
+
+wrkDir = os.path.abspath('.')
+
+# marker which is written by the R session after each model run
+done_marker = "COMOLA_DONE"
+
+# R code of the session: read one request per line from stdin,
+# source the model script in its folder and answer with the done marker
+server_script = r'''
+con <- file("stdin", open = "r")
+repeat {
+  request <- readLines(con, n = 1)
+  if (length(request) == 0) break
+  parts <- strsplit(request, "\t", fixed = TRUE)[[1]]
+  result <- tryCatch({
+    setwd(parts[1])
+    source(parts[2], local = new.env(), chdir = TRUE)
+    "OK"
+  }, error = function(e) {
+    paste("ERROR", gsub("[\r\n]", " ", conditionMessage(e)))
+  }, finally = {
+    # the model scripts redirect their console output with sink()
+    while (sink.number() > 0) sink()
+  })
+  cat("COMOLA_DONE", result, "\n")
+  flush(stdout())
+}
+'''
+
+# R session of this process (each worker process has its own session)
+session = None
+
+#------------------------------------------------------------------------------
+#   Resident R session
+#------------------------------------------------------------------------------
+class RSession:
+    """An R interpreter which stays alive and sources model scripts on request.
+
+       Libraries which are loaded by a model script stay loaded for the next
+       run, each script is sourced in a new environment.
+    """
+
+    def __init__(self, file_path_R):
+        """input:
+               file_path_R is the path for the R file
+        """
+
+        self.file_path_R = file_path_R
+        self.process = None
+
+    def start(self):
+        """Start the R interpreter."""
+
+        file_server = os.path.join(wrkDir, 'output', 'r_session_server.R')
+        if not os.path.isfile(file_server):
+            # several worker processes can start their sessions at the same time
+            file_help = '%s.%d' % (file_server, os.getpid())
+            server_file = open(file_help, 'w')
+            server_file.write(server_script)
+            server_file.close()
+            os.replace(file_help, file_server)
+        cmd = [self.file_path_R, '--vanilla', '--slave', '-f', file_server]
+        self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.DEVNULL, universal_newlines=True, bufsize=1)
+
+    def is_alive(self):
+        """Return True if the R interpreter is running."""
+
+        return self.process is not None and self.process.poll() is None
+
+    def stop(self):
+        """Stop the R interpreter."""
+
+        if self.is_alive():
+            try:
+                self.process.stdin.close()
+                self.process.wait(10)
+            except Exception:
+                self.process.kill()
+        self.process = None
+
+    def _request(self, file_path):
+        """Send one request and wait for the answer of the R session."""
+
+        folder = os.path.dirname(file_path).replace('\\', '/')
+        self.process.stdin.write("%s\t%s\n" % (folder, file_path.replace('\\', '/')))
+        self.process.stdin.flush()
+        while True:
+            line = self.process.stdout.readline()
+            if line == '':
+                raise EOFError("The R session terminated.")
+            if line.startswith(done_marker):
+                return line[len(done_marker):].strip()
+
+    def run(self, file_path):
+        """Source the model script in its folder.
+
+           If the R session crashed it is restarted and the model run is repeated once.
+
+           input:
+               file_path is the script file path of a model
+        """
+
+        for trial in range(2):
+            if not self.is_alive():
+                self.start()
+            try:
+                answer = self._request(file_path)
+                break
+            except (EOFError, OSError) as e:
+                self.stop()
+                if trial == 1:
+                    raise SystemError("The R session terminated twice while running %s." % file_path)
+                WriteLogMsg("R session terminated while running %s (%s), it is restarted." % (file_path, e))
+        if answer != "OK":
+            raise SystemError("Error in R model %s: %s" % (file_path, answer))
+
+#------------------------------------------------------------------------------
+#   R session of the current process
+#------------------------------------------------------------------------------
+def get_session(file_path_R):
+    """Return the R session of this process and start it if necessary.
+
+       input:
+           file_path_R is the path for the R file
+    """
+
+    global session
+    if session is None:
+        session = RSession(file_path_R)
+    return session
+
+def stop_session():
+    """Stop the R session of this process, the worker processes call it when
+       they terminate.
+
+       The R session also terminates on its own if the process which started
+       it is killed, because then its input is closed.
+    """
+
+    global session
+    if session is not None:
+        session.stop()
+        session = None
+
+#------------------------------------------------------------------------------
+#
+#   EOF
+#
+#------------------------------------------------------------------------------
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+#
+#   Name:       surrogatehandler.py
+#   Purpose:    This module provides a surrogate model which predicts the fitness
+#               values of the offspring from all evaluated individuals, so only
+#               the most promising offspring are sent to the external models.
+#
+#   Author:     Carola Paetzold, Michael Strauch
+#   Contact:    michael.strauch@ufz.de
+#
+#               Helmholtz Centre for Environmental Research - UFZ
+#               Department Computational Landscape Ecology - CLE
+#               Permoserstrasse 15
+#               D-04318 Leipzig, Germany
+#               http://www.ufz.de
+#
+#   Created:    Sun Oct 18 2026
+#
+#   Copyright:  (c) Carola Paetzold / Michael Strauch 2026
+#
+#   Licence:    This program is free software:
+#               you can redistribute it and/or modify it under the terms
+#               of the GNU General Public License as published by the
+#               Free Software Foundation, either version 3 of the License,
+#               or (at your option) any later version. This program is
+#               distributed in the hope that it will be useful, but
+#               WITHOUT ANY WARRANTY; without even the implied warranty
+#               of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#               See the GNU General Public License for more details.
+#               You should have received a copy of the GNU General
+#               Public License along with this program.
+#               If not, see <http://www.gnu.org/licenses/>.
+#
+#------------------------------------------------------------------------------
+
+#------------------------------------------------------------------------------
+#   Imports
+#------------------------------------------------------------------------------
+import math
+
+import numpy as np
+
+from filehandler import WriteLogMsg
+from cachehandler import candidate_hash
+
+#------------------------------------------------------------------------------
+#   Surrogate model
+#------------------------------------------------------------------------------
+class Surrogate:
+    """k-nearest neighbour regression of the model fitness values.
+
+       An individual is described by the shares of the land use classes in
+       its genome. The fitness values of a new individual are predicted as the
+       distance weighted mean of the k most similar evaluated individuals.
+
+       Before the models run, the offspring of a generation are ranked by
+       their predicted fitness values (number of offspring which dominate
+       them). Only the best fraction is evaluated by the external models, the
+       other individuals get the predicted fitness values. The prediction
+       error is measured at the individuals which are evaluated by the models.
+    """
+
+    def __init__(self, max_range, maximize, fraction, neighbours, min_samples):
+        """input:
+               max_range is the maximum number of land use classes
+               maximize is True if the fitness values are maximized
+               fraction is the fraction of the offspring which is evaluated by the models
+               neighbours is the number of neighbours (k) of a prediction
+               min_samples is the number of evaluated individuals from which on
+               the surrogate is used
+        """
+
+        self.max_range = max_range
+        self.maximize = maximize
+        self.fraction = fraction
+        self.neighbours = neighbours
+        self.min_samples = min_samples
+        # training data, one row per evaluated individual
+        self.features = []
+        self.values = []
+        # hash values of the candidates with predicted fitness values
+        self.predicted = set()
+        # predictions of the individuals which are evaluated by the models, individual number -> values
+        self.checked = {}
+        # statistics
+        self.number_predicted = 0
+        self.number_screened = 0
+        # predicted individuals which were evaluated by the models before the archive
+        self.number_evaluated = 0
+        self.saved_runs = 0
+        self.errors = []
+
+    def feature(self, candidate):
+        """Return the shares of the land use classes of a candidate."""
+
+        counts = np.bincount(np.asarray(candidate, dtype=int), minlength=self.max_range+1)[1:self.max_range+1]
+        return counts / float(max(len(candidate), 1))
+
+    def is_trained(self):
+        """Return True if enough individuals are evaluated for predictions."""
+
+        return len(self.values) >= max(self.min_samples, 1)
+
+    def predict(self, candidate):
+        """Return the predicted list of fitness values of a candidate."""
+
+        features = np.array(self.features)
+        values = np.array(self.values)
+        distance = np.sqrt(((features - self.feature(candidate))**2).sum(axis=1))
+        nearest = np.argsort(distance)[:self.neighbours]
+        weights = 1.0 / (distance[nearest] + 1e-9)
+        return [float(v) for v in (values[nearest] * weights[:, np.newaxis]).sum(axis=0) / weights.sum()]
+
+    def _dominates(self, a, b):
+        """Return True if the fitness values a dominate the fitness values b."""
+
+        if not self.maximize:
+            a = [-v for v in a]
+            b = [-v for v in b]
+        return all(x >= y for x, y in zip(a, b)) and any(x > y for x, y in zip(a, b))
+
+    def screen(self, candidates, number_models):
+        """Select the offspring which are evaluated by the models and return the
+           predicted fitness values of the others, individual number -> values.
+
+           input:
+               candidates is a dictionary individual number -> candidate of the
+               individuals which would be sent to the models
+               number_models is the number of model runs per individual
+        """
+
+        self.checked = {}
+        if not candidates or not self.is_trained():
+            return {}
+        prediction = dict((ind_number, self.predict(candidate)) for ind_number, candidate in candidates.items())
+        # rank the offspring by the number of offspring which dominate their prediction
+        rank = []
+        for ind_number, values in prediction.items():
+            dominated_by = len([other for other in prediction.values() if self._dominates(other, values)])
+            rank.append((dominated_by, ind_number))
+        rank.sort()
+        number_evaluated = int(math.ceil(self.fraction * len(rank)))
+
+        predicted = {}
+        for position, (dominated_by, ind_number) in enumerate(rank):
+            if position < number_evaluated:
+                self.checked[ind_number] = prediction[ind_number]
+            else:
+                predicted[ind_number] = prediction[ind_number]
+                self.predicted.add(candidate_hash(candidates[ind_number]))
+        self.number_screened += len(rank)
+        self.number_predicted += len(predicted)
+        self.saved_runs += len(predicted) * number_models
+        return predicted
+
+    def update(self, evaluated):
+        """Add the individuals which are evaluated by the models to the training
+           data and measure the prediction error.
+
+           input:
+               evaluated is a list of tuples (individual number, candidate, fitness values)
+        """
+
+        errors = []
+        for ind_number, candidate, values in evaluated:
+            self.features.append(self.feature(candidate))
+            self.values.append([float(v) for v in values])
+            if ind_number in self.checked:
+                error = [abs(p - v) / max(abs(v), 1e-9) for p, v in zip(self.checked[ind_number], values)]
+                errors.append(error)
+        self.checked = {}
+        self.errors.extend(errors)
+        return errors
+
+    def forget_predictions(self, candidates, number_models):
+        """Remove the marks of predicted candidates which were evaluated by the 
+           models afterwards (before they entered the archive).
+
+           input:
+               candidates is the list of the evaluated candidates
+               number_models is the number of model runs per individual
+        """
+
+        for candidate in candidates:
+            key = candidate_hash(candidate)
+            if key in self.predicted:
+                self.predicted.discard(key)
+                self.number_evaluated += 1
+                self.saved_runs -= number_models
+
+    def is_predicted(self, candidate):
+        """Return True if the fitness values of the candidate were predicted."""
+
+        return candidate_hash(candidate) in self.predicted
+
+    def log_statistics(self, errors=None):
+        """Write the prediction error and the number of saved model runs in the log file.
+
+           input:
+               errors are the relative prediction errors of the current generation
+               (statistics of the whole run if None)
+        """
+
+        if errors is None:
+            errors = self.errors
+            msg = "Surrogate (whole run): %d of %d offspring predicted (%d of them evaluated by the models before the archive), %d model runs saved" \
+                  % (self.number_predicted, self.number_screened, self.number_evaluated, self.saved_runs)
+        else:
+            msg = "Surrogate: %d training individuals, %d of %d offspring predicted, %d model runs saved so far" \
+                  % (len(self.values), self.number_predicted, self.number_screened, self.saved_runs)
+        if errors:
+            msg += ", mean relative prediction error per objective: %s." \
+                   % ", ".join(["%.1f %%" % (100.0 * e) for e in np.mean(np.array(errors), axis=0)])
+        else:
+            msg += "."
+        WriteLogMsg(msg)
+
+#------------------------------------------------------------------------------
+#
+#   EOF
+#
+#------------------------------------------------------------------------------
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+#
+#   Name:       conftest.py
+#   Purpose:    Common settings of the tests. The modules of CoMOLA read the
+#               config.ini of the working directory, so the tests run in the
+#               CoMOLA folder and write their log messages in a temporary
+#               output folder.
+#
+#------------------------------------------------------------------------------
+import os
+import sys
+
+import pytest
+
+comola_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(comola_folder)
+if comola_folder not in sys.path:
+    sys.path.insert(0, comola_folder)
+
+import filehandler
+
+
+@pytest.fixture(autouse=True)
+def log_folder(tmp_path, monkeypatch):
+    """Write the log messages of the tested functions in a temporary output folder."""
+
+    os.makedirs(os.path.join(str(tmp_path), "output", "child_processes"))
+    monkeypatch.setattr(filehandler, "wrkDir", str(tmp_path))
+    return tmp_path
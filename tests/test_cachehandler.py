@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+#
+#   Name:       test_cachehandler.py
+#   Purpose:    Tests of the cache key, the fingerprint of the models and the
+#               evaluation journal.
+#
+#------------------------------------------------------------------------------
+import os
+
+import numpy as np
+
+import cachehandler
+from cachehandler import candidate_hash
+from cachehandler import compute_fingerprint
+from cachehandler import EvaluationJournal
+from cachehandler import FitnessCache
+
+#------------------------------------------------------------------------------
+#   Cache key
+#------------------------------------------------------------------------------
+def test_candidate_hash_depends_on_genes_and_order():
+    assert candidate_hash([1, 2, 3]) == candidate_hash([1, 2, 3])
+    assert candidate_hash([1, 2, 3]) != candidate_hash([1, 2, 4])
+    assert candidate_hash([1, 2, 3]) != candidate_hash([3, 2, 1])
+    # the genes are not joined ambiguously
+    assert candidate_hash([1, 23]) != candidate_hash([12, 3])
+
+
+def test_candidate_hash_of_numpy_genome():
+    assert candidate_hash(np.array([1, 2, 3])) == candidate_hash([1, 2, 3])
+
+
+def test_fitness_cache(tmp_path):
+    cache = FitnessCache(str(tmp_path / "cache.sqlite"), "abc")
+    cache.put([1, 2, 3], [np.float64(0.5), 2])
+    cache.commit()
+    assert cache.get([1, 2, 3]) == [0.5, 2.0]
+    assert cache.get([1, 2, 4]) is None
+    # the values of other models are not used
+    assert FitnessCache(str(tmp_path / "cache.sqlite"), "xyz").get([1, 2, 3]) is None
+
+#------------------------------------------------------------------------------
+#   Fingerprint
+#------------------------------------------------------------------------------
+def write_file(file_path, content):
+    out_file = open(file_path, "w")
+    out_file.write(content)
+    out_file.close()
+
+
+def make_model(tmp_path, monkeypatch):
+    """Create a model folder with a script and an input file."""
+
+    model_path = tmp_path / "models" / "M1"
+    os.makedirs(str(model_path / "data"))
+    write_file(str(model_path / "model.py"), "print('model')\n")
+    write_file(str(model_path / "data" / "soil.txt"), "1 2 3\n")
+    monkeypatch.setattr(cachehandler, "wrkDir", str(tmp_path))
+    return model_path
+
+
+def fingerprint():
+    return compute_fingerprint(["M1"], ["model.py"], ["output.csv"])
+
+
+def test_fingerprint_changes_with_model_data(tmp_path, monkeypatch):
+    model_path = make_model(tmp_path, monkeypatch)
+    first = fingerprint()
+    assert fingerprint() == first
+    write_file(str(model_path / "data" / "soil.txt"), "1 2 4\n")
+    assert fingerprint() != first
+
+
+def test_fingerprint_changes_with_model_script(tmp_path, monkeypatch):
+    model_path = make_model(tmp_path, monkeypatch)
+    first = fingerprint()
+    write_file(str(model_path / "model.py"), "print('other model')\n")
+    assert fingerprint() != first
+
+
+def test_fingerprint_ignores_run_files(tmp_path, monkeypatch):
+    model_path = make_model(tmp_path, monkeypatch)
+    first = fingerprint()
+    # inputs and outputs which are written by each model run
+    write_file(str(model_path / "genom.csv"), "1,2,3\n")
+    write_file(str(model_path / "output.csv"), "0.5\n")
+    assert fingerprint() == first
+
+
+def test_fingerprint_depends_on_output_files(tmp_path, monkeypatch):
+    make_model(tmp_path, monkeypatch)
+    assert compute_fingerprint(["M1"], ["model.py"], ["output.csv"]) != \
+           compute_fingerprint(["M1"], ["model.py"], ["other.csv"])
+
+#------------------------------------------------------------------------------
+#   Evaluation journal
+#------------------------------------------------------------------------------
+def test_journal_replay(tmp_path):
+    file_path = str(tmp_path / "journal.csv")
+    journal = EvaluationJournal(file_path, "abc", False)
+    journal.write(1, [1, 2, 3], "M1", [np.float64(0.5)])
+    journal.write(1, [1, 2, 3], "M2", [1, 2])
+    journal.write_state(1, {"random": [1, 2]})
+    journal.close()
+
+    journal = EvaluationJournal(file_path, "abc", True)
+    assert journal.get([1, 2, 3], "M1") == [0.5]
+    assert journal.get([1, 2, 3], "M2") == [1.0, 2.0]
+    assert journal.get([1, 2, 4], "M1") is None
+    assert journal.get_state(1) == {"random": [1, 2]}
+    assert journal.get_state(2) is None
+    assert journal.replayed == 2
+    journal.close()
+
+
+def test_journal_ignores_incomplete_last_line(tmp_path):
+    file_path = str(tmp_path / "journal.csv")
+    journal = EvaluationJournal(file_path, "abc", False)
+    journal.write(1, [1, 2, 3], "M1", [0.5])
+    journal.close()
+    # interrupted while writing the next line
+    out_file = open(file_path, "a")
+    out_file.write("1,%s,M1,[0." % candidate_hash([4, 5, 6]))
+    out_file.close()
+
+    journal = EvaluationJournal(file_path, "abc", True)
+    assert journal.get([1, 2, 3], "M1") == [0.5]
+    assert journal.get([4, 5, 6], "M1") is None
+    journal.write(2, [4, 5, 6], "M1", [0.7])
+    journal.close()
+
+    # the new line is not joined with the incomplete line
+    journal = EvaluationJournal(file_path, "abc", True)
+    assert journal.get([1, 2, 3], "M1") == [0.5]
+    assert journal.get([4, 5, 6], "M1") == [0.7]
+    journal.close()
+
+
+def test_journal_resume_appends(tmp_path):
+    file_path = str(tmp_path / "journal.csv")
+    journal = EvaluationJournal(file_path, "abc", False)
+    journal.write(1, [1, 2, 3], "M1", [0.5])
+    journal.close()
+
+    # the resumed run is interrupted again, the runs of both runs are kept
+    journal = EvaluationJournal(file_path, "abc", True)
+    journal.write(2, [4, 5, 6], "M1", [0.7])
+    journal.close()
+    journal = EvaluationJournal(file_path, "abc", True)
+    assert journal.get([1, 2, 3], "M1") == [0.5]
+    assert journal.get([4, 5, 6], "M1") == [0.7]
+    journal.close()
+
+
+def test_journal_of_other_models_is_not_used(tmp_path):
+    file_path = str(tmp_path / "journal.csv")
+    journal = EvaluationJournal(file_path, "abc", False)
+    journal.write(1, [1, 2, 3], "M1", [0.5])
+    journal.close()
+
+    journal = EvaluationJournal(file_path, "xyz", True)
+    assert journal.get([1, 2, 3], "M1") is None
+    journal.close()
+    # a new journal is started
+    in_file = open(file_path)
+    assert in_file.read() == "fingerprint,xyz\n"
+    in_file.close()
+
+
+def test_journal_without_resume_starts_new(tmp_path):
+    file_path = str(tmp_path / "journal.csv")
+    journal = EvaluationJournal(file_path, "abc", False)
+    journal.write(1, [1, 2, 3], "M1", [0.5])
+    journal.close()
+
+    journal = EvaluationJournal(file_path, "abc", False)
+    journal.close()
+    journal = EvaluationJournal(file_path, "abc", True)
+    assert journal.get([1, 2, 3], "M1") is None
+    journal.close()
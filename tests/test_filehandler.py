@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+#
+#   Name:       test_filehandler.py
+#   Purpose:    Tests of the results folders of the model runs.
+#
+#------------------------------------------------------------------------------
+import os
+
+import filehandler as fh
+
+
+def read_file(file_path):
+    in_file = open(file_path)
+    content = in_file.read()
+    in_file.close()
+    return content
+
+
+def write_file(file_path, content):
+    out_file = open(file_path, "w")
+    out_file.write(content)
+    out_file.close()
+
+
+def model_run(workspace, attempt, output):
+    """Return the model folder of a finished model run in the helping folder attempt."""
+
+    model_path = os.path.join(str(workspace), attempt, "M1")
+    os.makedirs(model_path)
+    write_file(os.path.join(model_path, "output.csv"), output)
+    write_file(os.path.join(model_path, "console.txt"), "run in %s\n" % attempt)
+    return model_path
+
+
+def test_outputs_of_first_saved_run_are_kept(log_folder):
+    # the run and its speculative copy are finished at the same time
+    fh.save_model_outputs(model_run(log_folder, "models_1", "1.0\n"), 3, "M1", "output.csv", "models_1")
+    fh.save_model_outputs(model_run(log_folder, "models_2", "2.0\n"), 3, "M1", "output.csv", "models_2")
+
+    assert fh.accept_model_outputs([3], "M1", "models_2")
+    assert not fh.accept_model_outputs([3], "M1", "models_1")
+
+    folder = os.path.join(str(log_folder), fh.results_folder(3))
+    assert sorted(os.listdir(folder)) == ["M1"]
+    assert read_file(os.path.join(folder, "M1", "output.csv")) == "2.0\n"
+    assert read_file(os.path.join(folder, "M1", "console.txt")) == "run in models_2\n"
+
+
+def test_batch_outputs_of_first_saved_run_are_kept(log_folder):
+    fh.save_batch_outputs(model_run(log_folder, "models_1", "1.0\n1.5\n"), [3, 4], "M1", "output.csv", "models_1")
+    fh.save_batch_outputs(model_run(log_folder, "models_2", "2.0\n2.5\n"), [3, 4], "M1", "output.csv", "models_2")
+
+    assert fh.accept_model_outputs([3, 4], "M1", "models_1")
+    assert not fh.accept_model_outputs([3, 4], "M1", "models_2")
+
+    for ind_number, value in [(3, 1.0), (4, 1.5)]:
+        folder = os.path.join(str(log_folder), fh.results_folder(ind_number))
+        assert sorted(os.listdir(folder)) == ["M1"]
+        assert fh.read_fitness_value(os.path.join(folder, "M1", "output.csv")) == [value]
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+#------------------------------------------------------------------------------
+#
+#   Name:       test_poolhandler.py
+#   Purpose:    Tests of the scheduler of the evaluation tasks (timeouts,
+#               repeated tasks, speculative copies, fail-fast, helping
+#               folders and tasks which are added while others run) with a
+#               pool which returns given answers instead of running the models.
+#
+#------------------------------------------------------------------------------
+import time
+
+from poolhandler import ModelTask
+from poolhandler import RuntimeEstimator
+from poolhandler import TaskScheduler
+
+#------------------------------------------------------------------------------
+#   Pool with given answers
+#------------------------------------------------------------------------------
+class ScriptedPool:
+    """Pool with the interface of the WorkerPool which answers at once.
+
+       outcomes is a dictionary (individual number, model folder) -> list with
+       one outcome per model run, an outcome is a tuple (status, result) or
+       'hang' for a model run which does not finish.
+    """
+
+    def __init__(self, number_workers, outcomes):
+        self.number_workers = number_workers
+        self.outcomes = outcomes
+        self.answers = []
+        # submitted tasks and cancelled task_ids
+        self.submitted = []
+        self.cancelled = []
+
+    def submit(self, task):
+        self.submitted.append(task)
+        task_id = len(self.submitted)
+        outcome = self.outcomes[(task.ind_number, task.model_folder)].pop(0)
+        if outcome != 'hang':
+            self.answers.append((outcome[0], task_id, outcome[1]))
+        return task_id
+
+    def cancel(self, task_id):
+        self.cancelled.append(task_id)
+        self.answers.append(('cancelled', task_id, None))
+
+    def get_result(self, timeout):
+        if self.answers:
+            return self.answers.pop(0)
+        assert timeout is not None, "the scheduler waits for a model run which does not finish"
+        time.sleep(timeout)
+        return None
+
+
+def make_tasks(number_individuals, model_folders, timeout=None):
+    return [ModelTask(ind_number, model_number, [1, 2, 3], model_folder, "model.py", timeout=timeout)
+            for ind_number in range(number_individuals)
+            for model_number, model_folder in enumerate(model_folders, 1)]
+
+
+def statuses(results):
+    return dict(((task.ind_number, task.model_folder), status) for task, status, result in results)
+
+#------------------------------------------------------------------------------
+#   Tests
+#------------------------------------------------------------------------------
+def test_all_tasks_done():
+    pool = ScriptedPool(2, dict(((ind_number, folder), [('done', [ind_number])])
+                                for ind_number in range(3) for folder in ["M1", "M2"]))
+    scheduler = TaskScheduler(pool)
+    scheduler.add(make_tasks(3, ["M1", "M2"]))
+    results = scheduler.run()
+
+    assert len(results) == 6
+    assert set(statuses(results).values()) == set(['done'])
+    assert all(result == [task.ind_number] for task, status, result in results)
+    # every (individual, model) pair is a task of its own
+    assert len(pool.submitted) == 6
+
+
+def test_timeout():
+    pool = ScriptedPool(2, {(0, "M1"): ['hang'], (1, "M1"): [('done', [1.0])]})
+    scheduler = TaskScheduler(pool)
+    scheduler.add(make_tasks(2, ["M1"], timeout=0.2))
+    begin = time.time()
+    results = scheduler.run()
+
+    assert time.time() - begin < 5
+    assert statuses(results) == {(0, "M1"): 'timeout', (1, "M1"): 'done'}
+    # the model run was stopped
+    assert pool.cancelled == [1]
+
+
+def test_failed_task_is_repeated():
+    pool = ScriptedPool(1, {(0, "M1"): [('error', "model crashed"), ('done', [1.0])]})
+    scheduler = TaskScheduler(pool, max_retries=1)
+    tasks = make_tasks(1, ["M1"])
+    scheduler.add(tasks)
+    results = scheduler.run()
+
+    assert [(status, result) for task, status, result in results] == [('done', [1.0])]
+    assert tasks[0].attempts == 1
+    assert len(pool.submitted) == 2
+
+
+def test_failed_task_after_last_retry():
+    pool = ScriptedPool(1, {(0, "M1"): [('error', "model crashed"), ('error', "model crashed again")]})
+    scheduler = TaskScheduler(pool, max_retries=1)
+    scheduler.add(make_tasks(1, ["M1"]))
+    results = scheduler.run()
+
+    assert [(status, result) for task, status, result in results] == [('error', "model crashed again")]
+    assert len(pool.submitted) == 2
+
+
+def test_failed_task_without_retries():
+    pool = ScriptedPool(1, {(0, "M1"): [('error', "model crashed"), ('done', [1.0])]})
+    scheduler = TaskScheduler(pool)
+    scheduler.add(make_tasks(1, ["M1"]))
+    results = scheduler.run()
+
+    assert statuses(results) == {(0, "M1"): 'error'}
+    assert len(pool.submitted) == 1
+
+
+def test_speculative_copy():
+    # the first run of the task would not finish, its copy on the free worker finishes
+    pool = ScriptedPool(2, {(0, "M1"): ['hang', ('done', [2.0])]})
+    estimator = RuntimeEstimator()
+    estimator.update("M1", 0.0)
+    scheduler = TaskScheduler(pool, speculative=True, speculative_fraction=0.0, estimator=estimator)
+    scheduler.add(make_tasks(1, ["M1"]))
+    results = scheduler.run()
+
+    assert [(status, result) for task, status, result in results] == [('done', [2.0])]
+    assert [task.workspace for task in pool.submitted] == ['models_1', 'models_2']
+    # the first run was stopped
+    assert pool.cancelled == [1]
+
+
+def test_helping_folders_of_the_workers():
+    pool = ScriptedPool(2, dict(((ind_number, folder), [('done', [1.0])])
+                                for ind_number in range(3) for folder in ["M1", "M2"]))
+    scheduler = TaskScheduler(pool)
+    scheduler.add(make_tasks(3, ["M1", "M2"]))
+    scheduler.run()
+
+    # the tasks run in the helping folders of the two workers
+    assert set(task.workspace for task in pool.submitted) == set(['models_1', 'models_2'])
+    # all helping folders are free for the next generation
+    assert sorted(scheduler.free_slots) == ['models_1', 'models_2']
+
+
+def test_helping_folder_of_stopped_task():
+    pool = ScriptedPool(1, {(0, "M1"): ['hang'], (1, "M1"): [('done', [1.0])]})
+    scheduler = TaskScheduler(pool)
+    scheduler.add(make_tasks(2, ["M1"], timeout=0.2))
+    results = scheduler.run()
+
+    assert statuses(results) == {(0, "M1"): 'timeout', (1, "M1"): 'done'}
+    # the folder is used again when the pool confirmed the stop
+    assert [task.workspace for task in pool.submitted] == ['models_1', 'models_1']
+    assert scheduler.free_slots == ['models_1']
+
+
+def test_fail_fast():
+    # the second model of individual 0 would not finish, the third one is not started yet
+    pool = ScriptedPool(2, {(0, "M1"): [('error', "model crashed")], (0, "M2"): ['hang'], (0, "M3"): [('done', [0.0])],
+                            (1, "M1"): [('done', [1.0])], (1, "M2"): [('done', [1.0])], (1, "M3"): [('done', [1.0])]})
+    scheduler = TaskScheduler(pool, fail_fast=True)
+    scheduler.add(make_tasks(2, ["M1", "M2", "M3"]))
+    results = scheduler.run()
+
+    assert statuses(results) == {(0, "M1"): 'error', (0, "M2"): 'cancelled', (0, "M3"): 'cancelled',
+                                 (1, "M1"): 'done', (1, "M2"): 'done', (1, "M3"): 'done'}
+    assert pool.cancelled == [2]
+    assert [(task.ind_number, task.model_folder) for task in pool.submitted] == \
+           [(0, "M1"), (0, "M2"), (1, "M1"), (1, "M2"), (1, "M3")]
+
+
+def test_without_fail_fast():
+    pool = ScriptedPool(2, {(0, "M1"): [('error', "model crashed")], (0, "M2"): [('done', [0.0])],
+                            (1, "M1"): [('done', [1.0])], (1, "M2"): [('done', [1.0])]})
+    scheduler = TaskScheduler(pool)
+    scheduler.add(make_tasks(2, ["M1", "M2"]))
+    results = scheduler.run()
+
+    assert statuses(results) == {(0, "M1"): 'error', (0, "M2"): 'done', (1, "M1"): 'done', (1, "M2"): 'done'}
+    assert pool.cancelled == []
+
+
+def test_slots_follow_number_workers():
+    pool = ScriptedPool(1, dict(((ind_number, "M1"), [('done', [1.0])]) for ind_number in range(4)))
+    scheduler = TaskScheduler(pool)
+    # a network worker registered
+    pool.number_workers = 2
+    scheduler.add(make_tasks(4, ["M1"]))
+    results = scheduler.run()
+
+    assert len(results) == 4
+    assert set(task.workspace for task in pool.submitted) == set(['models_1', 'models_2'])
+
+
+def test_tasks_added_while_running():
+    pool = ScriptedPool(1, dict(((ind_number, "M1"), [('done', [ind_number])]) for ind_number in range(2)))
+    scheduler = TaskScheduler(pool)
+    scheduler.add(make_tasks(1, ["M1"]))
+    scheduler.poll()
+    scheduler.add([ModelTask(1, 1, [1, 2, 3], "M1", "model.py")])
+    results = scheduler.run()
+
+    # the task which was finished by poll() is returned by run()
+    assert statuses(results) == {(0, "M1"): 'done', (1, "M1"): 'done'}